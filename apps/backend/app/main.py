@@ -1,9 +1,10 @@
 import asyncio
+import json
 from fastapi import FastAPI, Depends, HTTPException, status, WebSocket, WebSocketDisconnect, Body
 from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from typing import Annotated
+from typing import Annotated, List, Optional
 import time # Importowanie czasu
 
 # Importuj pakiety lokalne
@@ -75,6 +76,12 @@ async def startup_event():
         # Zdecyduj, czy aplikacja powinna wystartować bez bazy danych
         # W przypadku krytycznej zależności, można zakończyć proces: sys.exit(1)
 
+    # Uruchom nasłuch unieważnień wspólnego cache L2 (Redis) i wczytanie snapshotu cache w tle
+    try:
+        await SERWIS_PERPLEXITY.start_cache()
+    except Exception as e:
+        logger.error(f"Nie udało się uruchomić cache: {e}")
+
     # Uruchom monitor zdrowia Perplexity AI w tle
     try:
         await SERWIS_PERPLEXITY.start_monitoringu()
@@ -98,6 +105,12 @@ async def shutdown_event():
     except Exception as e:
         logger.error(f"Błąd podczas zatrzymywania monitora zdrowia: {e}")
 
+    # Zapisz końcowy snapshot cache dla ciepłego restartu
+    try:
+        await SERWIS_PERPLEXITY.zapisz_snapshot_cache()
+    except Exception as e:
+        logger.error(f"Błąd podczas zapisu snapshotu cache: {e}")
+
     # Zamknij serwis Perplexity AI (np. sesję aiohttp)
     try:
         await SERWIS_PERPLEXITY.zamknij()
@@ -136,16 +149,20 @@ async def get_health_status():
 @app.post("/api/ask", summary="Zadaj pytanie do Perplexity AI")
 async def ask_perplexity(
     zapytanie: Annotated[str, Body(..., description="Treść zapytania do Perplexity AI")],
-    current_user: Annotated[dict, Depends(get_current_user)] # Wymaga uwierzytelnienia JWT
+    current_user: Annotated[dict, Depends(get_current_user)], # Wymaga uwierzytelnienia JWT
+    tryb: Annotated[str, Body(description="Tryb zapytania (auto, pro, reasoning, deep_research)")] = "auto",
+    model: Annotated[Optional[str], Body(description="Model zapytania (domyślny dla trybu, gdy brak)")] = None,
+    źródła: Annotated[List[str], Body(description="Źródła wyszukiwania (web, scholar, social)")] = ["web"],
+    język: Annotated[str, Body(description="Język odpowiedzi")] = "en-US"
 ):
     """
-    Przyjmuje zapytanie tekstowe i zwraca odpowiedź z Perplexity AI.
+    Przyjmuje zapytanie ({"zapytanie": ..., "tryb": ..., "model": ...}) i zwraca odpowiedź z Perplexity AI.
     Wykorzystuje wewnętrzny cache i obsługuje limitowanie zapytań.
     Wymaga tokenu autoryzacji JWT.
     """
     logger.info(f"Endpoint /api/ask wywołany przez użytkownika: {current_user['email']}")
     try:
-        odpowiedz = await SERWIS_PERPLEXITY.zapytaj(zapytanie)
+        odpowiedz = await SERWIS_PERPLEXITY.zapytaj(zapytanie, tryb, model, źródła, język)
         # Tutaj możesz opcjonalnie logować zapytanie do bazy danych
         # db: Session = Depends(get_db) # Trzeba by wstrzyknąć db tutaj lub użyć innej metody logowania
         # log_zapytania(db, current_user['email'], zapytanie, odpowiedz)
@@ -162,6 +179,17 @@ async def ask_perplexity(
         logger.error(f"Nieoczekiwany błąd podczas przetwarzania zapytania: {e}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Wewnętrzny błąd serwisu: {e}")
 
+def parsuj_wiadomość_ws(data: str):
+    """Zwraca (zapytanie, parametry zapytaj()) z wiadomości WS: zwykłego tekstu lub obiektu JSON."""
+    if data.lstrip().startswith("{"):
+        try:
+            wiadomość = json.loads(data)
+        except json.JSONDecodeError:
+            return data, {} # Zwykły tekst zaczynający się od "{"
+        parametry = {klucz: wiadomość[klucz] for klucz in ("tryb", "model", "źródła", "język") if wiadomość.get(klucz) is not None}
+        return str(wiadomość.get("zapytanie", "")), parametry
+    return data, {}
+
 # Endpoint WebSocket do strumieniowania odpowiedzi (wymaga adaptacji klienta Perplexity AI)
 # Uwaga: Implementacja strumieniowania wymaga, aby EnhancedClient i serwis obsługiwały strumienie
 # Perplexity API /chat/async zwraca pełną odpowiedź, a nie strumień.
@@ -185,7 +213,7 @@ async def websocket_endpoint(websocket: WebSocket):
 
     try:
         while True:
-            # Odbieraj wiadomość od klienta (oczekujemy tekstowego zapytania)
+            # Odbieraj wiadomość od klienta: tekst zapytania albo JSON {"zapytanie": ..., "tryb": ..., "model": ...}
             data = await websocket.receive_text()
             logger.info(f"Otrzymano wiadomość przez WS: '{data[:100]}...'")
 
@@ -201,7 +229,8 @@ async def websocket_endpoint(websocket: WebSocket):
                 # Tutaj brak logiki cache hit/miss per user, logowanie req/err jest w serwisie
                 # Jeśli serwis PerplexityAI nie obsługuje strumieniowania, musimy zasymulować
                 # rozbicie pełnej odpowiedzi na kawałki.
-                pelna_odpowiedz = await SERWIS_PERPLEXITY.zapytaj(data) # To może potrwać
+                zapytanie, parametry = parsuj_wiadomość_ws(data)
+                pelna_odpowiedz = await SERWIS_PERPLEXITY.zapytaj(zapytanie, **parametry) # To może potrwać
                 logger.info("Symuluję strumieniowanie pełnej odpowiedzi przez WS.")
 
                 # Rozbij odpowiedź na kawałki i wysyłaj z opóźnieniem
@@ -351,6 +380,7 @@ async def read_root():
 async def get_simple_status():
     """Zwraca uproszczony status serwisu i cache."""
     cache_status = SERWIS_PERPLEXITY.cache.stat() if SERWIS_PERPLEXITY.cache else {"enabled": False}
+    cache_negatywny_status = SERWIS_PERPLEXITY.cache_negatywny.stat() if SERWIS_PERPLEXITY.cache_negatywny else {"enabled": False}
     session_stats = SERWIS_PERPLEXITY.session_manager.get_stats()
 
     health_report = SERWIS_PERPLEXITY.health_monitor.pobierz_ostatni_raport()
@@ -360,10 +390,33 @@ async def get_simple_status():
         "status": "ok",
         "zdrowie_api": health_status_value,
         "cache": cache_status,
+        "cache_negatywny": cache_negatywny_status,
         "sesja": session_stats,
         "uptime_aplikacji_sekundy": int(time.time() - session_stats.get("start_time", time.time()))
     }
 
+# Endpoint do unieważniania odpowiedzi w cache (np. po zmianie źródeł lub błędnej odpowiedzi)
+@app.post("/api/cache/invalidate", summary="Usuń odpowiedź na zapytanie z cache")
+async def invalidate_cache(
+    zapytanie: Annotated[str, Body(..., description="Treść zapytania, którego odpowiedź ma zostać usunięta")],
+    current_user: Annotated[dict, Depends(get_current_user)], # Wymaga uwierzytelnienia JWT
+    tryb: Annotated[str, Body(description="Tryb zapytania (auto, pro, reasoning, deep_research)")] = "auto",
+    model: Annotated[Optional[str], Body(description="Model zapytania")] = None,
+    źródła: Annotated[List[str], Body(description="Źródła wyszukiwania (web, scholar, social)")] = ["web"],
+    język: Annotated[str, Body(description="Język odpowiedzi")] = "en-US"
+):
+    """
+    Usuwa odpowiedź na zapytanie z cache wszystkich workerów (L1 i L2) oraz zapamiętany błąd.
+    Kolejne takie zapytanie trafi do API Perplexity AI.
+    Wymaga tokenu autoryzacji JWT.
+    """
+    logger.info(f"Endpoint /api/cache/invalidate wywołany przez użytkownika: {current_user['email']}")
+    try:
+        await SERWIS_PERPLEXITY.unieważnij_cache(zapytanie, tryb, model, źródła, język)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"status": "ok"}
+
 # Endpoint do testowania uwierzytelnienia
 @app.get("/api/users/me", summary="Pobierz dane aktualnie zalogowanego użytkownika")
 async def read_users_me(current_user: Annotated[dict, Depends(get_current_user)]):
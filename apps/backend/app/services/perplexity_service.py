@@ -1,17 +1,36 @@
 import asyncio
 import time
 import os
+from typing import Iterable, Optional
 
 # Importowanie klas z pakietów lokalnych
 from packages.config.src.settings import KONFIGURACJA
 from packages.utils.src.logger import Logger
-from packages.cache.src.memory_cache import PamięćLRU
+from packages.utils.src.single_flight import SingleFlight
+from packages.cache.src.memory_cache import PamięćKlasowa
+from packages.cache.src.tiered_cache import PamięćWarstwowa
+from packages.cache.src.keys import zbuduj_klucz, kontekst_klucza, klasa_klucza
+from packages.cache.src.similarity import IndeksPodobieństwa
+from packages.cache.src.negative_cache import PamięćNegatywna
+from packages.cache.src import snapshot
 from packages.core.src.session_manager import SessionManager
-from packages.core.src.enhanced_client import EnhancedClient
+from packages.core.src.enhanced_client import EnhancedClient, BłądAPI, czy_deterministyczny
 from packages.monitoring.src.health_monitor import HealthMonitor, Status
 
 logger = Logger().log # Użyj globalnej instancji Loggera
 
+# Dozwolone tryby (jako klasy kluczy cache) i źródła zapytań
+TRYBY = ("auto", "pro", "reasoning", "deep_research")
+ŹRÓDŁA = ("web", "scholar", "social")
+
+def sprawdź_parametry(tryb: str, źródła: Iterable[str]):
+    """Zgłasza ValueError dla nieznanego trybu lub źródła (każdy tryb ma własną klasę cache)."""
+    if klasa_klucza(tryb) not in TRYBY:
+        raise ValueError(f"Nieznany tryb: {tryb}. Dozwolone: {', '.join(TRYBY)}")
+    nieznane = set(źródła) - set(ŹRÓDŁA)
+    if nieznane:
+        raise ValueError(f"Nieznane źródła: {', '.join(sorted(nieznane))}. Dozwolone: {', '.join(ŹRÓDŁA)}")
+
 class PerplexityAIService:
     """Serwis fasady do klienta Perplexity AI, dodający cache i monitorowanie."""
 
@@ -34,12 +53,53 @@ class PerplexityAIService:
         cache_enabled = self.cfg.pobierz("cache.enabled", True)
         cache_max_entries = self.cfg.pobierz("cache.max_entries", 1000)
         cache_ttl = self.cfg.pobierz("cache.ttl", 3600)
-        self.cache = PamięćLRU(cache_max_entries, cache_ttl) if cache_enabled else None
+        # Polityki TTL i rozmiaru dla klas kluczy (trybów), np. cache.klasy.deep_research.ttl
+        cache_klasy = self.cfg.pobierz("cache.klasy", {}) or {}
+        # Stale-while-revalidate i odświeżanie z wyprzedzeniem, z ograniczoną liczbą odświeżeń w tle
+        self.cache = PamięćKlasowa(
+            cache_klasy, cache_max_entries, cache_ttl,
+            okres_łaski=self.cfg.pobierz("cache.grace", 0),
+            odświeżanie_z_wyprzedzeniem=self.cfg.pobierz("cache.refresh_ahead", 0.0),
+            min_trafień=self.cfg.pobierz("cache.refresh_min_hits", 3),
+            max_odświeżań=self.cfg.pobierz("cache.max_refreshes", 2),
+            # Budżet bajtów zamiast liczby wpisów (0 = limit liczby wpisów) i kompresja dużych odpowiedzi
+            max_bajtów=self.cfg.pobierz("cache.max_bytes", 0),
+            próg_kompresji=self.cfg.pobierz("cache.compress_threshold", 0),
+            polityka=self.cfg.pobierz("cache.policy", "lru")
+        ) if cache_enabled else None
         if self.cache:
-            logger.info(f"Cache włączony: max_entries={cache_max_entries}, ttl={cache_ttl}s")
+            logger.info(f"Cache włączony: max_entries={cache_max_entries}, ttl={cache_ttl}s, klasy={cache_klasy}")
+            # L2 w Redisie współdzielone przez workery (L1 zostaje w pamięci procesu)
+            if self.cfg.pobierz("cache.l2.enabled", False):
+                redis_url = self.cfg.pobierz("redis.url", "redis://localhost:6379/0")
+                self.cache = PamięćWarstwowa.z_url(redis_url, self.cache)
+                logger.info(f"Cache L2 (Redis) włączony: {redis_url}")
         else:
             logger.info("Cache wyłączony.")
 
+        # Indeks podobnych zapytań dla przybliżonych trafień w cache (opcjonalny)
+        self.indeks_podobieństwa = IndeksPodobieństwa(
+            próg=self.cfg.pobierz("cache.similarity.threshold", 0.8),
+            permutacje=self.cfg.pobierz("cache.similarity.permutations", 64),
+            pasma=self.cfg.pobierz("cache.similarity.bands", 16),
+            max_wpisów=self.cfg.pobierz("cache.similarity.max_entries", 100000)
+        ) if self.cache and self.cfg.pobierz("cache.similarity.enabled", False) else None
+
+        # Krótkotrwały cache błędów deterministycznych: powtórzone błędne zapytanie kończy się od razu
+        self.cache_negatywny = PamięćNegatywna(
+            self.cfg.pobierz("cache.negative.ttl", 60),
+            self.cfg.pobierz("cache.negative.max_entries", 10000)
+        ) if self.cfg.pobierz("cache.negative.enabled", True) else None
+
+        # Snapshot cache dla ciepłego restartu
+        self.snapshot_ścieżka = self.cfg.pobierz("cache.snapshot.path", "data/cache_snapshot.bin") \
+            if self.cache and self.cfg.pobierz("cache.snapshot.enabled", False) else None
+        self.snapshot_interwał = self.cfg.pobierz("cache.snapshot.interval", 300)
+        self._zadania_snapshotu = []
+
+        # Identyczne zapytania w locie współdzielą jedno wywołanie API (także ścieżka WebSocket)
+        self.single_flight = SingleFlight()
+
         # Inicjalizacja monitora zdrowia
         monitor_interval = self.cfg.pobierz("monitoring.interval_sek", 300) # Domyślny interwał 5 minut
         self.health_monitor = HealthMonitor(self.perplexity_client, monitor_interval)
@@ -47,33 +107,87 @@ class PerplexityAIService:
 
         logger.info("PerplexityAIService zainicjowany.")
 
-    async def zapytaj(self, prompt: str) -> str:
-        """Zadaje pytanie do Perplexity AI, wykorzystując cache i logując aktywność."""
-        logger.info(f"Otrzymano zapytanie: '{prompt[:100]}...'") # Loguj początek zapytania
-
-        if self.cache:
-            cached_answer = self.cache.get(prompt)
-            if cached_answer:
-                logger.info("Odpowiedź znaleziona w cache.")
-                # Zwracamy odpowiedź z cache - nie logujemy żądania do API
-                return cached_answer
+    async def zapytaj(self, prompt: str, tryb: str = "auto", model: Optional[str] = None,
+                      źródła: Iterable[str] = ("web",), język: str = "en-US") -> str:
+        """Zadaje pytanie do Perplexity AI, wykorzystując cache i logując aktywność.
 
-        logger.info("Odpowiedź nie w cache. Pytam API Perplexity.")
+        Tryb, model, źródła i język są przekazywane do API i są częścią klucza cache, a tryb wyznacza
+        jego klasę (politykę TTL). Nieznany tryb lub źródło zgłasza ValueError.
+        """
+        logger.info(f"Otrzymano zapytanie: '{prompt[:100]}...'") # Loguj początek zapytania
+        sprawdź_parametry(tryb, źródła)
+        klucz = zbuduj_klucz(prompt, tryb, model, źródła, język)
+
+        async def ładowarka() -> str:
+            # Cache błędów sprawdzany tylko przy chybieniu: poprawna odpowiedź z cache ma pierwszeństwo
+            if self.cache_negatywny is not None:
+                błąd = self.cache_negatywny.get(klucz)
+                if błąd is not None:
+                    logger.info("Zapytanie zakończyło się wcześniej błędem deterministycznym - zwracam go z cache.")
+                    raise BłądAPI(*błąd)
+            return await self.single_flight.wykonaj(
+                klucz, lambda: self._zapytaj_api(prompt, klucz, tryb, model, źródła, język))
+
+        if not self.cache:
+            return await ładowarka()
+
+        # Przybliżone trafienie tylko, gdy samo zapytanie nie było jeszcze widziane
+        kontekst = kontekst_klucza(tryb, model, źródła, język)
+        if self.indeks_podobieństwa is not None and klucz not in self.indeks_podobieństwa:
+            v = self._pobierz_podobne(prompt, kontekst)
+            if v is not None:
+                return v
+
+        # Cache zwraca wpis (także przeterminowany w okresie łaski, odświeżany wtedy w tle) lub woła ładowarkę
+        v = await self.cache.pobierz_lub_odswiez(klucz, ładowarka)
+        if self.indeks_podobieństwa is not None:
+            self.indeks_podobieństwa.dodaj(prompt, klucz, kontekst)
+        return v
+
+    async def unieważnij_cache(self, prompt: str, tryb: str = "auto", model: Optional[str] = None,
+                               źródła: Iterable[str] = ("web",), język: str = "en-US"):
+        """Usuwa odpowiedź na zapytanie z cache (w L2 także z L1 wszystkich workerów) i zapamiętany błąd."""
+        sprawdź_parametry(tryb, źródła)
+        klucz = zbuduj_klucz(prompt, tryb, model, źródła, język)
+        if isinstance(self.cache, PamięćWarstwowa):
+            await self.cache.unieważnij(klucz)
+        elif self.cache:
+            self.cache.usuń(klucz)
+        if self.indeks_podobieństwa is not None:
+            self.indeks_podobieństwa.usuń(klucz)
+        if self.cache_negatywny is not None:
+            self.cache_negatywny.usuń(klucz)
+        logger.info(f"Unieważniono cache zapytania: '{prompt[:100]}...'")
+
+    def _pobierz_podobne(self, prompt: str, kontekst) -> Optional[str]:
+        """Zwraca odpowiedź z cache dla prawie identycznego zapytania o tym samym kontekście lub None."""
+        podobny = self.indeks_podobieństwa.znajdź(prompt, kontekst)
+        if podobny is None:
+            return None
+        # Tylko lokalne L1; odczyt nie jest wliczany do zwykłych trafień i chybień
+        v = getattr(self.cache, "l1", self.cache).get(podobny, zliczaj=False)
+        if v is None:
+            # Wpis wypadł z cache - usuń go też z indeksu
+            self.indeks_podobieństwa.usuń(podobny)
+            return None
+        logger.info("Odpowiedź z cache dla podobnego zapytania.")
+        self.indeks_podobieństwa.trafienia += 1
+        return v
+
+    async def _zapytaj_api(self, prompt: str, klucz=None, tryb: str = "auto", model: Optional[str] = None,
+                           źródła: Iterable[str] = ("web",), język: str = "en-US") -> str:
+        """Wysyła zapytanie do API (jedno wywołanie na grupę identycznych zapytań)."""
+        logger.info("Odpowiedź nie w cache lub odświeżana. Pytam API Perplexity.")
         try:
             start_time = time.time()
             # Wykonaj zapytanie za pomocą ulepszonego klienta
             # EnhancedClient zawiera logikę ponawiania i rate limiting
-            api_response = await self.perplexity_client.request(prompt)
+            api_response = await self.perplexity_client.request(prompt, tryb, model, źródła, język)
             end_time = time.time()
             czas_odpowiedzi_ms = int((end_time - start_time) * 1000)
 
             logger.info(f"Odpowiedź z API otrzymana (czas: {czas_odpowiedzi_ms}ms).")
 
-            # Zapisz odpowiedź w cache, jeśli cache jest włączony
-            if self.cache:
-                self.cache.set(prompt, api_response)
-                logger.debug("Odpowiedź zapisana w cache.")
-
             # Zaloguj pomyślne zapytanie w SessionManager
             self.session_manager.log_req()
 
@@ -83,6 +197,9 @@ class PerplexityAIService:
             logger.error(f"Błąd podczas zapytania do Perplexity AI: {e}")
             # Zaloguj błąd w SessionManager
             self.session_manager.log_err(str(e))
+            # Błąd deterministyczny (np. błędne zapytanie) zapamiętaj, aby powtórki nie szły do API
+            if self.cache_negatywny is not None and klucz is not None and czy_deterministyczny(e):
+                self.cache_negatywny.set(klucz, e)
             # Zgłoś wyjątek dalej, aby obsłużył go endpoint API
             raise e
 
@@ -101,6 +218,9 @@ class PerplexityAIService:
         """Zwraca metryki w formacie Prometheus."""
         # Możemy dodać metryki specyficzne dla serwisu, np. ilość zapytań cache vs API
         cache_stats = self.cache.stat() if self.cache else {}
+        single_flight_stats = self.single_flight.stat()
+        podobne_stats = self.indeks_podobieństwa.stat() if self.indeks_podobieństwa else {}
+        negatywne_stats = self.cache_negatywny.stat() if self.cache_negatywny else {}
         session_stats = self.session_manager.get_stats()
 
         metrics = self.health_monitor.get_prometheus_metrics() # Metryki z monitora zdrowia
@@ -117,6 +237,62 @@ class PerplexityAIService:
         metrics += f"# TYPE perplexity_cache_entries_current gauge\n"
         metrics += f"perplexity_cache_entries_current {cache_stats.get('len', 0)}\n"
 
+        metrics += f"# HELP perplexity_cache_bytes_current Aktualny rozmiar wpisów w cache (w bajtach, po kompresji).\n"
+        metrics += f"# TYPE perplexity_cache_bytes_current gauge\n"
+        metrics += f"perplexity_cache_bytes_current {cache_stats.get('bytes', 0)}\n"
+
+        metrics += f"# HELP perplexity_cache_compression_ratio Stosunek rozmiaru wpisów przed i po kompresji.\n"
+        metrics += f"# TYPE perplexity_cache_compression_ratio gauge\n"
+        metrics += f"perplexity_cache_compression_ratio {cache_stats.get('compression_ratio', 1.0):.4f}\n"
+
+        metrics += f"# HELP perplexity_cache_stale_hits_total Liczba odpowiedzi z przeterminowanego wpisu (w okresie łaski).\n"
+        metrics += f"# TYPE perplexity_cache_stale_hits_total counter\n"
+        metrics += f"perplexity_cache_stale_hits_total {cache_stats.get('stale_hits', 0)}\n"
+
+        metrics += f"# HELP perplexity_cache_refreshes_total Liczba odświeżeń wpisów w tle.\n"
+        metrics += f"# TYPE perplexity_cache_refreshes_total counter\n"
+        metrics += f"perplexity_cache_refreshes_total {cache_stats.get('refreshes', 0)}\n"
+
+        metrics += f"# HELP perplexity_cache_fuzzy_hits_total Liczba trafień w cache przez prawie identyczne zapytanie.\n"
+        metrics += f"# TYPE perplexity_cache_fuzzy_hits_total counter\n"
+        metrics += f"perplexity_cache_fuzzy_hits_total {podobne_stats.get('fuzzy_hits', 0)}\n"
+
+        metrics += f"# HELP perplexity_cache_similarity_entries_current Aktualna liczba zapytań w indeksie podobieństwa.\n"
+        metrics += f"# TYPE perplexity_cache_similarity_entries_current gauge\n"
+        metrics += f"perplexity_cache_similarity_entries_current {podobne_stats.get('len', 0)}\n"
+
+        metrics += f"# HELP perplexity_cache_negative_hits_total Liczba zapytań zakończonych od razu zapamiętanym błędem deterministycznym.\n"
+        metrics += f"# TYPE perplexity_cache_negative_hits_total counter\n"
+        metrics += f"perplexity_cache_negative_hits_total {negatywne_stats.get('hits', 0)}\n"
+
+        metrics += f"# HELP perplexity_cache_negative_entries_current Aktualna liczba zapamiętanych błędów deterministycznych.\n"
+        metrics += f"# TYPE perplexity_cache_negative_entries_current gauge\n"
+        metrics += f"perplexity_cache_negative_entries_current {negatywne_stats.get('len', 0)}\n"
+
+        metrics += f"# HELP perplexity_cache_class_hits_total Liczba trafień w cache dla klasy kluczy.\n"
+        metrics += f"# TYPE perplexity_cache_class_hits_total counter\n"
+        for klasa, st in cache_stats.get('klasy', {}).items():
+            metrics += f"perplexity_cache_class_hits_total{{klasa=\"{klasa}\"}} {st.get('hits', 0)}\n"
+
+        metrics += f"# HELP perplexity_cache_class_misses_total Liczba chybień w cache dla klasy kluczy.\n"
+        metrics += f"# TYPE perplexity_cache_class_misses_total counter\n"
+        for klasa, st in cache_stats.get('klasy', {}).items():
+            metrics += f"perplexity_cache_class_misses_total{{klasa=\"{klasa}\"}} {st.get('misses', 0)}\n"
+
+        metrics += f"# HELP perplexity_cache_class_hit_ratio Odsetek trafień w cache dla klasy kluczy.\n"
+        metrics += f"# TYPE perplexity_cache_class_hit_ratio gauge\n"
+        for klasa, st in cache_stats.get('klasy', {}).items():
+            zapytania = st.get('hits', 0) + st.get('misses', 0)
+            metrics += f"perplexity_cache_class_hit_ratio{{klasa=\"{klasa}\"}} {st.get('hits', 0) / zapytania if zapytania else 0:.4f}\n"
+
+        metrics += f"# HELP perplexity_coalesced_requests_total Całkowita liczba zapytań połączonych z trwającym identycznym zapytaniem.\n"
+        metrics += f"# TYPE perplexity_coalesced_requests_total counter\n"
+        metrics += f"perplexity_coalesced_requests_total {single_flight_stats['połączone']}\n"
+
+        metrics += f"# HELP perplexity_inflight_requests_current Aktualna liczba różnych zapytań w locie.\n"
+        metrics += f"# TYPE perplexity_inflight_requests_current gauge\n"
+        metrics += f"perplexity_inflight_requests_current {single_flight_stats['w_locie']}\n"
+
         metrics += f"# HELP perplexity_total_requests_count Całkowita liczba zapytań wysłanych do API Perplexity.\n"
         metrics += f"# TYPE perplexity_total_requests_count counter\n"
         metrics += f"perplexity_total_requests_count {session_stats.get('całkowita_ilość_żądań', 0)}\n"
@@ -128,6 +304,35 @@ class PerplexityAIService:
 
         return metrics
 
+    async def start_cache(self):
+        """Uruchamia nasłuch unieważnień cache L2 (jeśli włączone) oraz wczytanie i okresowy zapis snapshotu."""
+        if isinstance(self.cache, PamięćWarstwowa):
+            await self.cache.start()
+        if self.snapshot_ścieżka and not self._zadania_snapshotu:
+            # Wczytanie w tle nie blokuje startu; do tego czasu chybienia idą do API jak przy zimnym starcie
+            self._zadania_snapshotu.append(asyncio.create_task(self._wczytaj_snapshot_cache()))
+            if self.snapshot_interwał > 0:
+                self._zadania_snapshotu.append(asyncio.create_task(
+                    snapshot.zapisuj_okresowo(self.cache, self.snapshot_ścieżka, self.snapshot_interwał)))
+
+    async def _wczytaj_snapshot_cache(self):
+        try:
+            liczba = await snapshot.wczytaj_snapshot(self.cache, self.snapshot_ścieżka)
+            logger.info(f"Wczytano snapshot cache: {liczba} wpisów z {self.snapshot_ścieżka}")
+        except Exception as e:
+            logger.error(f"Nie udało się wczytać snapshotu cache: {e}")
+
+    async def zapisz_snapshot_cache(self):
+        """Zapisuje snapshot cache (wywoływane przy zamknięciu aplikacji)."""
+        if not self.snapshot_ścieżka:
+            return
+        # Zatrzymaj zapis okresowy, aby nie nadpisał końcowego snapshotu starszym stanem
+        for zadanie in self._zadania_snapshotu:
+            zadanie.cancel()
+        self._zadania_snapshotu = []
+        liczba = await snapshot.zapisz_snapshot(self.cache, self.snapshot_ścieżka)
+        logger.info(f"Zapisano snapshot cache: {liczba} wpisów do {self.snapshot_ścieżka}")
+
     async def start_monitoringu(self):
         """Uruchamia monitor zdrowia."""
         await self.health_monitor.start()
@@ -140,6 +345,11 @@ class PerplexityAIService:
         """Zamyka zasoby serwisu, np. sesję klienta."""
         logger.info("Zamykam PerplexityAIService...")
         await self.perplexity_client.close()
+        for zadanie in self._zadania_snapshotu:
+            zadanie.cancel()
+        self._zadania_snapshotu = []
+        if isinstance(self.cache, PamięćWarstwowa):
+            await self.cache.stop()
         # Zapisz sesję na koniec
         # self.session_manager._write() # _write jest wołane po każdej zmianie, więc to nie jest ściśle konieczne, ale można dodać na wszelki wypadek
         logger.info("PerplexityAIService zamknięty.")
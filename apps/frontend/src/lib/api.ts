@@ -123,19 +123,24 @@ export async function validateToken(token: string): Promise<UserDataFromToken> {
 }
 
 
+// Parametry zapytania przekazywane do Perplexity AI (brak = domyślne wartości backendu)
+export interface QueryOptions {
+  tryb?: 'auto' | 'pro' | 'reasoning' | 'deep_research';
+  model?: string;
+  źródła?: string[];
+  język?: string;
+}
+
 // Funkcja do wysyłania zapytania do Perplexity AI (endpoint POST /api/ask)
-export async function sendPerplexityQuery(query: string, token: string): Promise<{ odpowiedz: string }> {
+export async function sendPerplexityQuery(query: string, token: string, options: QueryOptions = {}): Promise<{ odpowiedz: string }> {
   const response = await fetch(`${API_BASE_URL}/ask`, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
       'Authorization': `Bearer ${token}`, // Dołącz token JWT
     },
-    body: JSON.stringify(query), // Wysyłamy sam string zapytania w body, backend oczekuje stringa Body(...)
-     // Backendowy endpoint /api/ask oczekuje `Annotated[str, Body(...)]`, co FastAPI parsuje z body
-     // Jeśli oczekuje JSON {"query": "tekst"}, body powinno być JSON.stringify({query: query}).
-     // Zmieniam backend, żeby oczekiwał JSON {"zapytanie": "tekst"}. Tak będzie czytelniej.
-     // Backend oczekuje { zapytanie: string }.
+    // Backend oczekuje { zapytanie: string, tryb?, model?, źródła?, język? }
+    body: JSON.stringify({ zapytanie: query, ...options }),
 
   });
   const data = await handleApiResponse<{ odpowiedz: string }>(response);
@@ -0,0 +1,75 @@
+'''
+Hit-rate comparison of the LRU/TTL and W-TinyLFU policies of PamięćLRU on a replayed key trace.
+
+The synthetic trace mixes Zipf-distributed interactive queries with periodic bursts of one-off batch queries,
+the pattern that flushes hot answers out of a plain LRU. A recorded trace is a text file with one key per line.
+
+Usage: python benchmarks/bench_cache_policy.py [--trace keys.txt] [--capacity 1000] [--requests 200000]
+'''
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from packages.cache.src.memory_cache import PamięćLRU
+
+
+def synthetic_trace(requests, hot_keys=20000, zipf=1.0, burst_every=5000, burst_size=3000, seed=0):
+    '''
+    Zipf-distributed interactive keys, interrupted every burst_every requests by burst_size unique batch keys.
+    '''
+    rng = random.Random(seed)
+    weights = [1 / (rank ** zipf) for rank in range(1, hot_keys + 1)]
+    hot = rng.choices(range(hot_keys), weights=weights, k=requests)
+    trace, one_off = [], 0
+
+    for i, key in enumerate(hot):
+        trace.append(f'q{key}')
+
+        if burst_every and (i + 1) % burst_every == 0:
+            trace.extend(f'batch{one_off + j}' for j in range(burst_size))
+            one_off += burst_size
+
+    return trace
+
+
+def load_trace(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip('\n') for line in f if line.strip()]
+
+
+def replay(trace, policy, capacity):
+    '''
+    Replays the trace as get-then-set-on-miss, like PerplexityAIService.zapytaj, and returns (hit rate, seconds).
+    '''
+    cache = PamięćLRU(max_entries=capacity, ttl=0, polityka=policy)
+    start = time.perf_counter()
+
+    for key in trace:
+        if cache.get(key) is None:
+            cache.set(key, key)
+
+    elapsed = time.perf_counter() - start
+    return cache.hits / len(trace), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--trace', help='text file with one cache key per line')
+    parser.add_argument('--capacity', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=200000, help='interactive requests of the synthetic trace')
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace) if args.trace else synthetic_trace(args.requests)
+    print(f'{len(trace)} requests, {len(set(trace))} distinct keys, capacity {args.capacity}')
+
+    for policy in ('lru', 'tinylfu'):
+        hit_rate, elapsed = replay(trace, policy, args.capacity)
+        print(f'{policy:8} hit rate {hit_rate:7.2%}  {len(trace) / elapsed / 1e3:8.1f}k ops/s')
+
+
+if __name__ == '__main__':
+    main()
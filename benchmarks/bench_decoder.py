@@ -0,0 +1,69 @@
+'''
+Microbenchmark of the SSE message decoders on a recorded (or synthetic) perplexity_ask stream.
+
+Usage: python benchmarks/bench_decoder.py [--recorded body.bin] [--repeat 5]
+'''
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from perplexity.decoder import Decoder, available_backends
+from benchmarks.sse_stream import load_stream, message_payloads
+
+
+def baseline(payloads):
+    '''
+    The decoding done by Client.search before the Decoder abstraction.
+    '''
+    import json
+
+    for data in payloads:
+        content = (b'event: message\r\ndata: ' + data).decode('utf-8')
+        content_json = json.loads(content[len('event: message\r\ndata: '):])
+        content_json['text'] = json.loads(content_json['text'])
+
+
+def run(decoder, payloads, touch_text):
+    for data in payloads:
+        message = decoder.message(data)
+
+        if touch_text:
+            message['text']
+
+
+def best_of(repeat, func, *args):
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recorded', help='Path to a raw perplexity_ask response body')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    payloads = message_payloads(load_stream(args.recorded))
+    size = sum(len(p) for p in payloads)
+    print(f'{len(payloads)} message events, {size / 1e6:.1f} MB of event data')
+
+    reference = best_of(args.repeat, baseline, payloads)
+    print(f'{"baseline (decode + 2x json.loads)":40s} {reference * 1e3:8.1f} ms  {size / reference / 1e6:8.1f} MB/s')
+
+    for backend in available_backends():
+        for lazy, touch in ((False, False), (True, False), (True, True)):
+            label = f'{backend}{" lazy" if lazy else ""}{" (text accessed)" if touch else ""}'
+            elapsed = best_of(args.repeat, run, Decoder(backend, lazy_text=lazy), payloads, touch)
+            print(f'{label:40s} {elapsed * 1e3:8.1f} ms  {size / elapsed / 1e6:8.1f} MB/s  x{reference / elapsed:.2f}')
+
+
+if __name__ == '__main__':
+    main()
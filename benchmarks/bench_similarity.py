@@ -0,0 +1,66 @@
+'''
+Lookup latency and match quality of the near-duplicate query index (IndeksPodobieństwa) at 100k entries.
+
+Indexed prompts are random word sequences; queries are indexed prompts rewritten the way users repeat a question
+(punctuation, case, filler words) plus unrelated prompts that must not match.
+
+Usage: python benchmarks/bench_similarity.py [--entries 100000] [--queries 5000] [--threshold 0.8]
+'''
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from packages.cache.src.similarity import IndeksPodobieństwa
+
+
+def random_prompts(rng, vocabulary, count):
+    return [' '.join(rng.choices(vocabulary, k=rng.randint(5, 12))) for _ in range(count)]
+
+
+def rewrite(rng, prompt):
+    '''
+    Rewrites a prompt without changing its meaning: different case, punctuation and fillers.
+    '''
+    words = prompt.split()
+    words.insert(rng.randrange(len(words) + 1), rng.choice(('the', 'a', 'please')))
+    return f'Hey, {", ".join(words).upper()}?'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--queries', type=int, default=5000)
+    parser.add_argument('--threshold', type=float, default=0.8)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    vocabulary = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(20000)]
+    prompts = random_prompts(rng, vocabulary, args.entries)
+    index = IndeksPodobieństwa(próg=args.threshold, max_wpisów=args.entries)
+
+    start = time.perf_counter()
+    for key, prompt in enumerate(prompts):
+        index.dodaj(prompt, key)
+    elapsed = time.perf_counter() - start
+    print(f'{args.entries} entries indexed, {elapsed / args.entries * 1e6:.1f} us per insert')
+
+    sample = rng.sample(range(args.entries), args.queries)
+    start = time.perf_counter()
+    found = sum(index.znajdź(rewrite(rng, prompts[key])) == key for key in sample)
+    elapsed = time.perf_counter() - start
+    print(f'rewritten queries: {found / args.queries:7.2%} matched, {elapsed / args.queries * 1e6:.1f} us per lookup')
+
+    unrelated = random_prompts(rng, vocabulary, args.queries)
+    start = time.perf_counter()
+    false = sum(index.znajdź(prompt) is not None for prompt in unrelated)
+    elapsed = time.perf_counter() - start
+    print(f'unrelated queries: {false / args.queries:7.2%} matched, {elapsed / args.queries * 1e6:.1f} us per lookup')
+
+
+if __name__ == '__main__':
+    main()
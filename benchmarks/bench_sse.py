@@ -0,0 +1,85 @@
+'''
+Throughput benchmark of the SSE frame parser on a multi-megabyte recorded (or synthetic) perplexity_ask stream.
+
+The body is fed in network-sized chunks and compared with the iter_lines + decode + slice path used before.
+
+Usage: python benchmarks/bench_sse.py [--recorded body.bin] [--chunk-size 16384] [--repeat 5]
+'''
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from perplexity.decoder import Decoder
+from perplexity.sse import SSEParser
+from benchmarks.sse_stream import load_stream
+
+
+def iter_lines(chunks, delimiter=b'\r\n\r\n'):
+    '''
+    Same splitting strategy as curl_cffi's Response.iter_lines.
+    '''
+    pending = None
+
+    for chunk in chunks:
+        if pending is not None:
+            chunk = pending + chunk
+
+        lines = chunk.split(delimiter)
+        pending = lines.pop() if lines and lines[-1] else None
+
+        yield from lines
+
+    if pending is not None:
+        yield pending
+
+
+def baseline(chunks, handle):
+    for chunk in iter_lines(chunks):
+        content = chunk.decode('utf-8')
+
+        if content.startswith('event: message\r\n'):
+            handle(content[len('event: message\r\ndata: '):])
+
+
+def parser(chunks, handle):
+    for event, data in SSEParser().iter_events(chunks):
+        if event == b'message':
+            handle(data)
+
+
+def best_of(repeat, func, *args):
+    timings = []
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('--recorded', help='Path to a raw perplexity_ask response body')
+    arg_parser.add_argument('--chunk-size', type=int, default=16384)
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    body = load_stream(args.recorded, answer_chars=40000, events=600)
+    chunks = [body[i:i + args.chunk_size] for i in range(0, len(body), args.chunk_size)]
+    print(f'{len(body) / 1e6:.1f} MB body in {len(chunks)} chunks of {args.chunk_size} bytes')
+
+    decoder = Decoder()
+    for label, handle in (('framing only', lambda data: None), (f'framing + {decoder.backend} decode', decoder.message)):
+        reference = best_of(args.repeat, baseline, chunks, handle)
+        elapsed = best_of(args.repeat, parser, chunks, handle)
+        print(f'{label}:')
+        print(f'  {"iter_lines + decode + slice":30s} {reference * 1e3:8.1f} ms  {len(body) / reference / 1e6:8.1f} MB/s')
+        print(f'  {"SSEParser":30s} {elapsed * 1e3:8.1f} ms  {len(body) / elapsed / 1e6:8.1f} MB/s  x{reference / elapsed:.2f}')
+
+
+if __name__ == '__main__':
+    main()
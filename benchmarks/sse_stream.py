@@ -0,0 +1,57 @@
+'''
+Helpers producing perplexity_ask SSE bodies for the benchmarks.
+
+A recorded body (the raw bytes of a perplexity_ask response) can be passed to every benchmark with --recorded;
+otherwise a synthetic stream with the same framing is generated.
+'''
+import json
+import random
+import string
+
+
+def synthetic_stream(answer_chars=20000, events=400, sources=10, seed=0):
+    '''
+    Builds a raw SSE body whose message events carry a growing answer, like a long "deep research" reply.
+    '''
+    rng = random.Random(seed)
+    words = [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(2000)]
+    answer = ' '.join(rng.choice(words) for _ in range(answer_chars // 5))[:answer_chars]
+    web_results = [{'name': f'Source {i}', 'url': f'https://example.com/{i}', 'snippet': ' '.join(rng.choices(words, k=40))} for i in range(sources)]
+    steps = [
+        {'step_type': 'INITIAL_QUERY', 'content': {'query': 'benchmark'}},
+        {'step_type': 'SEARCH_WEB', 'content': {'queries': ['benchmark query']}},
+        {'step_type': 'SEARCH_RESULTS', 'content': {'web_results': web_results}},
+    ]
+
+    frames = []
+    for i in range(1, events + 1):
+        final = {'step_type': 'FINAL', 'content': {'answer': json.dumps({'answer': answer[:len(answer) * i // events], 'web_results': web_results})}}
+        payload = {
+            'backend_uuid': 'b2b2b2b2-0000-0000-0000-000000000000',
+            'status': 'COMPLETED' if i == events else 'PENDING',
+            'final': i == events,
+            'text': json.dumps(steps + [final]),
+        }
+        frames.append(b'event: message\r\ndata: ' + json.dumps(payload).encode() + b'\r\n\r\n')
+
+    frames.append(b'event: end_of_stream\r\ndata: {}\r\n\r\n')
+    return b''.join(frames)
+
+
+def load_stream(path=None, **kwargs):
+    '''
+    Returns a recorded SSE body read from path, or a synthetic one.
+    '''
+    if path:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    return synthetic_stream(**kwargs)
+
+
+def message_payloads(body):
+    '''
+    Splits a raw SSE body into the data parts of its message events.
+    '''
+    prefix = b'event: message\r\ndata: '
+    return [frame[len(prefix):] for frame in body.split(b'\r\n\r\n') if frame.startswith(prefix)]
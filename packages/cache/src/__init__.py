@@ -1 +1,7 @@
-from .memory_cache import PamięćLRU
+from .memory_cache import PamięćLRU, PamięćKlasowa, WartośćZTtl
+from .keys import KluczCache, zbuduj_klucz, kontekst_klucza, normalizuj_prompt
+from .tiered_cache import PamięćWarstwowa
+from .tinylfu import PamięćTinyLFU, SzkicCountMin
+from .snapshot import zapisz_snapshot, wczytaj_snapshot
+from .similarity import IndeksPodobieństwa
+from .negative_cache import PamięćNegatywna
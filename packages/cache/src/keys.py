@@ -0,0 +1,48 @@
+import hashlib
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+_BIAŁE_ZNAKI = re.compile(r"\s+")
+
+@dataclass(frozen=True)
+class KluczCache:
+    """Klucz cache: klasa (polityka TTL/rozmiaru) i skrót znormalizowanego zapytania z parametrami."""
+    klasa: str
+    skrót: str
+
+    def __str__(self) -> str:
+        return f"{self.klasa}:{self.skrót}"
+
+    @classmethod
+    def z_tekstu(cls, tekst: str) -> "KluczCache":
+        """Odtwarza klucz z jego postaci tekstowej (str(klucz))."""
+        klasa, skrót = tekst.split(":", 1)
+        return cls(klasa, skrót)
+
+def normalizuj_prompt(prompt: str) -> str:
+    """Normalizuje zapytanie: Unicode NFKC, bez rozróżniania wielkości liter, zwinięte białe znaki."""
+    return _BIAŁE_ZNAKI.sub(" ", unicodedata.normalize("NFKC", prompt).casefold()).strip()
+
+def klasa_klucza(tryb: str) -> str:
+    """Zwraca nazwę klasy klucza dla trybu wyszukiwania (np. 'deep research' -> 'deep_research')."""
+    return tryb.strip().lower().replace(" ", "_")
+
+def kontekst_klucza(tryb: str = "auto", model: Optional[str] = None,
+                    źródła: Iterable[str] = ("web",), język: str = "en-US") -> Tuple[str, ...]:
+    """Zwraca znormalizowane parametry zapytania (bez treści), które muszą się zgadzać, by odpowiedź pasowała."""
+    return (
+        klasa_klucza(tryb),
+        (model or "").lower(),
+        ",".join(sorted(set(źródła))),
+        język.lower(),
+    )
+
+def zbuduj_klucz(prompt: str, tryb: str = "auto", model: Optional[str] = None,
+                 źródła: Iterable[str] = ("web",), język: str = "en-US") -> KluczCache:
+    """Buduje klucz cache ze znormalizowanego zapytania, trybu, modelu, źródeł i języka."""
+    części = (normalizuj_prompt(prompt),) + kontekst_klucza(tryb, model, źródła, język)
+    # Separator spoza tekstu zapytania, aby różne części nie mogły się skleić w ten sam klucz
+    skrót = hashlib.sha256("\x1f".join(części).encode("utf-8")).hexdigest()
+    return KluczCache(klasa_klucza(tryb), skrót)
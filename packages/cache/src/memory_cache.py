@@ -1,39 +1,251 @@
+import asyncio
+import sys
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
 from cachetools import TTLCache
 
+from .tinylfu import PamięćTinyLFU
+
+_BRAK = object()
+
+def rozmiar_wartości(v: Any) -> int:
+    """Zwraca przybliżony rozmiar wartości w pamięci, wliczając zawartość list, krotek, zbiorów i słowników."""
+    rozmiar, do_zliczenia, widziane = 0, [v], set()
+    while do_zliczenia:
+        x = do_zliczenia.pop()
+        if id(x) in widziane:
+            continue
+        widziane.add(id(x))
+        rozmiar += sys.getsizeof(x)
+        if isinstance(x, dict):
+            do_zliczenia.extend(x.keys())
+            do_zliczenia.extend(x.values())
+        elif isinstance(x, (list, tuple, set, frozenset)):
+            do_zliczenia.extend(x)
+    return rozmiar
+
+class WartośćZTtl(NamedTuple):
+    """Wynik ładowarki z własnym czasem ważności (np. pozostałym TTL wpisu z L2) zamiast pełnego TTL cache."""
+    wartość: Any
+    ttl: Optional[float]
+
+class _Skompresowane:
+    """Wartość przechowywana w postaci skompresowanej (zlib)."""
+    __slots__ = ('dane', 'tekst')
+
+    def __init__(self, dane: bytes, tekst: bool):
+        self.dane, self.tekst = dane, tekst
+
+    def wartość(self):
+        dane = zlib.decompress(self.dane)
+        return dane.decode('utf-8') if self.tekst else dane
+
 class PamięćLRU:
-    """Cache w pamięci z TTL i ograniczeniem liczby wpisów."""
-    def __init__(self, max_entries: int = 1000, ttl: int = 3600):
-        if max_entries < 0 or ttl < 0:
-             raise ValueError("max_entries i ttl muszą być >= 0")
+    """Cache w pamięci z TTL i ograniczeniem liczby wpisów.
+
+    Z okresem łaski (okres_łaski > 0) wpis po upływie TTL jest jeszcze przez ten czas przechowywany:
+    pobierz_lub_odswiez() zwraca go od razu jako przeterminowany i odświeża w tle. Często czytane wpisy
+    (min_trafień) są odświeżane z wyprzedzeniem, gdy zostało im mniej niż odświeżanie_z_wyprzedzeniem * ttl.
+    Liczba równoległych odświeżeń w tle jest ograniczona przez max_odświeżań; kilka instancji może dzielić
+    ten limit przez wspólny zbiór zadania_odświeżania.
+
+    Z max_bajtów > 0 limitem jest budżet bajtów zamiast liczby wpisów: liczy się rzeczywisty rozmiar każdego
+    wpisu, a najdawniej używane wpisy są usuwane, gdy budżet zostanie przekroczony. Tekst i bajty od
+    próg_kompresji bajtów wzwyż są przechowywane skompresowane (zlib), jeśli to zmniejsza ich rozmiar.
+
+    polityka: 'lru' (TTLCache) albo 'tinylfu' (PamięćTinyLFU - odporna na serie jednorazowych kluczy).
+    """
+    def __init__(self, max_entries: int = 1000, ttl: int = 3600, okres_łaski: int = 0,
+                 odświeżanie_z_wyprzedzeniem: float = 0.0, min_trafień: int = 3, max_odświeżań: int = 2,
+                 zadania_odświeżania: Optional[set] = None, max_bajtów: int = 0, próg_kompresji: int = 0,
+                 poziom_kompresji: int = 6, polityka: str = "lru"):
+        if max_entries < 0 or ttl < 0 or okres_łaski < 0 or max_bajtów < 0 or próg_kompresji < 0:
+             raise ValueError("max_entries, ttl, okres_łaski, max_bajtów i próg_kompresji muszą być >= 0")
+        if polityka not in ("lru", "tinylfu"):
+             raise ValueError(f"Nieznana polityka cache: {polityka}")
+        self.polityka = polityka
+        self.ttl = ttl if ttl > 0 else float('inf')
+        self.okres_łaski = okres_łaski
+        self.odświeżanie_z_wyprzedzeniem = odświeżanie_z_wyprzedzeniem
+        self.min_trafień = min_trafień
+        self.max_bajtów = max_bajtów
+        self.próg_kompresji = próg_kompresji
+        self.poziom_kompresji = poziom_kompresji
         # maxsize=0 oznacza brak limitu rozmiaru, ttl=0 oznacza brak limitu czasu
-        self.cache = TTLCache(maxsize=max_entries if max_entries > 0 else float('inf'),
-                              ttl=ttl if ttl > 0 else float('inf'))
+        # Wpisy żyją w TTLCache przez ttl + okres łaski; własny termin ważności (ttl) jest w samym wpisie
+        klasa_cache = PamięćTinyLFU if polityka == "tinylfu" else TTLCache
+        if max_bajtów > 0:
+            # Budżet bajtów: cache sumuje rozmiary wpisów zapisane w samych wpisach
+            self.cache = klasa_cache(maxsize=max_bajtów, ttl=self.ttl + okres_łaski, getsizeof=lambda wpis: wpis[3])
+        else:
+            self.cache = klasa_cache(maxsize=max_entries if max_entries > 0 else float('inf'),
+                                     ttl=self.ttl + okres_łaski)
+        # TTLCache nie liczy trafień, więc liczymy je sami
+        self.hits = 0
+        self.misses = 0
+        self.przeterminowane = 0 # Trafienia obsłużone przeterminowanym wpisem
+        self.odświeżenia = 0 # Uruchomione odświeżenia w tle
+        self.odrzucone_odświeżenia = 0 # Odświeżenia pominięte z braku wolnego miejsca
+        self.max_odświeżań = max_odświeżań
+        self._odświeżane: Dict[Any, asyncio.Task] = {}
+        self._zadania = zadania_odświeżania if zadania_odświeżania is not None else set()
 
-    def get(self, k):
-        """Pobiera wartość z cache po kluczu."""
+    def _nowy_wpis(self, v, ttl: Optional[float] = None) -> list:
+        """Tworzy wpis [wartość, termin ważności, trafienia, rozmiar zapisany, rozmiar surowy]."""
+        rozmiar = rozmiar_wartości(v)
+        wygasa = self.cache.timer() + (self.ttl if ttl is None else min(ttl, self.ttl))
+        if self.próg_kompresji and isinstance(v, (str, bytes)):
+            surowe = v.encode('utf-8') if isinstance(v, str) else v
+            if len(surowe) >= self.próg_kompresji:
+                dane = zlib.compress(surowe, self.poziom_kompresji)
+                if sys.getsizeof(dane) < rozmiar:
+                    return [_Skompresowane(dane, isinstance(v, str)), wygasa, 0, sys.getsizeof(dane), rozmiar]
+        return [v, wygasa, 0, rozmiar, rozmiar]
+
+    @staticmethod
+    def _wartość(wpis):
+        v = wpis[0]
+        return v.wartość() if isinstance(v, _Skompresowane) else v
+
+    def _wpis(self, k):
+        """Zwraca wpis [wartość, termin ważności, trafienia, rozmiar zapisany, rozmiar surowy] lub None."""
         try:
             return self.cache.get(k)
         except Exception:
             # Ignoruj błędy cache, np. podczas iteracji lub czyszczenia w tle
             return None
 
-    def set(self, k, v):
-        """Ustawia wartość w cache dla danego klucza."""
+    def get(self, k, zliczaj: bool = True):
+        """Pobiera wartość z cache po kluczu (tylko wpisy w terminie ważności).
+
+        zliczaj: czy wliczać odczyt do trafień i chybień (False np. dla trafień przez podobne zapytanie).
+        """
+        wpis = self._wpis(k)
+        if wpis is None or wpis[1] <= self.cache.timer():
+            if zliczaj:
+                self.misses += 1
+            return None
+        if zliczaj:
+            self.hits += 1
+        wpis[2] += 1
+        return self._wartość(wpis)
+
+    def set(self, k, v, ttl: Optional[float] = None):
+        """Ustawia wartość w cache dla danego klucza.
+
+        ttl: czas ważności wpisu w sekundach (najwyżej TTL cache); None oznacza pełny TTL cache.
+        """
         try:
-            self.cache[k] = v
+            self.cache[k] = self._nowy_wpis(v, ttl)
         except Exception:
             # Ignoruj błędy ustawiania w cache
             pass
 
+    def _ustaw_wynik(self, k, v) -> Any:
+        """Zapisuje wynik ładowarki (także WartośćZTtl) i zwraca samą wartość."""
+        if isinstance(v, WartośćZTtl):
+            self.set(k, v.wartość, v.ttl)
+            return v.wartość
+        self.set(k, v)
+        return v
+
+    def eksportuj(self):
+        """Zwraca listę (klucz, zapisana wartość, termin ważności jako time.time(), rozmiar surowy) wpisów, także w okresie łaski.
+
+        Termin ważności jest bezwzględny (czas zegarowy), bo zegar cache (monotoniczny) nie przeżywa restartu.
+        """
+        teraz, teraz_zegarowo = self.cache.timer(), time.time()
+        try:
+            # items() nie zmienia kolejności wypierania ani liczników popularności
+            wpisy = list(self.cache.items())
+        except Exception:
+            return []
+        return [(k, wpis[0], teraz_zegarowo + wpis[1] - teraz, wpis[4]) for k, wpis in wpisy if wpis[1] - teraz > -self.okres_łaski]
+
+    def importuj(self, k, v, wygasa: float, rozmiar_surowy: int):
+        """Przywraca wpis z eksportuj(), jeśli nie wygasł (z okresem łaski) i pod kluczem nie ma jeszcze nowszego wpisu."""
+        # Czas od zapisu (także przestój procesu) jest odliczany od TTL
+        pozostało = wygasa - time.time()
+        if pozostało <= -self.okres_łaski or self._wpis(k) is not None:
+            return
+        rozmiar = sys.getsizeof(v.dane) if isinstance(v, _Skompresowane) else rozmiar_wartości(v)
+        try:
+            self.cache[k] = [v, self.cache.timer() + pozostało, 0, rozmiar, rozmiar_surowy]
+        except Exception:
+            pass
+
+    def usuń(self, k):
+        """Usuwa wpis z cache (brak wpisu nie jest błędem)."""
+        try:
+            self.cache.pop(k, None)
+        except Exception:
+            pass
+
+    async def pobierz_lub_odswiez(self, k, ładowarka: Callable[[], Awaitable[Any]]) -> Any:
+        """Zwraca wartość z cache, w razie potrzeby ładując ją (ładowarka) lub odświeżając w tle.
+
+        Ładowarka może zwrócić WartośćZTtl, aby wpis wygasł wcześniej niż po pełnym TTL.
+        """
+        wpis = self._wpis(k)
+        # Wpis przywrócony ze snapshotu może w TTLCache przeżyć swój okres łaski
+        pozostało = wpis[1] - self.cache.timer() if wpis is not None else 0
+        if wpis is None or pozostało <= -self.okres_łaski:
+            self.misses += 1
+            return self._ustaw_wynik(k, await ładowarka())
+
+        self.hits += 1
+        wpis[2] += 1
+        if pozostało <= 0:
+            # Przeterminowany, ale w okresie łaski: zwróć od razu, odśwież w tle
+            self.przeterminowane += 1
+            self._odśwież_w_tle(k, ładowarka)
+        elif wpis[2] >= self.min_trafień and pozostało < self.odświeżanie_z_wyprzedzeniem * self.ttl:
+            # Popularny wpis blisko końca ważności: odśwież z wyprzedzeniem
+            self._odśwież_w_tle(k, ładowarka)
+        return self._wartość(wpis)
+
+    def _odśwież_w_tle(self, k, ładowarka: Callable[[], Awaitable[Any]]):
+        """Uruchamia odświeżenie klucza w tle, jeśli nie trwa już i jest wolne miejsce."""
+        if k in self._odświeżane:
+            return
+        if len(self._zadania) >= self.max_odświeżań:
+            self.odrzucone_odświeżenia += 1
+            return
+        self.odświeżenia += 1
+        zadanie = asyncio.ensure_future(self._odśwież(k, ładowarka))
+        self._odświeżane[k] = zadanie
+        self._zadania.add(zadanie)
+        zadanie.add_done_callback(self._zadania.discard)
+
+    async def _odśwież(self, k, ładowarka: Callable[[], Awaitable[Any]]):
+        try:
+            self._ustaw_wynik(k, await ładowarka())
+        except Exception:
+            # Nieudane odświeżenie zostawia stary wpis do końca okresu łaski
+            pass
+        finally:
+            self._odświeżane.pop(k, None)
+
     def stat(self):
         """Zwraca statystyki cache."""
         try:
+            wpisy = list(self.cache.values())
+            bajty = sum(wpis[3] for wpis in wpisy)
+            bajty_surowe = sum(wpis[4] for wpis in wpisy)
             return dict(
-                len=len(self.cache),
+                len=len(wpisy),
                 max_size=self.cache.maxsize,
-                ttl=self.cache.ttl,
-                hits=getattr(self.cache, 'hits', 0), # cachetools 5+ ma hits/misses
-                misses=getattr(self.cache, 'misses', 0)
+                policy=self.polityka,
+                ttl=self.ttl,
+                bytes=bajty,
+                raw_bytes=bajty_surowe,
+                compression_ratio=bajty_surowe / bajty if bajty else 1.0,
+                hits=self.hits,
+                misses=self.misses,
+                stale_hits=self.przeterminowane,
+                refreshes=self.odświeżenia,
+                refreshes_skipped=self.odrzucone_odświeżenia
             )
         except Exception:
             return dict(len=len(self.cache), error="Błąd statystyk cache")
@@ -44,3 +256,74 @@ class PamięćLRU:
             self.cache.clear()
         except Exception:
             pass # Ignoruj błędy czyszczenia
+
+class PamięćKlasowa:
+    """Cache podzielony na klasy kluczy (KluczCache.klasa), każda z własnym TTL i limitem wpisów.
+
+    polityki: słownik klasa -> {"ttl": ..., "max_entries": ..., "grace": ..., "max_bytes": ..., "compress_threshold": ..., "policy": ...};
+    brakujące wartości biorą domyślne. Budżet max_bytes (zastępujący max_entries) dotyczy każdej klasy osobno.
+    opcje: domyślne opcje odświeżania przekazywane do PamięćLRU (okres_łaski, odświeżanie_z_wyprzedzeniem, ...).
+    """
+    def __init__(self, polityki: Optional[Dict[str, Dict[str, int]]] = None, max_entries: int = 1000, ttl: int = 3600, **opcje):
+        self.polityki = polityki or {}
+        self.max_entries, self.ttl = max_entries, ttl
+        self.opcje = opcje
+        self.klasy: Dict[str, PamięćLRU] = {}
+        # Limit odświeżeń w tle jest wspólny dla wszystkich klas
+        self.zadania_odświeżania: set = set()
+
+    def _pamięć(self, klasa: str) -> PamięćLRU:
+        """Zwraca cache klasy, tworząc go przy pierwszym użyciu."""
+        pamięć = self.klasy.get(klasa)
+        if pamięć is None:
+            polityka = self.polityki.get(klasa) or {}
+            opcje = dict(self.opcje)
+            for klucz_polityki, opcja in (("grace", "okres_łaski"), ("max_bytes", "max_bajtów"), ("compress_threshold", "próg_kompresji"), ("policy", "polityka")):
+                if klucz_polityki in polityka:
+                    opcje[opcja] = polityka[klucz_polityki]
+            pamięć = PamięćLRU(polityka.get("max_entries", self.max_entries), polityka.get("ttl", self.ttl),
+                               zadania_odświeżania=self.zadania_odświeżania, **opcje)
+            self.klasy[klasa] = pamięć
+        return pamięć
+
+    def get(self, k, zliczaj: bool = True) -> Any:
+        """Pobiera wartość z cache klasy klucza."""
+        return self._pamięć(k.klasa).get(k.skrót, zliczaj)
+
+    def set(self, k, v, ttl: Optional[float] = None):
+        """Ustawia wartość w cache klasy klucza (ttl: czas ważności wpisu, None = TTL klasy)."""
+        self._pamięć(k.klasa).set(k.skrót, v, ttl)
+
+    def usuń(self, k):
+        """Usuwa wpis z cache klasy klucza."""
+        self._pamięć(k.klasa).usuń(k.skrót)
+
+    def ttl_klasy(self, klasa: str) -> float:
+        """Zwraca TTL (w sekundach) klasy kluczy."""
+        return self._pamięć(klasa).ttl
+
+    async def pobierz_lub_odswiez(self, k, ładowarka: Callable[[], Awaitable[Any]]) -> Any:
+        """Zwraca wartość z cache klasy klucza, ładując ją lub odświeżając w tle (zob. PamięćLRU)."""
+        return await self._pamięć(k.klasa).pobierz_lub_odswiez(k.skrót, ładowarka)
+
+    def stat(self):
+        """Zwraca statystyki łączne i dla każdej klasy kluczy."""
+        klasy = {nazwa: pamięć.stat() for nazwa, pamięć in self.klasy.items()}
+        bajty = sum(st.get('bytes', 0) for st in klasy.values())
+        bajty_surowe = sum(st.get('raw_bytes', 0) for st in klasy.values())
+        return dict(
+            len=sum(st.get('len', 0) for st in klasy.values()),
+            hits=sum(st.get('hits', 0) for st in klasy.values()),
+            misses=sum(st.get('misses', 0) for st in klasy.values()),
+            stale_hits=sum(st.get('stale_hits', 0) for st in klasy.values()),
+            bytes=bajty,
+            raw_bytes=bajty_surowe,
+            compression_ratio=bajty_surowe / bajty if bajty else 1.0,
+            refreshes=sum(st.get('refreshes', 0) for st in klasy.values()),
+            klasy=klasy
+        )
+
+    def clear(self):
+        """Czyści cache wszystkich klas."""
+        for pamięć in self.klasy.values():
+            pamięć.clear()
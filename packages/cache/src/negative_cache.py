@@ -0,0 +1,47 @@
+from typing import Hashable, Optional, Tuple
+from cachetools import TTLCache
+
+class PamięćNegatywna:
+    """Krótkotrwały cache błędów deterministycznych (np. błędne zapytanie, odmowa treści).
+
+    Kolejne zapytania o ten sam klucz dostają zapamiętany błąd od razu, bez wywołania upstream i bez
+    ponawiania prób. Błędy przejściowe (timeouty, 5xx) nie powinny tu trafiać - decyduje o tym wywołujący.
+    Zapamiętywany jest tylko komunikat i status błędu (bez wyjątku i jego ramek), a wywołujący zgłasza
+    za każdym razem nowy wyjątek.
+    """
+    def __init__(self, ttl: int = 60, max_entries: int = 10000):
+        if ttl <= 0 or max_entries <= 0:
+             raise ValueError("ttl i max_entries muszą być > 0")
+        self.ttl = ttl
+        self.cache = TTLCache(maxsize=max_entries, ttl=ttl)
+        self.hits = 0 # Zapytania zakończone od razu zapamiętanym błędem
+        self.zapisane = 0 # Liczba zapamiętanych błędów
+
+    def get(self, k: Hashable) -> Optional[Tuple[str, Optional[int]]]:
+        """Zwraca zapamiętany błąd dla klucza jako (komunikat, status) lub None."""
+        błąd = self.cache.get(k)
+        if błąd is not None:
+            self.hits += 1
+        return błąd
+
+    def set(self, k: Hashable, błąd: Exception):
+        """Zapamiętuje komunikat i status (atrybut status, jeśli jest) błędu dla klucza na ttl sekund."""
+        self.cache[k] = (str(błąd), getattr(błąd, "status", None))
+        self.zapisane += 1
+
+    def usuń(self, k: Hashable):
+        """Usuwa zapamiętany błąd (brak wpisu nie jest błędem)."""
+        self.cache.pop(k, None)
+
+    def stat(self):
+        """Zwraca statystyki cache błędów."""
+        return dict(
+            len=len(self.cache),
+            ttl=self.ttl,
+            hits=self.hits,
+            stored=self.zapisane
+        )
+
+    def clear(self):
+        """Czyści cache błędów."""
+        self.cache.clear()
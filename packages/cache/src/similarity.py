@@ -0,0 +1,189 @@
+import re
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Set
+
+from .keys import normalizuj_prompt
+
+_M64 = (1 << 64) - 1
+_SŁOWA = re.compile(r"\w+")
+# Skróty przeczeń ("don't" -> "do not"); "can't" i "won't" osobno, bo mają inny rdzeń
+_PRZECZENIA_SKRÓCONE = ((re.compile(r"\bcan['’]t\b"), "can not"), (re.compile(r"\bwon['’]t\b"), "will not"),
+                        (re.compile(r"n['’]t\b"), " not"))
+# Bity skrótu shingla poniżej tej pozycji wybierają kubełek, wyższe są wartością (stąd limit 2048 permutacji)
+_BITY_KUBEŁKA = 11
+_PUSTY = (1 << 64) - 1
+
+# Słowa-wypełniacze i słowa funkcyjne pomijane przy porównywaniu zapytań
+DOMYŚLNE_POMIJANE = frozenset((
+    "a", "an", "the", "please", "pls", "plz", "hi", "hey", "hello", "thanks", "thank", "you",
+    "can", "could", "would", "kindly", "just", "me", "tell", "um", "uh",
+    "what", "s", "is", "are", "of", "in", "on", "do", "does", "i", "my", "for",
+))
+# Przeczenia zmieniają sens zapytania - muszą się zgadzać dokładnie
+PRZECZENIA = frozenset(("not", "no", "never", "without", "none", "nor", "cannot", "neither", "nothing"))
+
+class IndeksPodobieństwa:
+    """Indeks MinHash/LSH prawie identycznych zapytań, do przybliżonych trafień w cache.
+
+    Zapytanie jest normalizowane (normalizuj_prompt), dzielone na słowa bez interpunkcji i słów-wypełniaczy,
+    a shinglami są słowa i pary sąsiednich słów (z granicami zapytania), więc kolejność słów ma znaczenie:
+    "paris to london" nie pasuje do "london to paris". Liczby i przeczenia muszą się zgadzać dokładnie
+    ("2021" nie pasuje do "2020") - są częścią kontekstu zapytania. Sygnatura MinHash liczona jest jednym
+    haszowaniem shingla (one permutation hashing z densyfikacją), a pasma sygnatury trafiają do wspólnej
+    tablicy kubełków LSH. Kandydaci z kubełków są weryfikowani dokładnym podobieństwem Jaccarda shingli.
+
+    próg: minimalne podobieństwo Jaccarda (0-1) dla trafienia.
+    permutacje, pasma: długość sygnatury i liczba pasm LSH (permutacje musi dzielić się przez pasma).
+    kontekst: parametry, które muszą się zgadzać (np. keys.kontekst_klucza) - porównywane są tylko
+    zapytania o tym samym kontekście.
+    """
+    def __init__(self, próg: float = 0.8, permutacje: int = 64, pasma: int = 16, max_wpisów: int = 100_000,
+                 pomijane: Iterable[str] = DOMYŚLNE_POMIJANE):
+        if permutacje % pasma or not 0 < permutacje <= 1 << _BITY_KUBEŁKA or permutacje & (permutacje - 1):
+            raise ValueError("permutacje musi być potęgą dwójki (do 2048) podzielną przez liczbę pasm")
+        self.próg = próg
+        self.permutacje = permutacje
+        self.pasma = pasma
+        self.max_wpisów = max_wpisów
+        self.pomijane: FrozenSet[str] = frozenset(pomijane) - PRZECZENIA
+        self._wpisy: OrderedDict = OrderedDict() # klucz -> (kontekst, sygnatura, skróty shingli)
+        self._kubełki: Dict[int, Any] = {} # skrót pasma -> klucz albo lista kluczy
+        self.wyszukiwania = 0
+        self.trafienia = 0 # Trafienia w cache przez podobne zapytanie (zliczane przez wywołującego)
+
+    def słowa(self, prompt: str) -> List[str]:
+        """Zwraca słowa zapytania w kolejności, bez interpunkcji i słów-wypełniaczy."""
+        tekst = normalizuj_prompt(prompt)
+        for wzorzec, zamiana in _PRZECZENIA_SKRÓCONE:
+            tekst = wzorzec.sub(zamiana, tekst)
+        return [słowo for słowo in _SŁOWA.findall(tekst) if słowo not in self.pomijane]
+
+    def shingle(self, prompt: str) -> Set[str]:
+        """Zwraca zbiór shingli zapytania: słowa oraz pary sąsiednich słów z granicami zapytania."""
+        słowa = self.słowa(prompt)
+        if not słowa:
+            return set()
+        granice = ["^"] + słowa + ["$"]
+        return set(słowa) | {f"{a} {b}" for a, b in zip(granice, granice[1:])}
+
+    def _kontekst(self, prompt: str, kontekst: Hashable) -> Hashable:
+        # Liczby i przeczenia muszą się zgadzać dokładnie, więc trafiają do kontekstu (i skrótów pasm)
+        dokładne = tuple(sorted(słowo for słowo in self.słowa(prompt)
+                                if słowo in PRZECZENIA or any(znak.isdigit() for znak in słowo)))
+        return (kontekst, dokładne) if dokładne else kontekst
+
+    def sygnatura(self, prompt: str) -> Optional[array]:
+        """Zwraca sygnaturę MinHash zapytania lub None, gdy nie ma w nim żadnych słów."""
+        skróty = self._skróty_shingli(prompt)
+        return self._sygnatura(skróty) if skróty else None
+
+    def _skróty_shingli(self, prompt: str) -> array:
+        return array('Q', sorted(hash(s) & _M64 for s in self.shingle(prompt)))
+
+    def _sygnatura(self, skróty: array) -> array:
+        maska = self.permutacje - 1
+        syg = [_PUSTY] * self.permutacje
+        for h in skróty:
+            i = h & maska
+            v = h >> _BITY_KUBEŁKA
+            if v < syg[i]:
+                syg[i] = v
+        # Densyfikacja: pusty kubełek przejmuje wartość najbliższego niepustego na prawo, przesuniętą o odległość
+        if _PUSTY in syg:
+            for i in range(self.permutacje):
+                if syg[i] == _PUSTY:
+                    for odległość in range(1, self.permutacje):
+                        v = syg[(i + odległość) & maska]
+                        if v < 1 << (64 - _BITY_KUBEŁKA):
+                            syg[i] = v + (odległość << (64 - _BITY_KUBEŁKA))
+                            break
+        return array('Q', syg)
+
+    def _skróty_pasm(self, kontekst: Hashable, syg: array) -> List[int]:
+        # Pasmo bierze co pasma-tą pozycję: sąsiednie kubełki mogą mieć po densyfikacji tę samą wartość źródłową
+        return [hash((kontekst, p, tuple(syg[p::self.pasma]))) for p in range(self.pasma)]
+
+    @staticmethod
+    def podobieństwo(a: array, b: array) -> float:
+        """Zwraca podobieństwo Jaccarda zbiorów skrótów shingli."""
+        a, b = set(a), set(b)
+        return len(a & b) / len(a | b) if a or b else 0.0
+
+    def dodaj(self, prompt: str, klucz: Hashable, kontekst: Hashable = None):
+        """Indeksuje zapytanie pod kluczem cache (najstarsze wpisy są usuwane powyżej max_wpisów)."""
+        skróty = self._skróty_shingli(prompt)
+        if not skróty:
+            return
+        self.usuń(klucz)
+        kontekst = self._kontekst(prompt, kontekst)
+        syg = self._sygnatura(skróty)
+        self._wpisy[klucz] = (kontekst, syg, skróty)
+        for skrót in self._skróty_pasm(kontekst, syg):
+            kubełek = self._kubełki.get(skrót)
+            if kubełek is None:
+                self._kubełki[skrót] = klucz
+            elif isinstance(kubełek, list):
+                kubełek.append(klucz)
+            else:
+                self._kubełki[skrót] = [kubełek, klucz]
+        while len(self._wpisy) > self.max_wpisów:
+            self.usuń(next(iter(self._wpisy)))
+
+    def usuń(self, klucz: Hashable):
+        """Usuwa klucz z indeksu (brak klucza nie jest błędem)."""
+        wpis = self._wpisy.pop(klucz, None)
+        if wpis is None:
+            return
+        for skrót in self._skróty_pasm(*wpis[:2]):
+            kubełek = self._kubełki.get(skrót)
+            if isinstance(kubełek, list):
+                kubełek.remove(klucz)
+                if len(kubełek) == 1:
+                    self._kubełki[skrót] = kubełek[0]
+            elif kubełek == klucz:
+                del self._kubełki[skrót]
+
+    def znajdź(self, prompt: str, kontekst: Hashable = None) -> Optional[Hashable]:
+        """Zwraca klucz najbardziej podobnego zapytania o tym samym kontekście (co najmniej próg) lub None."""
+        self.wyszukiwania += 1
+        skróty = self._skróty_shingli(prompt)
+        if not skróty:
+            return None
+        kontekst = self._kontekst(prompt, kontekst)
+        syg = self._sygnatura(skróty)
+        kandydaci = set()
+        for skrót in self._skróty_pasm(kontekst, syg):
+            kubełek = self._kubełki.get(skrót)
+            if isinstance(kubełek, list):
+                kandydaci.update(kubełek)
+            elif kubełek is not None:
+                kandydaci.add(kubełek)
+        najlepszy, najlepsze_podobieństwo = None, self.próg
+        for klucz in kandydaci:
+            kontekst_kandydata, _, skróty_kandydata = self._wpisy[klucz]
+            if kontekst_kandydata != kontekst:
+                continue # Kolizja skrótów pasm
+            podobieństwo = self.podobieństwo(skróty, skróty_kandydata)
+            if podobieństwo >= najlepsze_podobieństwo:
+                najlepszy, najlepsze_podobieństwo = klucz, podobieństwo
+        return najlepszy
+
+    def __len__(self):
+        return len(self._wpisy)
+
+    def __contains__(self, klucz: Hashable):
+        return klucz in self._wpisy
+
+    def stat(self):
+        """Zwraca statystyki indeksu."""
+        return dict(
+            len=len(self._wpisy),
+            lookups=self.wyszukiwania,
+            fuzzy_hits=self.trafienia
+        )
+
+    def clear(self):
+        """Czyści indeks."""
+        self._wpisy.clear()
+        self._kubełki.clear()
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+import struct
+import tempfile
+import threading
+from typing import Any, List, Tuple
+
+from .memory_cache import PamięćKlasowa, _Skompresowane
+
+# Nagłówek pliku: magia i wersja formatu
+_MAGIA = b"PPXC\x02"
+# Rekord: długość klasy, długość klucza, długość wartości, rozmiar surowy, termin ważności (time.time())
+_REKORD = struct.Struct("<HHIId")
+# Znacznik typu zapisanej wartości
+_TEKST, _BAJTY, _JSON, _ZLIB_TEKST, _ZLIB_BAJTY = b"s", b"b", b"j", b"z", b"x"
+
+Rekord = Tuple[str, str, Any, float, int]
+
+# Zapisy w procesie są kolejne: anulowany zapis okresowy, którego wątek jeszcze trwa, nie nadpisze późniejszego
+_ZAPIS = threading.Lock()
+
+def _koduj(v: Any) -> bytes:
+    # Skompresowane wartości zostają skompresowane, bez ponownej kompresji przy wczytaniu
+    if isinstance(v, _Skompresowane):
+        return (_ZLIB_TEKST if v.tekst else _ZLIB_BAJTY) + v.dane
+    if isinstance(v, str):
+        return _TEKST + v.encode("utf-8")
+    if isinstance(v, bytes):
+        return _BAJTY + v
+    return _JSON + json.dumps(v, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def _dekoduj(dane: bytes) -> Any:
+    znacznik, treść = dane[:1], dane[1:]
+    if znacznik == _TEKST:
+        return treść.decode("utf-8")
+    if znacznik == _BAJTY:
+        return treść
+    if znacznik == _JSON:
+        return json.loads(treść)
+    if znacznik in (_ZLIB_TEKST, _ZLIB_BAJTY):
+        return _Skompresowane(treść, znacznik == _ZLIB_TEKST)
+    raise ValueError(f"Nieznany format wpisu snapshotu: {znacznik!r}")
+
+def _l1(pamięć) -> PamięćKlasowa:
+    # Dla cache dwuwarstwowego snapshot obejmuje tylko lokalne L1 (L2 przeżywa restart sam)
+    return getattr(pamięć, "l1", pamięć)
+
+def eksportuj(pamięć: PamięćKlasowa) -> List[Rekord]:
+    """Zbiera wpisy wszystkich klas jako rekordy (klasa, klucz, wartość, termin ważności, rozmiar surowy)."""
+    return [(klasa, k, v, wygasa, rozmiar_surowy)
+            for klasa, pamięć_klasy in list(_l1(pamięć).klasy.items())
+            for k, v, wygasa, rozmiar_surowy in pamięć_klasy.eksportuj()]
+
+def zapisz_rekordy(rekordy: List[Rekord], ścieżka: str) -> int:
+    """Zapisuje rekordy do pliku w zwartym formacie binarnym, podmieniając go atomowo. Zwraca liczbę wpisów."""
+    katalog = os.path.dirname(ścieżka)
+    if katalog:
+        os.makedirs(katalog, exist_ok=True)
+    # Unikalny plik tymczasowy: równoległe zapisy (okresowy, przy zamknięciu, inne workery) nie piszą do tego samego
+    fd, tymczasowa = tempfile.mkstemp(dir=katalog or ".", prefix=f"{os.path.basename(ścieżka)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_MAGIA)
+            for klasa, k, v, wygasa, rozmiar_surowy in rekordy:
+                klasa_b, k_b, v_b = klasa.encode("utf-8"), str(k).encode("utf-8"), _koduj(v)
+                f.write(_REKORD.pack(len(klasa_b), len(k_b), len(v_b), rozmiar_surowy, wygasa))
+                f.write(klasa_b)
+                f.write(k_b)
+                f.write(v_b)
+        with _ZAPIS:
+            os.replace(tymczasowa, ścieżka)
+    except BaseException:
+        if os.path.exists(tymczasowa):
+            os.unlink(tymczasowa)
+        raise
+    return len(rekordy)
+
+def wczytaj_rekordy(ścieżka: str) -> List[Rekord]:
+    """Wczytuje rekordy zapisane przez zapisz_rekordy()."""
+    with open(ścieżka, "rb") as f:
+        dane = f.read()
+    if not dane.startswith(_MAGIA):
+        raise ValueError(f"Nieznany format snapshotu cache: {ścieżka}")
+    rekordy, pozycja = [], len(_MAGIA)
+    widok = memoryview(dane)
+    while pozycja < len(dane):
+        dł_klasy, dł_klucza, dł_wartości, rozmiar_surowy, wygasa = _REKORD.unpack_from(dane, pozycja)
+        pozycja += _REKORD.size
+        klasa = bytes(widok[pozycja:pozycja + dł_klasy]).decode("utf-8")
+        pozycja += dł_klasy
+        k = bytes(widok[pozycja:pozycja + dł_klucza]).decode("utf-8")
+        pozycja += dł_klucza
+        v = _dekoduj(bytes(widok[pozycja:pozycja + dł_wartości]))
+        pozycja += dł_wartości
+        rekordy.append((klasa, k, v, wygasa, rozmiar_surowy))
+    return rekordy
+
+async def zapisz_snapshot(pamięć: PamięćKlasowa, ścieżka: str) -> int:
+    """Zapisuje snapshot cache; wpisy są zbierane w pętli zdarzeń, a plik zapisywany w wątku."""
+    return await asyncio.to_thread(zapisz_rekordy, eksportuj(pamięć), ścieżka)
+
+async def wczytaj_snapshot(pamięć: PamięćKlasowa, ścieżka: str, partia: int = 1000) -> int:
+    """Wczytuje snapshot w wątku i przywraca wpisy partiami, nie blokując pętli zdarzeń.
+
+    Wpisy wygasłe od zapisu (z okresem łaski klasy) są pomijane. Zwraca liczbę rekordów w pliku.
+    """
+    if not os.path.exists(ścieżka):
+        return 0
+    rekordy = await asyncio.to_thread(wczytaj_rekordy, ścieżka)
+    pamięć = _l1(pamięć)
+    for i, (klasa, k, v, wygasa, rozmiar_surowy) in enumerate(rekordy, 1):
+        # Wpisy zapisane od startu są nowsze niż te ze snapshotu i nie są nadpisywane
+        pamięć._pamięć(klasa).importuj(k, v, wygasa, rozmiar_surowy)
+        if i % partia == 0:
+            await asyncio.sleep(0)
+    return len(rekordy)
+
+async def zapisuj_okresowo(pamięć: PamięćKlasowa, ścieżka: str, interwał: float):
+    """Zapisuje snapshot co interwał sekund (do anulowania zadania)."""
+    while True:
+        await asyncio.sleep(interwał)
+        try:
+            await zapisz_snapshot(pamięć, ścieżka)
+        except Exception:
+            # Nieudany zapis nie przerywa kolejnych prób
+            pass
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from .keys import KluczCache
+from .memory_cache import PamięćKlasowa, WartośćZTtl
+
+_BRAK = object()
+
+# Znacznik typu na początku zserializowanej wartości
+_TEKST = b"s"
+_JSON = b"j"
+
+def serializuj(v: Any) -> bytes:
+    """Serializuje wartość do zwartej postaci: tekst jako UTF-8, pozostałe wartości jako zwarty JSON."""
+    if isinstance(v, str):
+        return _TEKST + v.encode("utf-8")
+    return _JSON + json.dumps(v, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def deserializuj(dane: bytes) -> Any:
+    """Odtwarza wartość zapisaną przez serializuj()."""
+    znacznik, treść = dane[:1], dane[1:]
+    if znacznik == _TEKST:
+        return treść.decode("utf-8")
+    if znacznik == _JSON:
+        return json.loads(treść)
+    raise ValueError(f"Nieznany format wpisu cache: {znacznik!r}")
+
+class PamięćWarstwowa:
+    """Cache dwuwarstwowy: L1 w pamięci procesu (PamięćKlasowa) i L2 w Redisie, wspólny dla workerów.
+
+    Chybienie w L1 sprawdza L2, a dopiero potem woła ładowarkę; wynik trafia do obu warstw (w L2 z TTL
+    klasy klucza). Wpis przepisany z L2 do L1 dostaje pozostały czas życia wpisu w L2 (PTTL), a nie pełny
+    TTL, więc nie jest serwowany dłużej niż przez TTL od załadowania. Unieważnienie usuwa wpis z L2 i jest rozgłaszane kanałem pub/sub do L1 wszystkich
+    workerów. Błędy Redisa nie przerywają zapytań - cache działa wtedy jak samo L1.
+
+    redis: klient redis.asyncio.Redis (lub zgodny, np. fakeredis.aioredis.FakeRedis).
+    """
+    def __init__(self, l1: PamięćKlasowa, redis, prefiks: str = "perplexity:cache:", kanał: str = "perplexity:cache:unieważnij"):
+        self.l1 = l1
+        self.redis = redis
+        self.prefiks = prefiks
+        self.kanał = kanał
+        self.id_workera = uuid.uuid4().hex
+        self._nasłuch: Optional[asyncio.Task] = None
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.l2_błędy = 0
+        self.unieważnienia = 0
+
+    @classmethod
+    def z_url(cls, url: str, l1: PamięćKlasowa, **kwargs) -> "PamięćWarstwowa":
+        """Tworzy cache z L2 pod podanym adresem Redisa (wymaga pakietu redis)."""
+        import redis.asyncio as aioredis
+        return cls(l1, aioredis.from_url(url), **kwargs)
+
+    def _klucz_l2(self, k: KluczCache) -> str:
+        return f"{self.prefiks}{k}"
+
+    async def _pobierz_l2(self, k: KluczCache) -> Any:
+        """Zwraca WartośćZTtl (wartość i pozostały TTL wpisu w L2, None = bez wygasania) lub _BRAK."""
+        klucz = self._klucz_l2(k)
+        try:
+            # Wartość i jej pozostały czas życia w jednym przejściu do Redisa
+            dane, pttl = await self.redis.pipeline(transaction=False).get(klucz).pttl(klucz).execute()
+        except Exception:
+            self.l2_błędy += 1
+            return _BRAK
+        if dane is None or pttl == -2:
+            self.l2_misses += 1
+            return _BRAK
+        self.l2_hits += 1
+        return WartośćZTtl(deserializuj(dane), pttl / 1000 if pttl >= 0 else None)
+
+    async def _ustaw_l2(self, k: KluczCache, v: Any):
+        ttl = self.l1.ttl_klasy(k.klasa)
+        try:
+            await self.redis.set(self._klucz_l2(k), serializuj(v), ex=int(ttl) if ttl != float('inf') else None)
+        except Exception:
+            self.l2_błędy += 1
+
+    async def pobierz(self, k: KluczCache) -> Any:
+        """Pobiera wartość z L1, a przy chybieniu z L2 (zapisując ją wtedy w L1). Zwraca None przy braku."""
+        v = self.l1.get(k)
+        if v is not None:
+            return v
+        v = await self._pobierz_l2(k)
+        if v is _BRAK:
+            return None
+        self.l1.set(k, *v)
+        return v.wartość
+
+    async def ustaw(self, k: KluczCache, v: Any):
+        """Zapisuje wartość w obu warstwach."""
+        self.l1.set(k, v)
+        await self._ustaw_l2(k, v)
+
+    async def pobierz_lub_odswiez(self, k: KluczCache, ładowarka: Callable[[], Awaitable[Any]]) -> Any:
+        """Zwraca wartość z L1 (stale-while-revalidate), przy chybieniu lub odświeżeniu najpierw z L2, potem z ładowarki."""
+        async def z_l2() -> Any:
+            v = await self._pobierz_l2(k)
+            if v is _BRAK:
+                v = await ładowarka()
+                await self._ustaw_l2(k, v)
+            return v # Wpis z L2 (WartośćZTtl) wygaśnie w L1 razem z nim
+
+        return await self.l1.pobierz_lub_odswiez(k, z_l2)
+
+    async def unieważnij(self, k: KluczCache):
+        """Usuwa wpis z L2 i z L1 wszystkich workerów."""
+        self.l1.usuń(k)
+        self.unieważnienia += 1
+        try:
+            await self.redis.delete(self._klucz_l2(k))
+            await self.redis.publish(self.kanał, f"{self.id_workera} {k}")
+        except Exception:
+            self.l2_błędy += 1
+
+    async def start(self):
+        """Uruchamia nasłuch unieważnień z innych workerów."""
+        if self._nasłuch is None or self._nasłuch.done():
+            self._nasłuch = asyncio.create_task(self._nasłuchuj())
+
+    async def stop(self):
+        """Zatrzymuje nasłuch unieważnień i zamyka połączenie z Redisem."""
+        if self._nasłuch:
+            self._nasłuch.cancel()
+            try:
+                await self._nasłuch
+            except asyncio.CancelledError:
+                pass
+            self._nasłuch = None
+        try:
+            await self.redis.aclose()
+        except Exception:
+            pass
+
+    async def _nasłuchuj(self):
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.kanał)
+                async for wiadomość in pubsub.listen():
+                    if wiadomość.get("type") != "message":
+                        continue
+                    dane = wiadomość["data"]
+                    id_workera, klucz = (dane.decode() if isinstance(dane, bytes) else dane).split(" ", 1)
+                    if id_workera != self.id_workera:
+                        self.l1.usuń(KluczCache.z_tekstu(klucz))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Utrata połączenia: spróbuj ponownie za chwilę
+                self.l2_błędy += 1
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def stat(self):
+        """Zwraca statystyki L1 uzupełnione o statystyki L2."""
+        return dict(
+            self.l1.stat(),
+            l2_hits=self.l2_hits,
+            l2_misses=self.l2_misses,
+            l2_errors=self.l2_błędy,
+            invalidations=self.unieważnienia
+        )
+
+    def clear(self):
+        """Czyści L1 (L2 wygasa według TTL)."""
+        self.l1.clear()
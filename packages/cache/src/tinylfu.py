@@ -0,0 +1,187 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_BRAK = object()
+_M64 = (1 << 64) - 1
+# Nieparzyste stałe mieszające dla kolejnych wierszy szkicu
+_ZIARNA = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+# Tablica dla bytearray.translate: każdy licznik podzielony przez 2
+_POŁÓWKI = bytes(i >> 1 for i in range(256))
+
+class SzkicCountMin:
+    """Szkic count-min szacujący częstość kluczy w stałej pamięci (4 wiersze po szerokość liczników).
+
+    Liczniki są nasycane na 15, a po próbce 10 * szerokość zliczeń wszystkie są dzielone przez 2,
+    więc szkic zapomina dawną popularność (starzenie jak w TinyLFU).
+    """
+    def __init__(self, szerokość: int):
+        self.szerokość = 1 << max(4, (szerokość - 1).bit_length()) # Potęga dwójki, co najmniej 16
+        self._przesunięcie = 64 - (self.szerokość.bit_length() - 1)
+        self.liczniki = [bytearray(self.szerokość) for _ in _ZIARNA]
+        self.próbka = 10 * self.szerokość
+        self.zliczenia = 0
+
+    def _indeksy(self, k: Hashable):
+        h = hash(k) & _M64
+        return [((h * ziarno) & _M64) >> self._przesunięcie for ziarno in _ZIARNA]
+
+    def zwiększ(self, k: Hashable):
+        """Zlicza wystąpienie klucza."""
+        for wiersz, i in zip(self.liczniki, self._indeksy(k)):
+            if wiersz[i] < 15:
+                wiersz[i] += 1
+        self.zliczenia += 1
+        if self.zliczenia >= self.próbka:
+            self._postarz()
+
+    def szacuj(self, k: Hashable) -> int:
+        """Zwraca oszacowanie częstości klucza (minimum po wierszach)."""
+        return min(wiersz[i] for wiersz, i in zip(self.liczniki, self._indeksy(k)))
+
+    def _postarz(self):
+        for wiersz in self.liczniki:
+            wiersz[:] = wiersz.translate(_POŁÓWKI)
+        self.zliczenia //= 2
+
+class PamięćTinyLFU:
+    """Cache z polityką W-TinyLFU i TTL, zgodny z interfejsem TTLCache używanym przez PamięćLRU.
+
+    Nowe wpisy trafiają do małego okna LRU (okno * maxsize). Wypierany z okna kandydat wchodzi do części
+    głównej (SLRU: próbna i chroniona) tylko, jeśli szkic count-min ocenia go jako częstszego niż ofiarę,
+    więc jednorazowe zapytania z serii nie wypychają popularnych odpowiedzi. Wpisy wygasają po ttl.
+
+    maxsize: pojemność (liczba wpisów albo bajty, gdy podano getsizeof).
+    max_liczników: górny limit szerokości szkicu, ograniczający jego pamięć.
+    """
+    def __init__(self, maxsize: float, ttl: float, timer: Callable[[], float] = time.monotonic,
+                 getsizeof: Optional[Callable[[Any], int]] = None, okno: float = 0.01, max_liczników: int = 1 << 18):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.getsizeof = getsizeof or (lambda v: 1)
+        self._max_okna = maxsize * okno
+        główna = maxsize - self._max_okna
+        self._max_głównej = główna
+        self._max_chronionej = 0.8 * główna
+        # Segmenty: klucz -> (wartość, koniec ważności, rozmiar)
+        self._okno: OrderedDict = OrderedDict()
+        self._próbna: OrderedDict = OrderedDict()
+        self._chroniona: OrderedDict = OrderedDict()
+        self._rozmiary = {id(self._okno): 0, id(self._próbna): 0, id(self._chroniona): 0}
+        self.szkic = SzkicCountMin(int(min(maxsize, max_liczników)))
+
+    @property
+    def currsize(self):
+        return sum(self._rozmiary.values())
+
+    def __len__(self):
+        return len(self._okno) + len(self._próbna) + len(self._chroniona)
+
+    def _segment(self, k):
+        for segment in (self._okno, self._próbna, self._chroniona):
+            if k in segment:
+                return segment
+        return None
+
+    def _usuń_z(self, segment: OrderedDict, k):
+        wpis = segment.pop(k)
+        self._rozmiary[id(segment)] -= wpis[2]
+        return wpis
+
+    def _dodaj_do(self, segment: OrderedDict, k, wpis):
+        segment[k] = wpis
+        self._rozmiary[id(segment)] += wpis[2]
+
+    def __contains__(self, k):
+        return self.get(k, _BRAK, zliczaj=False) is not _BRAK
+
+    def get(self, k, default=None, zliczaj: bool = True):
+        """Zwraca wartość klucza (lub default), zliczając dostęp w szkicu i awansując wpis w SLRU."""
+        if zliczaj:
+            self.szkic.zwiększ(k)
+        segment = self._segment(k)
+        if segment is None:
+            return default
+        wpis = segment[k]
+        if wpis[1] <= self.timer():
+            self._usuń_z(segment, k)
+            return default
+        if not zliczaj:
+            return wpis[0]
+        if segment is self._próbna:
+            # Drugi dostęp w części głównej: awans do chronionej, nadmiar chronionej wraca do próbnej
+            self._dodaj_do(self._chroniona, k, self._usuń_z(self._próbna, k))
+            while self._rozmiary[id(self._chroniona)] > self._max_chronionej and len(self._chroniona) > 1:
+                stary = next(iter(self._chroniona))
+                self._dodaj_do(self._próbna, stary, self._usuń_z(self._chroniona, stary))
+        else:
+            segment.move_to_end(k)
+        return wpis[0]
+
+    def __getitem__(self, k):
+        v = self.get(k, _BRAK)
+        if v is _BRAK:
+            raise KeyError(k)
+        return v
+
+    def __setitem__(self, k, v):
+        rozmiar = self.getsizeof(v)
+        if rozmiar > self.maxsize:
+            raise ValueError('value too large')
+        wpis = (v, self.timer() + self.ttl, rozmiar)
+        segment = self._segment(k)
+        if segment is not None:
+            # Aktualizacja zostaje w swoim segmencie
+            self._usuń_z(segment, k)
+            self._dodaj_do(segment, k, wpis)
+            segment.move_to_end(k)
+        else:
+            self._dodaj_do(self._okno, k, wpis)
+        self._wypieraj()
+
+    def _wypieraj(self):
+        """Przenosi nadmiar okna do części głównej przez filtr TinyLFU i pilnuje pojemności."""
+        while self._rozmiary[id(self._okno)] > self._max_okna and len(self._okno) > 1:
+            kandydat, wpis = next(iter(self._okno.items()))
+            self._usuń_z(self._okno, kandydat)
+            self._przyjmij(kandydat, wpis)
+        # Okno większe niż jego limit (np. pojedynczy duży wpis) nie może przekroczyć całej pojemności
+        while self.currsize > self.maxsize and (self._próbna or self._chroniona):
+            self._wypchnij_ofiarę()
+
+    def _przyjmij(self, kandydat, wpis):
+        teraz = self.timer()
+        while self._rozmiary[id(self._próbna)] + self._rozmiary[id(self._chroniona)] + wpis[2] > self._max_głównej:
+            segment = self._próbna if self._próbna else self._chroniona
+            if not segment:
+                return # Kandydat większy niż cała część główna
+            ofiara, wpis_ofiary = next(iter(segment.items()))
+            if wpis_ofiary[1] > teraz and self.szkic.szacuj(kandydat) <= self.szkic.szacuj(ofiara):
+                return # Kandydat odrzucony - ofiara jest co najmniej tak popularna
+            self._usuń_z(segment, ofiara)
+        self._dodaj_do(self._próbna, kandydat, wpis)
+
+    def _wypchnij_ofiarę(self):
+        segment = self._próbna if self._próbna else self._chroniona
+        self._usuń_z(segment, next(iter(segment)))
+
+    def pop(self, k, default=None):
+        segment = self._segment(k)
+        if segment is None:
+            return default
+        wpis = self._usuń_z(segment, k)
+        return wpis[0] if wpis[1] > self.timer() else default
+
+    def items(self):
+        """Zwraca pary (klucz, wartość) ważnych wpisów bez zliczania dostępu."""
+        teraz = self.timer()
+        return [(k, wpis[0]) for segment in (self._okno, self._próbna, self._chroniona) for k, wpis in segment.items() if wpis[1] > teraz]
+
+    def values(self):
+        return [v for _, v in self.items()]
+
+    def clear(self):
+        for segment in (self._okno, self._próbna, self._chroniona):
+            segment.clear()
+            self._rozmiary[id(segment)] = 0
@@ -1,2 +1,2 @@
 from .session_manager import SessionManager
-from .enhanced_client import EnhancedClient
+from .enhanced_client import EnhancedClient, BłądAPI, czy_deterministyczny
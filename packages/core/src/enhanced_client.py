@@ -5,9 +5,10 @@ import json
 import random
 import time # Dodany import time
 import os # Dodany import os
+from typing import Dict, Iterable, Optional
 
 # Upewnij się, że importujesz z odpowiednich pakietów
-from packages.utils.src.async_rate_limiter import AsyncRateLimiter
+from packages.utils.src.async_rate_limiter import KeyedRateLimiter
 from packages.utils.src.async_retry import async_retry
 from packages.config.src.settings import KONFIGURACJA
 # packages.utils.src.logger by się przydał tutaj do logowania operacji klienta
@@ -58,6 +59,24 @@ class ProxyManager:
             self.bad.add(p)
             # Opcjonalnie: dodaj logikę usuwania z "bad" po pewnym czasie lub zdarzeniu
 
+class BłądAPI(RuntimeError):
+    """Błąd odpowiedzi API z kodem statusu HTTP."""
+    # Statusy, przy których to samo zapytanie zawsze skończy się tak samo (błędne zapytanie, odmowa treści)
+    STATUSY_DETERMINISTYCZNE = frozenset((400, 404, 413, 422, 451))
+
+    def __init__(self, komunikat: str, status: int):
+        super().__init__(komunikat)
+        self.status = status
+
+    @property
+    def deterministyczny(self) -> bool:
+        """Czy ponowienie tego samego zapytania nie ma sensu."""
+        return self.status in self.STATUSY_DETERMINISTYCZNE
+
+def czy_deterministyczny(e: Exception) -> bool:
+    """Zwraca True dla błędów, których nie należy ponawiać (timeouty, 5xx i błędy połączenia są przejściowe)."""
+    return isinstance(e, BłądAPI) and e.deterministyczny
+
 class EnhancedClient:
     """Klient HTTP/S z zaawansowanymi funkcjami: limitowanie zapytań, ponawianie, proxy, zarządzanie ciasteczkami."""
     def __init__(self, cfg=None, cookie: Optional[str] = None):
@@ -69,15 +88,26 @@ class EnhancedClient:
              raise ValueError("Brak PERPLEXITY_COOKIE. Proszę ustaw zmienną środowiskową lub wartość w pliku konfiguracyjnym.")
 
         # Inicjalizacja limitera z konfiguracji
-        rps = self.cfg.pobierz("rate_limiting.requests_per_minute", 20)
+        # Limit jest podany na minutę, a kubełek uzupełnia się w tokenach na sekundę
+        rpm = self.cfg.pobierz("rate_limiting.requests_per_minute", 20)
         burst = self.cfg.pobierz("rate_limiting.burst_limit", 5)
-        self.rate = AsyncRateLimiter(rps, burst)
+        self.rate = KeyedRateLimiter(rpm / 60.0, max(burst, 1))
+        # Droższe tryby zużywają więcej tokenów kubełka konta (klucz None)
+        self.koszty = {tryb: min(float(koszt), self.rate.burst)
+                       for tryb, koszt in (self.cfg.pobierz("rate_limiting.costs", {}) or {}).items()}
 
         # Inicjalizacja ProxyManager z konfiguracji
         proxy_enabled = self.cfg.pobierz("proxy.enabled", False)
         proxy_list = self.cfg.pobierz("proxy.proxy_list", [])
         proxy_rotation = self.cfg.pobierz("proxy.rotation", True)
         self.proxy_mgr = ProxyManager(proxy_list, proxy_rotation) if proxy_enabled else None
+        # Każde proxy ma dodatkowo własny kubełek w tym samym limiterze (klucz ("proxy", adres))
+        proxy_rpm = self.cfg.pobierz("rate_limiting.per_proxy_requests_per_minute", 0)
+        self.limit_proxy = bool(self.proxy_mgr and proxy_rpm > 0)
+        if self.limit_proxy:
+            proxy_burst = max(self.cfg.pobierz("rate_limiting.per_proxy_burst_limit", 5), 1)
+            for p in self.proxy_mgr.lista:
+                self.rate.set_limit(("proxy", p), proxy_rpm / 60.0, proxy_burst)
         if proxy_enabled and not proxy_list:
              # print("OSTRZEŻENIE: Proxy włączone w konfiguracji, ale lista proxy jest pusta.")
 
@@ -118,17 +148,21 @@ class EnhancedClient:
             headers["Cookie"] = f"p_token={self.cookie}"
         return headers
 
-    @async_retry(max_retries=KONFIGURACJA.pobierz("api.max_retries", 3), base_delay=KONFIGURACJA.pobierz("api.retry_delay", 1.0))
-    async def request(self, q: str) -> str:
-        """Wykonuje zapytanie do API Perplexity AI."""
-        # Czekaj na możliwość wykonania żądania (rate limiting)
-        await self.rate.acquire()
+    @async_retry(max_retries=KONFIGURACJA.pobierz("api.max_retries", 3), base_delay=KONFIGURACJA.pobierz("api.retry_delay", 1.0),
+                 give_up=czy_deterministyczny)
+    async def request(self, q: str, tryb: str = "auto", model: Optional[str] = None,
+                      źródła: Iterable[str] = ("web",), język: str = "en-US") -> str:
+        """Wykonuje zapytanie do API Perplexity AI w podanym trybie, modelu, źródłach i języku."""
+        # Czekaj na możliwość wykonania żądania (rate limiting konta, koszt według trybu)
+        await self.rate.acquire(self.koszty.get(tryb.strip().lower().replace(" ", "_"), 1.0))
 
         ses = await self._sess()
         proxy_uzyte = None
         if self.proxy_mgr:
             proxy_uzyte = self.proxy_mgr.wybierz()
             # print(f"INFO: Używam proxy: {proxy_uzyte}")
+            if self.limit_proxy and proxy_uzyte:
+                await self.rate.acquire(1.0, ("proxy", proxy_uzyte))
 
         api_url = self.cfg.pobierz("api.base_url", "https://www.perplexity.ai/api")
         endpoint = f"{api_url}/chat/async" # Używamy async endpoint dla lepszej zgodności
@@ -138,6 +172,10 @@ class EnhancedClient:
             "version": "0.0", # Wersja API, może wymagać aktualizacji
             "source": "user",
             "text": q,
+            "mode": tryb,
+            "model_preference": model, # None = domyślny model trybu
+            "sources": list(źródła),
+            "language": język,
             "timestamp": int(time.time() * 1000),
             "previous_messages": [], # Można dodać kontekst konwersacji
             "attachments": [] # Obsługa załączników jeśli potrzebna
@@ -157,7 +195,7 @@ class EnhancedClient:
                     if proxy_uzyte and status_kodu in [403, 407, 408, 502, 503, 504]: # Typowe kody błędów związanych z proxy
                         self.proxy_mgr.oznacz_blad(proxy_uzyte)
                         # print(f"INFO: Proxy {proxy_uzyte} oznaczone jako błędne.")
-                    raise RuntimeError(f"Błąd API: Status {status_kodu}")
+                    raise BłądAPI(f"Błąd API: Status {status_kodu}", status_kodu)
 
                 # API /chat/async zwraca obiekt JSON z polem "answer" i innymi danymi
                 try:
@@ -200,8 +238,9 @@ class EnhancedClient:
         except Exception as e:
             # Logowanie innych nieobsłużonych błędów
             # print(f"BŁĄD: Nieoczekiwany błąd podczas żądania API: {e}")
-            if proxy_uzyte:
+            if proxy_uzyte and not czy_deterministyczny(e):
                  # Oznacz proxy jako błędne również w przypadku innych błędów, być może jest niestabilne
+                 # (błąd deterministyczny wynika z samego zapytania, nie z proxy)
                  self.proxy_mgr.oznacz_blad(proxy_uzyte)
                  # print(f"INFO: Proxy {proxy_uzyte} oznaczone jako błędne z powodu nieoczekiwanego błędu.")
             raise e # Ponowne zgłoszenie błędu
@@ -1,3 +1,4 @@
 from .logger import Logger
-from .async_rate_limiter import AsyncRateLimiter
+from .async_rate_limiter import AsyncRateLimiter, KeyedRateLimiter
 from .async_retry import async_retry
+from .single_flight import SingleFlight
@@ -1,48 +1,167 @@
-import asyncio, time
+import asyncio, heapq, itertools
+from collections import deque
+from typing import Dict, Hashable, Optional, Tuple
 
-class AsyncRateLimiter:
-    """Asynchroniczny limiter liczby żądań na sekundę z możliwością burstu."""
+# Tolerancja błędu zmiennoprzecinkowego przy porównaniu tokenów z kosztem
+_EPS = 1e-9
+
+class _Kubełek:
+    """Stan jednego kubełka tokenów: tokeny, czas ostatniego uzupełnienia i kolejka FIFO oczekujących."""
+    __slots__ = ('rate', 'burst', 'tokens', 'last', 'waiters', 'due')
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate, self.burst = rate, burst
+        self.tokens = float(burst) # Nowy kubełek jest pełny
+        self.last = now
+        self.waiters: deque = deque() # (future, koszt)
+        self.due: Optional[float] = None # Czas zaplanowanego obudzenia głowy kolejki
+
+    def refill(self, now: float):
+        self.tokens = min(float(self.burst), self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+class KeyedRateLimiter:
+    """Sprawiedliwy (FIFO) limiter kubełków tokenów z kosztami żądań i osobnymi kubełkami dla kluczy.
+
+    Każdy klucz (np. konto, proxy, użytkownik; None = kubełek domyślny) ma własny kubełek: rate tokenów
+    na sekundę, najwyżej burst tokenów. acquire(cost) czeka w kolejce FIFO kubełka, więc żądanie nie jest
+    wyprzedzane przez późniejsze (także tańsze). Kubełki z oczekującymi są w jednym kopcu według czasu,
+    w którym głowa kolejki dostanie tokeny; jeden timer pętli (loop.call_at) budzi tylko tych oczekujących,
+    dla których są już tokeny - bez sprawdzania przez wszystkich naraz. Planowanie kosztuje O(log n).
+    """
+    def __init__(self, rate: float = 1.0, burst: float = 1.0):
+        if rate <= 0 or burst <= 0:
+             raise ValueError("rate i burst muszą być > 0")
+        self.rate, self.burst = rate, burst
+        self._limits: Dict[Hashable, Tuple[float, float]] = {}
+        self._buckets: Dict[Hashable, _Kubełek] = {}
+        self._heap: list = [] # (czas obudzenia, numer, kubełek)
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._sweep_at = 1024 # Liczba kubełków, przy której usuwane są nieużywane
+        self.granted = 0 # Przyznane żądania
+        self.waited = 0 # Żądania, które musiały czekać
+
+    def set_limit(self, key: Hashable, rate: float, burst: float):
+        """Ustawia własny limit dla klucza (pozostałe klucze używają rate/burst limitera)."""
+        if rate <= 0 or burst <= 0:
+             raise ValueError("rate i burst muszą być > 0")
+        self._limits[key] = (rate, burst)
+        b = self._buckets.get(key)
+        if b is not None:
+            if self._loop is not None:
+                b.refill(self._loop.time())
+            b.rate, b.burst = rate, burst
+            b.tokens = min(b.tokens, float(burst))
+
+    def _bucket(self, key: Hashable, now: float) -> _Kubełek:
+        b = self._buckets.get(key)
+        if b is None:
+            if len(self._buckets) >= self._sweep_at:
+                self._sweep(now)
+            rate, burst = self._limits.get(key, (self.rate, self.burst))
+            b = self._buckets[key] = _Kubełek(rate, burst, now)
+        return b
+
+    def _sweep(self, now: float):
+        # Kubełek bez oczekujących, który zdążył się zapełnić, jest nie do odróżnienia od nowego
+        for key, b in list(self._buckets.items()):
+            if not b.waiters and b.tokens + (now - b.last) * b.rate >= b.burst:
+                del self._buckets[key]
+        self._sweep_at = max(1024, 2 * len(self._buckets))
+
+    async def acquire(self, cost: float = 1.0, key: Hashable = None):
+        """Pobiera cost tokenów z kubełka klucza, czekając w kolejce FIFO, jeśli ich brakuje."""
+        loop = self._loop = asyncio.get_running_loop()
+        now = loop.time()
+        b = self._bucket(key, now)
+        if cost > b.burst:
+            raise ValueError(f"Koszt {cost} przekracza pojemność kubełka {b.burst}")
+        b.refill(now)
+        if not b.waiters and b.tokens + _EPS >= cost:
+            b.tokens -= cost
+            self.granted += 1
+            return
+
+        fut = loop.create_future()
+        b.waiters.append((fut, cost))
+        self.waited += 1
+        if len(b.waiters) == 1:
+            self._schedule(b, now)
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Tokeny przyznane, ale zadanie anulowane przed wznowieniem - oddaj je następnym
+                b.refill(loop.time())
+                b.tokens = min(float(b.burst), b.tokens + cost)
+                self._serve(b, loop.time())
+            elif b.waiters and b.waiters[0][0] is fut:
+                # Anulowana głowa kolejki: następny oczekujący może dostać tokeny wcześniej
+                self._serve(b, loop.time())
+            raise
+
+    def _serve(self, b: _Kubełek, now: float):
+        """Przyznaje tokeny kolejnym oczekującym z głowy kolejki i planuje obudzenie następnego."""
+        b.refill(now)
+        waiters = b.waiters
+        while waiters:
+            fut, cost = waiters[0]
+            if fut.done():
+                waiters.popleft() # Anulowany
+                continue
+            if b.tokens + _EPS < cost:
+                break
+            waiters.popleft()
+            b.tokens -= cost
+            fut.set_result(None)
+            self.granted += 1
+        if waiters:
+            self._schedule(b, now)
+        else:
+            b.due = None
+
+    def _schedule(self, b: _Kubełek, now: float):
+        cost = b.waiters[0][1]
+        when = now + max(0.0, cost - b.tokens) / b.rate
+        b.due = when
+        heapq.heappush(self._heap, (when, next(self._seq), b))
+        if self._timer is None or when < self._timer.when():
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = self._loop.call_at(when, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        now = self._loop.time()
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            when, _, b = heapq.heappop(heap)
+            if b.due != when:
+                continue # Nieaktualny wpis (kubełek przeplanowany lub bez oczekujących)
+            self._serve(b, now)
+        if heap and self._timer is None:
+            self._timer = self._loop.call_at(heap[0][0], self._on_timer)
+
+    def stat(self):
+        """Zwraca statystyki limitera."""
+        return dict(
+            granted=self.granted,
+            waited=self.waited,
+            waiting=sum(len(b.waiters) for b in self._buckets.values()),
+            keys=len(self._buckets)
+        )
+
+class AsyncRateLimiter(KeyedRateLimiter):
+    """Asynchroniczny limiter liczby żądań na sekundę z możliwością burstu (jeden kubełek, koszt 1)."""
     def __init__(self, rps: int = 20, burst: int = 5):
         if rps <= 0 or burst < 0:
              raise ValueError("RPS musi być > 0, a burst >= 0")
-        self.rps, self.burst = rps, burst
-        # Początkowo mamy tokensów równych burst, aby umożliwić natychmiastowe żądania
-        self.tokens = float(burst)
-        self.last = time.monotonic()
-        self.lock = asyncio.Lock() # Blokada do synchronizacji dostępu do tokenów
+        # Pojemność co najmniej jednego tokenu, inaczej żadne żądanie nie mogłoby przejść
+        super().__init__(rps, max(burst, 1))
+        self.rps = rps
 
     async def acquire(self):
-        """Pozyskuje jeden token. Czeka, jeśli brak tokenów."""
-        async with self.lock:
-            now = time.monotonic()
-            # Oblicz nowe tokeny, które "napłynęły" od ostatniego sprawdzenia
-            elapsed = now - self.last
-            self.last = now
-            self.tokens = min(float(self.burst), self.tokens + elapsed * self.rps)
-
-            # Jeśli mamy tokeny, zużyj jeden i zwróć
-            if self.tokens >= 1.0:
-                self.tokens -= 1.0
-                return
-
-            # Jeśli brak tokenów, oblicz czas oczekiwania na następny token
-            # Czas oczekiwania na 1 token = 1 / rps
-            # Aby mieć 1 token, potrzebujemy (1 - self.tokens) tokenów więcej
-            # Czas oczekiwania = (1 - self.tokens) / rps
-            czas_oczekiwania = (1.0 - self.tokens) / self.rps
-            self.tokens = 0.0 # Ustawiamy tokeny na zero, bo musimy czekać
-
-        # Zwolniliśmy blokadę, teraz czekamy poza nią
-        await asyncio.sleep(czas_oczekiwania)
-        # Po czekaniu, tokeny "napłynęły", możemy ponowić próbę (choć zwykle wystarczy jedno czekanie)
-        # W tym prostym limiterze, po czekaniu możemy od razu "uzyskać" token,
-        # ale dla precyzji można by ponowić acquire(). W tym przypadku proste czekanie jest wystarczające.
-        # Można też zmodyfikować logikę, by acquire czekało i od razu odejmowało token po czekaniu.
-        # Poniższa linia jest logicznie poprawniejsza po czekaniu, aby faktycznie "zużyć" token, który "przyszedł"
-        # w trakcie snu, ale dla prostoty często pomija się rekurencję.
-        # Ponowimy acquire, ale w większości przypadków zadziała od razu dzięki "napływowi" tokenów podczas snu.
-        # W praktyce, po `await asyncio.sleep(czas_oczekiwania)`, przy następnym `acquire`, tokeny będą >= 0,
-        # więc odjęcie 1.0 będzie możliwe (lub prawie możliwe, uwzględniając zmiennoprzecinkowe).
-        # Prostszą logiką jest po prostu wyjść po spaniu, zakładając, że token jest już dostępny.
-        # Implementacja poniżej jest bardziej defensywna/precyzyjna:
-        await self.acquire() # Upewnij się, że faktycznie pozyskasz token po czekaniu.
+        """Pozyskuje jeden token. Czeka (w kolejności zgłoszeń), jeśli brak tokenów."""
+        await super().acquire()
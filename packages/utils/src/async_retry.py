@@ -1,13 +1,16 @@
 import asyncio
 import functools
 import random
-from typing import Callable, Awaitable, TypeVar, ParamSpec
+from typing import Callable, Awaitable, Optional, TypeVar, ParamSpec
 
 T = TypeVar('T')
 P = ParamSpec('P')
 
-def async_retry(max_retries: int = 3, base_delay: float = 1.0):
-    """Dekorator do asynchronicznych funkcji, dodający logikę ponawiania prób z wykładniczym backoffem i jitterem."""
+def async_retry(max_retries: int = 3, base_delay: float = 1.0, give_up: Optional[Callable[[Exception], bool]] = None):
+    """Dekorator do asynchronicznych funkcji, dodający logikę ponawiania prób z wykładniczym backoffem i jitterem.
+
+    give_up: funkcja rozpoznająca błędy, których nie warto ponawiać (np. deterministyczne) - są zgłaszane od razu.
+    """
     def decorator(func: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
         @functools.wraps(func)
         async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
@@ -17,7 +20,7 @@ def async_retry(max_retries: int = 3, base_delay: float = 1.0):
                 except Exception as e:
                     # packages.utils.src.logger by się przydał tutaj do logowania prób
                     # print(f"Próba {i+1}/{max_retries+1} nie powiodła się dla {func.__name__}: {e}")
-                    if i == max_retries:
+                    if i == max_retries or (give_up is not None and give_up(e)):
                         # print(f"Wszystkie {max_retries+1} próby dla {func.__name__} zakończone niepowodzeniem. Podnoszę wyjątek.")
                         raise e
                     # Oblicz opóźnienie: base_delay * (2 ** i) * (0.5 + random.random())
@@ -0,0 +1,51 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, List, TypeVar
+
+T = TypeVar('T')
+
+class SingleFlight:
+    """Łączy identyczne równoległe wywołania w jedno wywołanie upstream (single-flight).
+
+    Pierwsze wywołanie dla danego klucza uruchamia zadanie, kolejne czekają na jego wynik (lub wyjątek).
+    Anulowanie jednego z oczekujących nie przerywa zadania pozostałym; zadanie jest anulowane dopiero,
+    gdy zrezygnują wszyscy oczekujący.
+    """
+    def __init__(self):
+        self._w_locie: Dict[Hashable, List] = {} # klucz -> [zadanie, liczba oczekujących]
+        self.wywołania = 0 # Liczba wywołań upstream
+        self.połączone = 0 # Liczba wywołań obsłużonych przez trwające już zadanie
+
+    async def wykonaj(self, klucz: Hashable, fabryka: Callable[[], Awaitable[T]]) -> T:
+        """Zwraca wynik fabryka() dla klucza, współdzieląc go z trwającym wywołaniem o tym samym kluczu."""
+        wpis = self._w_locie.get(klucz)
+        if wpis is None:
+            wpis = [asyncio.ensure_future(fabryka()), 0]
+            self._w_locie[klucz] = wpis
+            wpis[0].add_done_callback(lambda _: self._usuń(klucz, wpis))
+            self.wywołania += 1
+        else:
+            self.połączone += 1
+
+        wpis[1] += 1
+        try:
+            # shield: anulowanie tego oczekującego nie anuluje zadania współdzielonego z innymi
+            return await asyncio.shield(wpis[0])
+        finally:
+            wpis[1] -= 1
+            if wpis[1] == 0 and not wpis[0].done():
+                # Ostatni oczekujący zrezygnował - nikt nie czeka na wynik
+                self._usuń(klucz, wpis)
+                wpis[0].cancel()
+
+    def _usuń(self, klucz: Hashable, wpis: List):
+        # Usuwa wpis tylko, jeśli pod kluczem nie działa już nowsze zadanie
+        if self._w_locie.get(klucz) is wpis:
+            del self._w_locie[klucz]
+
+    def stat(self):
+        """Zwraca statystyki łączenia wywołań."""
+        return dict(
+            wywołania=self.wywołania,
+            połączone=self.połączone,
+            w_locie=len(self._w_locie)
+        )
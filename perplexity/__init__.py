@@ -1,5 +1,10 @@
 from .client import Client
 from .emailnator import Emailnator
 from .labs import LabsClient
+from .upload_cache import UploadCache
+from .pool import ClientPool
+from .scheduler import AccountScheduler
+from .vault import AccountVault
+from .thread import ThreadStore, Conversation
 
-__all__ = ['Client', 'Emailnator', 'LabsClient']
\ No newline at end of file
+__all__ = ['Client', 'Emailnator', 'LabsClient', 'UploadCache', 'ClientPool', 'AccountScheduler', 'AccountVault', 'ThreadStore', 'Conversation']
\ No newline at end of file
@@ -0,0 +1,109 @@
+# Importing necessary modules
+# os: File sizes and path handling
+# mmap: Memory-mapped buffers
+import os
+import mmap
+
+# Block size used when hashing files from disk
+BLOCK_SIZE = 1 << 20
+
+
+def is_path(file):
+    '''
+    Checks whether an attachment is given as a path on disk.
+
+    Only path objects (os.PathLike, e.g. pathlib.Path) are; a string is always uploaded as text content, so text
+    forwarded from users can never make the client read and upload a local file.
+    '''
+    return isinstance(file, os.PathLike)
+
+
+def disk_path(file):
+    '''
+    Returns the path of an attachment that curl can read directly from disk, or None.
+
+    Paths qualify, as do file objects opened on a regular file (their current position is ignored).
+    '''
+    if is_path(file):
+        return os.fspath(file)
+
+    name = getattr(file, 'name', None)
+    if hasattr(file, 'read') and isinstance(name, (str, bytes)) and os.path.isfile(name):
+        return os.fsdecode(name)
+
+    return None
+
+
+def attachment_size(file):
+    '''
+    Returns the real size in bytes of an attachment.
+
+    Parameters:
+    - file: Bytes-like object, mmap, path, file object or text.
+    '''
+    if isinstance(file, memoryview):
+        return file.nbytes
+
+    if isinstance(file, (bytes, bytearray, mmap.mmap)):
+        return len(file)
+
+    if isinstance(file, str):
+        return len(file.encode())
+
+    path = disk_path(file)
+    if path is not None:
+        return os.path.getsize(path)
+
+    # Other file objects: measure from the current position without reading
+    position = file.tell()
+    size = file.seek(0, os.SEEK_END) - position
+    file.seek(position)
+    return size
+
+
+def update_digest(digest, file):
+    '''
+    Feeds the content of an attachment to a hashlib object without loading files from disk into memory.
+    '''
+    if isinstance(file, (bytes, bytearray, memoryview, mmap.mmap)):
+        digest.update(file)
+        return digest
+
+    if isinstance(file, str):
+        digest.update(file.encode())
+        return digest
+
+    path = disk_path(file)
+    if path is not None:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+                digest.update(block)
+        return digest
+
+    position = file.tell()
+    for block in iter(lambda: file.read(BLOCK_SIZE), b''):
+        digest.update(block)
+    file.seek(position)
+    return digest
+
+
+def add_file_part(mp, filename, content_type, file):
+    '''
+    Adds an attachment to a CurlMime form.
+
+    Files on disk are streamed by curl from their path; other file objects are read once and
+    buffers are passed as bytes (curl_cffi only accepts bytes for in-memory parts).
+    '''
+    path = disk_path(file)
+
+    if path is not None:
+        mp.addpart(name='file', content_type=content_type, filename=filename, local_path=path)
+        return
+
+    if hasattr(file, 'read'):
+        file = file.read()
+
+    if isinstance(file, str):
+        file = file.encode()
+
+    mp.addpart(name='file', content_type=content_type, filename=filename, data=file if isinstance(file, bytes) else bytes(file))
@@ -1,28 +1,47 @@
 # Importing necessary modules
 # re: Regular expressions for pattern matching
-# sys: System-specific parameters and functions
-# json: JSON parsing and serialization
+# time: Session age tracking
 # random: Random number generation
 # mimetypes: Guessing MIME types of files
 # uuid: Generating unique identifiers
+# collections: Bounded deque for keeping recent response chunks
+# concurrent.futures: Thread pool for parallel file uploads
 # curl_cffi: HTTP requests and multipart form data handling
 import re
-import sys
-import json
+import time
 import random
 import mimetypes
 from uuid import uuid4
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from curl_cffi import requests, CurlMime
 
 # Importing Emailnator class for email generation
 from .emailnator import Emailnator
+# Importing delta helpers for incremental streaming
+from .delta import iter_deltas
+# Importing attachment helpers for paths, file objects and buffers
+from .attachments import attachment_size, add_file_part
+# Importing the SSE frame parser and message decoder
+from .sse import SSEParser
+from .decoder import Decoder
+# Importing the conversation store for follow-up queries
+from .thread import ThreadStore, Conversation
 
 class Client:
     '''
     A client for interacting with the Perplexity AI API.
     '''
 
-    def __init__(self, cookies={}):
+    def __init__(self, cookies={}, decoder=None, upload_cache=None, lazy=False, threads=None):
+        '''
+        Parameters:
+        - cookies: Cookies of an existing account.
+        - decoder: Decoder for SSE message events.
+        - upload_cache: Optional UploadCache shared between clients.
+        - lazy: Whether to defer the session bootstrap request until the client is first used.
+        - threads: Optional ThreadStore keeping the conversations of thread(), shared between clients.
+        '''
         # Initialize an HTTP session with default headers and optional cookies
         self.session = requests.Session(headers={
             'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
@@ -52,20 +71,52 @@ class Client:
         self.copilot = 0 if not cookies else float('inf')  # Remaining pro queries
         self.file_upload = 0 if not cookies else float('inf')  # Remaining file uploads
 
+        # Decoder for SSE message events (fastest installed JSON backend by default)
+        self.decoder = decoder or Decoder()
+
+        # Optional cache of uploaded attachment URLs, keyed by content hash
+        self.upload_cache = upload_cache
+
+        # Follow-up state of conversations, created on the first call to thread() if not given
+        self.threads = threads
+
         # Regular expression for extracting sign-in links
         self.signin_regex = re.compile(r'"(https://www\\.perplexity\\.ai/api/auth/callback/email\\?callbackUrl=.*?)"')
 
         # Unique timestamp for session identification
         self.timestamp = format(random.getrandbits(32), '08x')
 
-        # Initialize session by making a GET request
+        # Initialize session by making a GET request, unless deferred to the first use
+        self.bootstrapped_at = None
+        if not lazy:
+            self.bootstrap()
+
+    def bootstrap(self):
+        '''
+        Initializes the session by requesting the auth session endpoint.
+        '''
         self.session.get('https://www.perplexity.ai/api/auth/session')
+        self.bootstrapped_at = time.time()
 
-    def create_account(self, cookies):
+    def ensure_session(self, max_age=None):
+        '''
+        Bootstraps the session if it was never initialized or is older than max_age seconds.
+        '''
+        if self.bootstrapped_at is None or (max_age is not None and time.time() - self.bootstrapped_at > max_age):
+            self.bootstrap()
+
+    def create_account(self, cookies, attempts=10):
         '''
         Creates a new account using Emailnator cookies.
+
+        Parameters:
+        - cookies: Emailnator cookies.
+        - attempts: Number of sign-in attempts before giving up with an exception.
         '''
-        while True:
+        self.ensure_session()
+        error = None
+
+        for _ in range(attempts):
             try:
                 # Initialize Emailnator client
                 emailnator_cli = Emailnator(cookies)
@@ -88,8 +139,10 @@ class Client:
                 else:
                     print('Perplexity account creating error:', resp)
 
-            except Exception:
-                pass
+            except Exception as e:
+                error = e
+        else:
+            raise Exception(f'Perplexity account creating failed after {attempts} attempts', error)
 
         # Extract the sign-in link from the email
         msg = emailnator_cli.get(func=lambda x: x['subject'] == 'Sign in to Perplexity')
@@ -104,7 +157,48 @@ class Client:
 
         return True
 
-    def search(self, query, mode='auto', model=None, sources=['web'], files={}, stream=False, language='en-US', follow_up=None, incognito=False):
+    def _upload_file(self, filename, file):
+        '''
+        Uploads a single attachment and returns its URL.
+
+        Parameters:
+        - filename: The name of the file.
+        - file: The file content, path, file object or memory-mapped buffer.
+        '''
+        file_type = mimetypes.guess_type(filename)[0]
+        file_upload_info = (self.session.post(
+            'https://www.perplexity.ai/rest/uploads/create_upload_url?version=2.18&source=default',
+            json={
+                'content_type': file_type,
+                'file_size': attachment_size(file),
+                'filename': filename,
+                'force_image': False,
+                'source': 'default',
+            }
+        )).json()
+
+        # Upload the file to the server
+        mp = CurlMime()
+        for key, value in file_upload_info['fields'].items():
+            mp.addpart(name=key, data=value)
+        add_file_part(mp, filename, file_type, file)
+
+        upload_resp = self.session.post(file_upload_info['s3_bucket_url'], multipart=mp)
+
+        if not upload_resp.ok:
+            raise Exception('File upload error', upload_resp)
+
+        # Extract the uploaded file URL
+        if 'image/upload' in file_upload_info['s3_object_url']:
+            return re.sub(
+                r'/private/s--.*?--/v\d+/user_uploads/',
+                '/private/user_uploads/',
+                upload_resp.json()['secure_url']
+            )
+
+        return file_upload_info['s3_object_url']
+
+    def search(self, query, mode='auto', model=None, sources=['web'], files={}, stream=False, language='en-US', follow_up=None, incognito=False, history=1, upload_concurrency=4, on_charge=None):
         '''
         Executes a search query on Perplexity AI.
 
@@ -113,11 +207,16 @@ class Client:
         - mode: Search mode ('auto', 'pro', 'reasoning', 'deep research').
         - model: Specific model to use for the query.
         - sources: List of sources ('web', 'scholar', 'social').
-        - files: Dictionary of files to upload.
-        - stream: Whether to stream the response.
+        - files: Dictionary mapping file names to contents, paths, file objects or mmaps (files found in the upload cache are not uploaded nor charged).
+          Only pathlib.Path (os.PathLike) values are read from disk; a str is always uploaded as the file's text content.
+        - stream: Whether to stream the response ('delta' streams only the changes between chunks).
         - language: Language code (ISO 639).
         - follow_up: Information for follow-up queries.
         - incognito: Whether to enable incognito mode.
+        - history: Number of most recent response chunks to keep (1 keeps only the latest, None keeps all).
+          With a value other than 1 the non-streaming call returns the list of kept chunks.
+        - upload_concurrency: Maximum number of files uploaded at the same time.
+        - on_charge: Optional callable run right after the pro query and file upload counters are charged.
         '''
         # Validate input parameters
         assert mode in ['auto', 'pro', 'reasoning', 'deep research'], 'Invalid search mode.'
@@ -128,50 +227,36 @@ class Client:
             'deep research': [None]
         }[mode] if self.own else True, 'Invalid model for the selected mode.'
         assert all([source in ('web', 'scholar', 'social') for source in sources]), 'Invalid sources.'
+        assert history is None or history > 0, 'History must be a positive number or None.'
+        assert upload_concurrency > 0, 'Upload concurrency must be a positive number.'
+
+        # Attachments already uploaded with the same content reuse their cached URL
+        cache_keys = {filename: self.upload_cache.key(filename, file) for filename, file in files.items()} if self.upload_cache else {}
+        uploaded_urls = {filename: url for filename, key in cache_keys.items() if (url := self.upload_cache.get(key))}
+        new_files = {filename: file for filename, file in files.items() if filename not in uploaded_urls}
+
+        # Bootstrap the session of lazily created clients first, so a failed bootstrap does not use up quota
+        self.ensure_session()
+
         assert self.copilot > 0 if mode in ['pro', 'reasoning', 'deep research'] else True, 'No remaining pro queries.'
-        assert self.file_upload - len(files) >= 0 if files else True, 'File upload limit exceeded.'
+        assert self.file_upload - len(new_files) >= 0 if new_files else True, 'File upload limit exceeded.'
 
         # Update query and file upload counters
         self.copilot = self.copilot - 1 if mode in ['pro', 'reasoning', 'deep research'] else self.copilot
-        self.file_upload = self.file_upload - len(files) if files else self.file_upload
-
-        # Upload files and prepare the query payload
-        uploaded_files = []
-        for filename, file in files.items():
-            file_type = mimetypes.guess_type(filename)[0]
-            file_upload_info = (self.session.post(
-                'https://www.perplexity.ai/rest/uploads/create_upload_url?version=2.18&source=default',
-                json={
-                    'content_type': file_type,
-                    'file_size': sys.getsizeof(file),
-                    'filename': filename,
-                    'force_image': False,
-                    'source': 'default',
-                }
-            )).json()
-
-            # Upload the file to the server
-            mp = CurlMime()
-            for key, value in file_upload_info['fields'].items():
-                mp.addpart(name=key, data=value)
-            mp.addpart(name='file', content_type=file_type, filename=filename, data=file)
-
-            upload_resp = self.session.post(file_upload_info['s3_bucket_url'], multipart=mp)
-
-            if not upload_resp.ok:
-                raise Exception('File upload error', upload_resp)
-
-            # Extract the uploaded file URL
-            if 'image/upload' in file_upload_info['s3_object_url']:
-                uploaded_url = re.sub(
-                    r'/private/s--.*?--/v\\d+/user_uploads/',
-                    '/private/user_uploads/',
-                    upload_resp.json()['secure_url']
-                )
-            else:
-                uploaded_url = file_upload_info['s3_object_url']
-
-            uploaded_files.append(uploaded_url)
+        self.file_upload = self.file_upload - len(new_files) if new_files else self.file_upload
+
+        if on_charge is not None:
+            on_charge()
+
+        # Upload files concurrently; the query is sent once the last uploaded URL is known
+        if new_files:
+            with ThreadPoolExecutor(max_workers=min(upload_concurrency, len(new_files))) as executor:
+                uploaded_urls.update(zip(new_files, executor.map(self._upload_file, new_files.keys(), new_files.values())))
+
+            if self.upload_cache:
+                self.upload_cache.put_many((cache_keys[filename], uploaded_urls[filename]) for filename in new_files)
+
+        uploaded_files = [uploaded_urls[filename] for filename in files]
 
         # Prepare the JSON payload for the query
         json_data = {
@@ -211,36 +296,46 @@ class Client:
 
         # Send the query request and handle the response
         resp = self.session.post('https://www.perplexity.ai/rest/sse/perplexity_ask', json=json_data, stream=True)
-        chunks = []
+        # Every chunk holds the full answer so far, so only a bounded window of them is kept
+        chunks = deque(maxlen=history)
 
         def stream_response(resp):
             '''
             Generator for streaming responses.
             '''
-            for chunk in resp.iter_lines(delimiter=b'\\r\\n\\r\\n'):
-                content = chunk.decode('utf-8')
-
-                if content.startswith('event: message\\r\\n'):
-                    content_json = json.loads(content[len('event: message\\r\\ndata: '):])
-                    content_json['text'] = json.loads(content_json['text'])
-
-                    chunks.append(content_json)
+            for event, data in SSEParser().iter_events(resp.iter_content()):
+                if event == b'message':
+                    chunks.append(self.decoder.message(data))
                     yield chunks[-1]
 
-                elif content.startswith('event: end_of_stream\\r\\n'):
+                elif event == b'end_of_stream':
                     return
 
+        if stream == 'delta':
+            return iter_deltas(stream_response(resp))
+
         if stream:
             return stream_response(resp)
 
-        for chunk in resp.iter_lines(delimiter=b'\\r\\n\\r\\n'):
-            content = chunk.decode('utf-8')
+        for event, data in SSEParser().iter_events(resp.iter_content()):
+            if event == b'message':
+                chunks.append(self.decoder.message(data))
 
-            if content.startswith('event: message\\r\\n'):
-                content_json = json.loads(content[len('event: message\\r\\ndata: '):])
-                content_json['text'] = json.loads(content_json['text'])
+            elif event == b'end_of_stream':
+                return chunks[-1] if history == 1 else list(chunks)
+
+    def thread(self, thread_id=None, store=None):
+        '''
+        Returns a conversation whose queries are sent as follow-ups of each other.
+
+        Parameters:
+        - thread_id: Identifier of a conversation to continue (a new one is started by default).
+        - store: ThreadStore keeping the follow-up state (the store of the client by default).
+        '''
+        if store is None:
+            if self.threads is None:
+                self.threads = ThreadStore()
 
-                chunks.append(content_json)
+            store = self.threads
 
-            elif content.startswith('event: end_of_stream\\r\\n'):
-                return chunks[-1]
\ No newline at end of file
+        return Conversation(self, store, thread_id)
\ No newline at end of file
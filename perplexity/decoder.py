@@ -0,0 +1,125 @@
+# Importing necessary modules
+# json: Standard library JSON parser (always available fallback)
+# orjson / msgspec: Optional faster JSON parsers, used when installed
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _loads_for(backend):
+    '''
+    Returns the loads function of a JSON backend.
+    '''
+    if backend == 'orjson':
+        assert orjson is not None, 'orjson is not installed.'
+        return orjson.loads
+
+    if backend == 'msgspec':
+        assert msgspec is not None, 'msgspec is not installed.'
+        return msgspec.json.Decoder().decode
+
+    assert backend == 'json', 'JSON backends -> ["orjson", "msgspec", "json"]'
+    return json.loads
+
+
+def available_backends():
+    '''
+    Returns the names of the installed JSON backends, fastest first.
+    '''
+    return [name for name, module in (('orjson', orjson), ('msgspec', msgspec), ('json', json)) if module is not None]
+
+
+class LazyMessage(dict):
+    '''
+    A decoded SSE message whose nested 'text' JSON is only parsed when it is first accessed.
+
+    Serializing the message without touching 'text' keeps it as the raw JSON string sent by the server.
+    '''
+    __slots__ = ('_loads', '_pending')
+
+    def __init__(self, payload, loads):
+        super().__init__(payload)
+        self._loads = loads
+        self._pending = isinstance(payload.get('text'), (str, bytes))
+
+    def _decode(self):
+        if self._pending:
+            self._pending = False
+            dict.__setitem__(self, 'text', self._loads(dict.__getitem__(self, 'text')))
+
+    def __getitem__(self, key):
+        if key == 'text':
+            self._decode()
+
+        return dict.__getitem__(self, key)
+
+    def __setitem__(self, key, value):
+        if key == 'text':
+            self._pending = False
+
+        dict.__setitem__(self, key, value)
+
+    def get(self, key, default=None):
+        if key == 'text':
+            self._decode()
+
+        return dict.get(self, key, default)
+
+    def items(self):
+        self._decode()
+        return dict.items(self)
+
+    def values(self):
+        self._decode()
+        return dict.values(self)
+
+    def copy(self):
+        self._decode()
+        return dict(self)
+
+
+class Decoder:
+    '''
+    Decodes the data of 'message' SSE events sent by the perplexity_ask endpoint.
+
+    Parameters:
+    - backend: JSON backend ('orjson', 'msgspec' or 'json'), by default the fastest installed one.
+    - lazy_text: Whether to decode the nested 'text' field only when it is accessed.
+    '''
+
+    def __init__(self, backend=None, lazy_text=False):
+        self.backend = backend or available_backends()[0]
+        self.lazy_text = lazy_text
+        self.loads = _loads_for(self.backend)
+
+    def message(self, data):
+        '''
+        Decodes the data of a message event.
+
+        Parameters:
+        - data: The raw event data (bytes, memoryview or str).
+
+        Returns:
+        - The message dictionary, with 'text' decoded (or a LazyMessage if lazy_text is set).
+        '''
+        # The standard library parser is the only backend that cannot read buffers directly
+        if self.backend == 'json' and isinstance(data, memoryview):
+            data = data.tobytes()
+
+        payload = self.loads(data)
+
+        if self.lazy_text:
+            return LazyMessage(payload, self.loads)
+
+        if isinstance(payload.get('text'), (str, bytes)):
+            payload['text'] = self.loads(payload['text'])
+
+        return payload
@@ -0,0 +1,202 @@
+# Importing necessary modules
+# json: JSON parsing of the nested answer payload
+import json
+
+# Marker for fields that were not seen in a previous chunk
+_MISSING = object()
+
+
+def _final_answer(text):
+    '''
+    Extracts the answer object ({'answer': ..., 'web_results': [...]}) from a decoded chunk text.
+    '''
+    if isinstance(text, dict):
+        return text
+
+    if isinstance(text, list):
+        for step in reversed(text):
+            if isinstance(step, dict) and step.get('step_type') == 'FINAL':
+                answer = (step.get('content') or {}).get('answer')
+
+                if isinstance(answer, str):
+                    try:
+                        answer = json.loads(answer)
+                    except ValueError:
+                        return {'answer': answer}
+
+                return answer if isinstance(answer, dict) else {}
+
+    return {}
+
+
+def _sources(text, answer):
+    '''
+    Collects every source (web result) present in a decoded chunk text.
+    '''
+    sources = list(answer.get('web_results') or [])
+
+    if isinstance(text, list):
+        for step in text:
+            if isinstance(step, dict) and step.get('step_type') != 'FINAL':
+                sources.extend((step.get('content') or {}).get('web_results') or [])
+
+    return sources
+
+
+def _source_key(source):
+    '''
+    Returns a hashable identity for a source, preferring its URL.
+    '''
+    if isinstance(source, dict) and source.get('url'):
+        return source['url']
+
+    return json.dumps(source, sort_keys=True, default=str)
+
+
+def _steps(text):
+    '''
+    Returns the list of intermediate steps of a decoded chunk text (the final answer step is excluded).
+    '''
+    if not isinstance(text, list):
+        return []
+
+    return [step for step in text if not (isinstance(step, dict) and step.get('step_type') == 'FINAL')]
+
+
+class DeltaTracker:
+    '''
+    Turns the cumulative chunks yielded by Client.search into incremental deltas.
+
+    A delta is a dictionary with the keys:
+    - answer: Text appended to the answer since the previous chunk.
+    - replace: True when the answer was rewritten, in which case 'answer' holds the full text.
+    - sources: Sources that were not present in any previous chunk.
+    - steps: List of [index, step] pairs for intermediate steps that were added or changed.
+    - meta: Top-level fields (status, backend_uuid, final, ...) whose value changed.
+    '''
+
+    def __init__(self):
+        self.answer = ''
+        self.steps = []
+        self.meta = {}
+        self.source_keys = set()
+
+    def update(self, chunk):
+        '''
+        Compares a chunk with the previous one.
+
+        Parameters:
+        - chunk: A decoded chunk as yielded by Client.search.
+
+        Returns:
+        - The delta, or None if nothing changed.
+        '''
+        text = chunk.get('text')
+        answer_obj = _final_answer(text)
+        delta = {'answer': '', 'replace': False, 'sources': [], 'steps': [], 'meta': {}}
+
+        # Answer text: the usual case is a pure append
+        answer = answer_obj.get('answer') or ''
+        if not isinstance(answer, str):
+            answer = json.dumps(answer)
+
+        if answer != self.answer:
+            if answer.startswith(self.answer):
+                delta['answer'] = answer[len(self.answer):]
+            else:
+                delta['answer'] = answer
+                delta['replace'] = True
+
+            self.answer = answer
+
+        # Sources are reported once, the first time they appear
+        for source in _sources(text, answer_obj):
+            key = _source_key(source)
+
+            if key not in self.source_keys:
+                self.source_keys.add(key)
+                delta['sources'].append(source)
+
+        # Intermediate steps are compared position by position
+        steps = _steps(text)
+        for index, step in enumerate(steps):
+            if index >= len(self.steps) or self.steps[index] != step:
+                delta['steps'].append([index, step])
+
+        self.steps = steps
+
+        for key, value in chunk.items():
+            if key != 'text' and self.meta.get(key, _MISSING) != value:
+                delta['meta'][key] = value
+                self.meta[key] = value
+
+        if delta['answer'] or delta['replace'] or delta['sources'] or delta['steps'] or delta['meta']:
+            return delta
+
+
+def iter_deltas(chunks):
+    '''
+    Generator turning a stream of cumulative chunks into deltas, skipping chunks that changed nothing.
+    '''
+    tracker = DeltaTracker()
+
+    for chunk in chunks:
+        delta = tracker.update(chunk)
+
+        if delta:
+            yield delta
+
+
+async def aiter_deltas(chunks):
+    '''
+    Asynchronous counterpart of iter_deltas.
+    '''
+    tracker = DeltaTracker()
+
+    async for chunk in chunks:
+        delta = tracker.update(chunk)
+
+        if delta:
+            yield delta
+
+
+def apply_delta(state, delta):
+    '''
+    Applies a delta to a rebuilt answer state.
+
+    Parameters:
+    - state: Dictionary with 'answer', 'sources', 'steps' and 'meta' keys (see rebuild).
+    - delta: A delta produced by DeltaTracker.update.
+
+    Returns:
+    - The updated state.
+    '''
+    state['answer'] = delta['answer'] if delta['replace'] else state['answer'] + delta['answer']
+    state['sources'].extend(delta['sources'])
+
+    for index, step in delta['steps']:
+        if index < len(state['steps']):
+            state['steps'][index] = step
+        else:
+            state['steps'].append(step)
+
+    state['meta'].update(delta['meta'])
+    return state
+
+
+def rebuild(deltas):
+    '''
+    Rebuilds the final answer from a sequence of deltas.
+
+    Parameters:
+    - deltas: Iterable of deltas yielded by Client.search(..., stream='delta').
+
+    Returns:
+    - Dictionary with the full 'answer' text, all 'sources', the 'steps' and the latest 'meta' fields.
+    '''
+    state = {'answer': '', 'sources': [], 'steps': [], 'meta': {}}
+
+    for delta in deltas:
+        apply_delta(state, delta)
+
+    return state
@@ -11,13 +11,22 @@ class Emailnator:
     A client for interacting with the Emailnator service to generate disposable email addresses.
     '''
 
-    def __init__(self, cookies, headers={}, domain=False, plus=False, dot=False, google_mail=True):
+    def __init__(self, cookies, headers={}, domain=False, plus=False, dot=False, google_mail=True, session=None, email=None, inbox_ads=None, retries=10, retry_delay=0.5):
+        '''
+        Parameters:
+        - cookies: Emailnator cookies (the XSRF token is sent as a header).
+        - session: Optional Session shared with other Emailnator clients instead of opening a new one.
+        - email: Optional pre-generated address to adopt, skipping the generation requests.
+        - inbox_ads: Message IDs of the ads already in the inbox of a pre-generated address.
+        - retries: Maximum number of email generation attempts.
+        - retry_delay: Delay before the first retry, doubled after every failed attempt.
+        '''
         # Initialize inbox and advertisement inbox
         self.inbox = []
-        self.inbox_ads = []
+        self.inbox_ads = list(inbox_ads or [])
 
         # Set default headers if not provided
-        if not headers:
+        if not headers and not session:
             headers = {
                 'accept': 'application/json, text/plain, */*',
                 'accept-language': 'en-US,en;q=0.9',
@@ -43,8 +52,14 @@ class Emailnator:
                 'x-xsrf-token': unquote(cookies['XSRF-TOKEN']),
             }
 
-        # Initialize HTTP session
-        self.s = requests.Session(headers=headers, cookies=cookies)
+        # Initialize HTTP session, or reuse a shared one
+        self.s = session or requests.Session(headers=headers, cookies=cookies)
+
+        # Adopt a pre-generated address
+        if email:
+            self.email = email
+            self.seen_ids = set(self.inbox_ads)
+            return
 
         # Prepare email generation options
         data = {'email': []}
@@ -57,39 +72,51 @@ class Emailnator:
         if google_mail:
             data['email'].append('googleMail')
 
-        # Generate a new email address
-        while True:
+        # Generate a new email address, backing off between failed attempts
+        for attempt in range(retries):
             resp = self.s.post('https://www.emailnator.com/generate-email', json=data).json()
             if 'email' in resp:
                 break
 
+            time.sleep(retry_delay * 2 ** attempt)
+        else:
+            raise Exception('Email generation error', resp)
+
         self.email = resp['email'][0]  # Store the generated email address
 
         # Load initial inbox advertisements
         for ads in self.s.post('https://www.emailnator.com/message-list', json={'email': self.email}).json()['messageData']:
             self.inbox_ads.append(ads['messageID'])
 
-    def reload(self, wait=False, retry=5, timeout=30, wait_for=None):
+        # Message IDs of ads and inbox messages, for constant-time duplicate checks
+        self.seen_ids = set(self.inbox_ads)
+
+    def reload(self, wait=False, retry=5, timeout=30, wait_for=None, min_retry=0.25, backoff=2):
         '''
         Reloads the inbox to fetch new messages.
 
         Parameters:
         - wait: Whether to wait for new messages.
-        - retry: Retry interval in seconds.
+        - retry: Maximum interval between polls in seconds.
         - timeout: Maximum wait time in seconds.
         - wait_for: A function to filter messages.
+        - min_retry: Interval before the second poll; it grows by the backoff factor up to retry.
+        - backoff: Growth factor of the polling interval.
 
         Returns:
         - List of new messages.
         '''
         self.new_msgs = []
-        start = time.time()
+        new_ids = set()
+        deadline = time.time() + timeout
+        interval = min(min_retry, retry)
         wait_for_found = False
 
         while True:
-            # Fetch messages from the inbox
+            # Fetch messages from the inbox, skipping ads and messages already seen
             for msg in self.s.post('https://www.emailnator.com/message-list', json={'email': self.email}).json()['messageData']:
-                if msg['messageID'] not in self.inbox_ads and msg not in self.inbox:
+                if msg['messageID'] not in self.seen_ids and msg['messageID'] not in new_ids:
+                    new_ids.add(msg['messageID'])
                     self.new_msgs.append(msg)
 
                     if wait_for and wait_for(msg):
@@ -99,14 +126,18 @@ class Emailnator:
                 if wait_for_found:
                     break
 
-                if time.time() - start > timeout:
+                remaining = deadline - time.time()
+                if remaining <= 0:
                     return
 
-                time.sleep(retry)
+                # Poll quickly at first, then back off, without sleeping past the deadline
+                time.sleep(min(interval, remaining))
+                interval = min(interval * backoff, retry)
             else:
                 break
 
         self.inbox += self.new_msgs  # Update the inbox with new messages
+        self.seen_ids |= new_ids
         return self.new_msgs
 
     def open(self, msg_id):
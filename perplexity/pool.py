@@ -0,0 +1,102 @@
+# Importing necessary modules
+# queue: Thread-safe queue of idle clients
+# threading: Background warming of clients
+# contextlib: Context manager for borrowing a client
+import queue
+import threading
+from contextlib import contextmanager
+
+# Importing the Client class
+from .client import Client
+
+
+class ClientPool:
+    '''
+    A pool of clients created and warmed in the background, handed out with acquire/release.
+
+    Parameters:
+    - size: Number of clients in the pool.
+    - cookies: Cookies used by every client, or a list with one cookie dictionary per client (size is then ignored).
+    - max_age: Seconds after which a client's session is bootstrapped again when it is next acquired (None disables it).
+    - client_kwargs: Extra arguments passed to every Client.
+    '''
+
+    def __init__(self, size=4, cookies={}, max_age=3600, **client_kwargs):
+        self.cookies = cookies if isinstance(cookies, list) else [cookies] * size
+        assert self.cookies, 'The pool needs at least one client.'
+
+        self.max_age = max_age
+        self.client_kwargs = client_kwargs
+        self.idle = queue.Queue()
+        self.clients = []
+        self.lock = threading.Lock()
+
+        # Every client does its TLS handshake and session request in its own thread
+        self.warmers = [threading.Thread(target=self._warm, args=(cookies,), daemon=True) for cookies in self.cookies]
+        for thread in self.warmers:
+            thread.start()
+
+    def _warm(self, cookies):
+        '''
+        Creates and bootstraps a client, then adds it to the idle queue.
+        '''
+        client = Client(cookies, lazy=True, **self.client_kwargs)
+
+        try:
+            client.bootstrap()
+        except Exception:
+            # The session is bootstrapped again when the client is acquired
+            pass
+
+        with self.lock:
+            self.clients.append(client)
+
+        self.idle.put(client)
+
+    def wait_ready(self, timeout=None):
+        '''
+        Blocks until every client has been warmed.
+        '''
+        for thread in self.warmers:
+            thread.join(timeout)
+
+    def acquire(self, timeout=None):
+        '''
+        Takes an idle client out of the pool, waiting for one if needed.
+
+        Parameters:
+        - timeout: Maximum number of seconds to wait (None waits forever).
+
+        Returns:
+        - A client with a bootstrapped, unexpired session.
+        '''
+        try:
+            client = self.idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError('No idle client in the pool.')
+
+        try:
+            client.ensure_session(self.max_age)
+        except Exception:
+            self.idle.put(client)
+            raise
+
+        return client
+
+    def release(self, client):
+        '''
+        Returns a client to the pool.
+        '''
+        self.idle.put(client)
+
+    @contextmanager
+    def client(self, timeout=None):
+        '''
+        Context manager borrowing a client for the duration of a block.
+        '''
+        client = self.acquire(timeout)
+
+        try:
+            yield client
+        finally:
+            self.release(client)
@@ -0,0 +1,183 @@
+# Importing necessary modules
+# time: Last-use timestamps for load balancing
+# threading: Lock protecting quota reservations
+import time
+import threading
+
+# Importing the Client class
+from .client import Client
+
+# Modes that consume a pro (copilot) query
+PRO_MODES = ('pro', 'reasoning', 'deep research')
+
+
+class Account:
+    '''
+    Scheduling state of one client: quota reserved by in-flight queries and load counters.
+    '''
+    __slots__ = ('client', 'pending_copilot', 'pending_files', 'inflight', 'last_used')
+
+    def __init__(self, client):
+        self.client = client
+        self.pending_copilot = 0
+        self.pending_files = 0
+        self.inflight = 0
+        self.last_used = 0.0
+
+    def can_serve(self, pro, files):
+        '''
+        Checks whether the account has quota left for a query once in-flight reservations are counted.
+        '''
+        if pro and self.client.copilot - self.pending_copilot <= 0:
+            return False
+
+        return files <= self.client.file_upload - self.pending_files
+
+    def exhausted(self):
+        return self.client.copilot <= 0 and self.client.file_upload <= 0
+
+
+class Reservation:
+    '''
+    Quota held for one query on an account until search() charges the client for it.
+    '''
+    __slots__ = ('account', 'pro', 'files', 'charged')
+
+    def __init__(self, account, pro, files):
+        self.account = account
+        self.pro = pro
+        self.files = files
+        self.charged = False
+
+
+class AccountScheduler:
+    '''
+    Sends every query to an account that still has the quota its mode needs.
+
+    Among eligible accounts the one with the fewest in-flight queries is chosen, then the one with the
+    most remaining pro queries, then the least recently used one. Accounts without pro queries and
+    file uploads left are retired: they only keep serving 'auto' queries without attachments.
+
+    Parameters:
+    - accounts: List of Client instances or cookie dictionaries (clients are then created lazily).
+    - vault: Optional AccountVault the clients are stored in and their remaining quota saved to after every query.
+      The accounts it already holds (from an earlier run) are scheduled too.
+    - client_kwargs: Extra arguments passed to clients created from cookies.
+    '''
+
+    def __init__(self, accounts=(), vault=None, **client_kwargs):
+        stored = vault.clients(**client_kwargs) if vault is not None else ()
+        self._setup([account if isinstance(account, Client) else Client(account, lazy=True, **client_kwargs) for account in accounts], vault, stored)
+
+    def _setup(self, clients, vault=None, stored=()):
+        self.vault = vault
+        self.active = []
+        self.retired = []
+        self.lock = threading.Lock()
+
+        # Clients rebuilt from the vault are tracked first, so given accounts already stored are not scheduled twice
+        for client in stored:
+            self._track(client)
+
+        for client in clients:
+            self.add(client)
+
+    def add(self, client):
+        '''
+        Adds a client to the scheduler.
+        '''
+        if self.vault is not None and getattr(client, 'vault_id', None) is None:
+            self.vault.add(client)
+
+        self._track(client)
+
+    def _track(self, client):
+        '''
+        Starts scheduling queries to a client (already stored in the vault).
+        A client whose stored account is tracked already (rebuilt from the vault) takes its place.
+        '''
+        with self.lock:
+            vault_id = getattr(client, 'vault_id', None)
+
+            if vault_id is not None:
+                self.active = [a for a in self.active if getattr(a.client, 'vault_id', None) != vault_id]
+                self.retired = [a for a in self.retired if getattr(a.client, 'vault_id', None) != vault_id]
+
+            account = Account(client)
+            (self.retired if account.exhausted() else self.active).append(account)
+
+    def remaining(self):
+        '''
+        Returns the total pro queries and file uploads left across active accounts.
+        '''
+        with self.lock:
+            return {
+                'copilot': sum(a.client.copilot - a.pending_copilot for a in self.active),
+                'file_upload': sum(a.client.file_upload - a.pending_files for a in self.active),
+            }
+
+    def _reserve(self, mode, files):
+        '''
+        Picks an account for a query, reserves its quota and returns the Reservation.
+        '''
+        pro = mode in PRO_MODES
+
+        with self.lock:
+            candidates = self.active + self.retired if not pro and not files else self.active
+            eligible = [account for account in candidates if account.can_serve(pro, files)]
+            assert eligible, f'No account has quota left for a {mode!r} query with {files} file(s).'
+
+            account = min(eligible, key=lambda a: (a.inflight, -(a.client.copilot - a.pending_copilot), a.last_used))
+            account.pending_copilot += pro
+            account.pending_files += files
+            account.inflight += 1
+            account.last_used = time.monotonic()
+
+        return Reservation(account, pro, files)
+
+    def _charged(self, reservation):
+        '''
+        Drops the reserved quota once search() has charged the client, so it is not counted twice.
+        Passed to Client.search as on_charge; also run by _release when the query failed before the charge.
+        '''
+        with self.lock:
+            if reservation.charged:
+                return
+
+            reservation.charged = True
+            reservation.account.pending_copilot -= reservation.pro
+            reservation.account.pending_files -= reservation.files
+
+    def _finish(self, reservation):
+        '''
+        Ends a query and saves the remaining quota of the client to the vault.
+        '''
+        self._release(reservation)
+
+        if self.vault is not None:
+            self.vault.update(reservation.account.client)
+
+    def _release(self, reservation):
+        '''
+        Ends a query, dropping its reservation if it is still held, and retires exhausted accounts.
+        '''
+        self._charged(reservation)
+        account = reservation.account
+
+        with self.lock:
+            account.inflight -= 1
+
+            if account in self.active and account.exhausted():
+                self.active.remove(account)
+                self.retired.append(account)
+
+    def search(self, query, mode='auto', files={}, **kwargs):
+        '''
+        Executes a search query on the best account for its mode (see Client.search for the parameters).
+        '''
+        reservation = self._reserve(mode, len(files))
+
+        try:
+            return reservation.account.client.search(query, mode=mode, files=files, on_charge=lambda: self._charged(reservation), **kwargs)
+        finally:
+            self._finish(reservation)
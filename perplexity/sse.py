@@ -0,0 +1,111 @@
+# Frame delimiter used by the perplexity_ask endpoint
+DELIMITER = b'\r\n\r\n'
+
+
+class SSEParser:
+    '''
+    Incremental parser for the server-sent events of the perplexity_ask endpoint.
+
+    Raw network chunks are appended to a single reusable bytearray which is scanned for frame
+    boundaries. Only the 'event:' field is copied; the 'data:' field is handed out as a memoryview
+    into the buffer, valid until the parser is resumed, so it can go straight to a JSON decoder.
+    '''
+
+    def __init__(self, delimiter=DELIMITER):
+        self.delimiter = delimiter
+        self.buffer = bytearray()
+        self.start = 0  # Offset of the first byte of the current (incomplete) frame
+        self.scan = 0  # Offset from which the next delimiter search resumes
+
+    def feed(self, data):
+        '''
+        Adds a chunk of raw bytes and yields the frames it completes.
+
+        Parameters:
+        - data: Bytes received from the network.
+
+        Returns:
+        - Generator of (event, data) tuples; event is bytes, data a memoryview released on the next iteration.
+        '''
+        buf = self.buffer
+        buf += data
+        view = memoryview(buf)
+
+        try:
+            while True:
+                end = buf.find(self.delimiter, self.scan)
+
+                if end < 0:
+                    # The delimiter may straddle the chunk boundary, so re-scan its tail next time
+                    self.scan = max(self.start, len(buf) - len(self.delimiter) + 1)
+                    break
+
+                event, spans = self._fields(self.start, end)
+                self.start = self.scan = end + len(self.delimiter)
+
+                if len(spans) == 1:
+                    frame_data = view[spans[0][0]:spans[0][1]]
+
+                    try:
+                        yield event, frame_data
+                    finally:
+                        frame_data.release()
+                else:
+                    # Multi-line data fields are joined as the SSE specification requires
+                    yield event, b'\n'.join(buf[s:e] for s, e in spans)
+        finally:
+            view.release()
+
+        # Drop consumed frames once they make up most of the buffer
+        if self.start == len(buf):
+            buf.clear()
+            self.start = self.scan = 0
+        elif self.start > len(buf) // 2:
+            del buf[:self.start]
+            self.scan -= self.start
+            self.start = 0
+
+    def _fields(self, start, end):
+        '''
+        Locates the event name and the data spans of the frame buf[start:end].
+        '''
+        buf = self.buffer
+        event = b'message'
+        spans = []
+        pos = start
+
+        while pos < end:
+            eol = buf.find(b'\n', pos, end)
+            eol = end if eol < 0 else eol
+            line_end = eol - 1 if eol > pos and buf[eol - 1] == 13 else eol
+
+            if buf.startswith(b'data:', pos, line_end):
+                data_start = pos + 5
+                if data_start < line_end and buf[data_start] == 32:
+                    data_start += 1
+                spans.append((data_start, line_end))
+
+            elif buf.startswith(b'event:', pos, line_end):
+                event = bytes(buf[pos + 6:line_end]).strip()
+
+            pos = eol + 1
+
+        if not spans:
+            spans.append((end, end))
+
+        return event, spans
+
+    def iter_events(self, chunks):
+        '''
+        Generator of (event, data) tuples for an iterable of raw byte chunks.
+        '''
+        for chunk in chunks:
+            yield from self.feed(chunk)
+
+    async def aiter_events(self, chunks):
+        '''
+        Asynchronous counterpart of iter_events for an async iterable of raw byte chunks.
+        '''
+        async for chunk in chunks:
+            for event in self.feed(chunk):
+                yield event
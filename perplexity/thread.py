@@ -0,0 +1,185 @@
+# Importing necessary modules
+# os: Atomic replacement of the on-disk store
+# json: Serialization of the on-disk store
+# tempfile: Unique temporary file of each write
+# threading: Lock shared by concurrent conversations
+# uuid: Generating conversation identifiers
+# collections: Ordered dictionary used as the LRU list
+import os
+import json
+import tempfile
+import threading
+from uuid import uuid4
+from collections import OrderedDict
+
+
+def follow_up_state(fields, state=None):
+    '''
+    Returns the minimal follow-up state of a conversation, updated with the fields of a response.
+
+    Parameters:
+    - fields: A response chunk, or the 'meta' of a delta (only changed fields are present there).
+    - state: The previous state, kept for the fields missing from fields.
+
+    Returns:
+    - A tuple (backend_uuid, attachments).
+    '''
+    backend_uuid, attachments = state or (None, ())
+    return fields.get('backend_uuid', backend_uuid), tuple(fields.get('attachments') or attachments)
+
+
+class ThreadStore:
+    '''
+    Stores the follow-up state of many conversations, with LRU eviction.
+
+    Only the backend UUID and attachment URLs of the last response are kept per conversation, instead of
+    the whole last chunk.
+
+    Parameters:
+    - max_threads: Maximum number of conversations kept; the least recently used one is evicted first.
+    - path: Optional JSON file the store is loaded from and written to by save() (without it, save() does nothing).
+    '''
+
+    def __init__(self, max_threads=10000, path=None):
+        assert max_threads > 0, 'max_threads must be a positive number.'
+
+        self.max_threads = max_threads
+        self.path = path
+        self.threads = OrderedDict()  # thread id -> (backend_uuid, attachments)
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def __len__(self):
+        return len(self.threads)
+
+    def __contains__(self, thread_id):
+        return thread_id in self.threads
+
+    def get(self, thread_id):
+        '''
+        Returns the follow_up argument of Client.search for a conversation, or None for a new one.
+        '''
+        with self.lock:
+            state = self.threads.get(thread_id)
+
+            if state is None:
+                return None
+
+            self.threads.move_to_end(thread_id)
+
+        return {'backend_uuid': state[0], 'attachments': list(state[1])}
+
+    def update(self, thread_id, fields):
+        '''
+        Updates the state of a conversation with the fields of a response.
+        '''
+        with self.lock:
+            state = follow_up_state(fields, self.threads.get(thread_id))
+
+            if state[0] is None:
+                return
+
+            self.threads[thread_id] = state
+            self.threads.move_to_end(thread_id)
+
+            while len(self.threads) > self.max_threads:
+                self.threads.popitem(last=False)
+
+    def remove(self, thread_id):
+        '''
+        Forgets a conversation.
+        '''
+        with self.lock:
+            self.threads.pop(thread_id, None)
+
+    def load(self):
+        '''
+        Loads the conversations of the on-disk store.
+        '''
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                threads = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        with self.lock:
+            for thread_id, backend_uuid, attachments in threads:
+                self.threads[thread_id] = (backend_uuid, tuple(attachments))
+
+            while len(self.threads) > self.max_threads:
+                self.threads.popitem(last=False)
+
+    def save(self):
+        '''
+        Writes the store to disk, replacing it atomically.
+        '''
+        if not self.path:
+            return
+
+        with self.save_lock:
+            # The snapshot is taken under the lock, but conversations do not wait for the write
+            with self.lock:
+                threads = [[thread_id, *state] for thread_id, state in self.threads.items()]
+
+            directory, name = os.path.split(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'{name}.', suffix='.tmp')
+
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(threads, f)
+
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+
+class Conversation:
+    '''
+    A conversation whose queries are sent as follow-ups of each other.
+
+    Parameters:
+    - client: The Client the queries are sent with.
+    - store: The ThreadStore keeping the follow-up state.
+    - thread_id: Identifier of the conversation in the store (a new one is generated by default).
+    '''
+
+    def __init__(self, client, store, thread_id=None):
+        self.client = client
+        self.store = store
+        self.thread_id = thread_id or str(uuid4())
+
+    def search(self, query, stream=False, **kwargs):
+        '''
+        Executes a search query as a follow-up of the previous one (see Client.search for the parameters).
+        '''
+        resp = self.client.search(query, stream=stream, follow_up=self.store.get(self.thread_id), **kwargs)
+
+        if stream:
+            return self._track(resp, stream == 'delta')
+
+        self.store.update(self.thread_id, resp[-1] if isinstance(resp, list) else resp)
+        return resp
+
+    def _track(self, chunks, delta):
+        '''
+        Generator passing a stream through and storing the follow-up state of its last response.
+        '''
+        fields = {}
+
+        try:
+            for chunk in chunks:
+                fields.update(chunk['meta'] if delta else chunk)
+                yield chunk
+        finally:
+            if fields:
+                self.store.update(self.thread_id, fields)
+
+    def forget(self):
+        '''
+        Removes the conversation from the store.
+        '''
+        self.store.remove(self.thread_id)
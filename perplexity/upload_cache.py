@@ -0,0 +1,176 @@
+# Importing necessary modules
+# os: Atomic replacement of the on-disk store
+# json: Serialization of the on-disk store
+# time: Expiry timestamps
+# atexit: Writing pending changes on interpreter exit
+# hashlib: Content hashing of attachments
+# tempfile: Unique temporary files for atomic writes
+# mimetypes: Guessing MIME types of files
+# threading: Lock shared by concurrent uploads and the delayed save timer
+# collections: Ordered dictionary used as the LRU list
+import os
+import json
+import time
+import atexit
+import hashlib
+import tempfile
+import mimetypes
+import threading
+from collections import OrderedDict
+
+# Importing attachment helpers for hashing files without loading them
+from .attachments import update_digest
+
+
+class UploadCache:
+    '''
+    Content-addressed cache of uploaded attachment URLs, with TTL and LRU eviction.
+
+    Parameters:
+    - max_entries: Maximum number of cached URLs; the least recently used one is evicted first.
+    - ttl: Number of seconds an uploaded URL stays valid.
+    - path: Optional JSON file the cache is loaded from and saved to.
+    - save_delay: Seconds a change waits before the file is rewritten, so a burst of uploads costs one write
+      (0 writes on every put). Pending changes are also written by flush(), close() and at interpreter exit.
+    '''
+
+    def __init__(self, max_entries=256, ttl=3600, path=None, save_delay=5):
+        assert max_entries > 0 and ttl > 0, 'max_entries and ttl must be positive numbers.'
+        assert save_delay >= 0, 'save_delay must not be negative.'
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.save_delay = save_delay
+        self.entries = OrderedDict()  # key -> [url, expiry timestamp]
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()  # Serializes writers, so an older state never replaces a newer one
+        self.dirty = False
+        self.timer = None
+
+        if path:
+            if os.path.exists(path):
+                self.load()
+
+            atexit.register(self.flush)
+
+    @staticmethod
+    def key(filename, file):
+        '''
+        Returns the cache key of an attachment: a hash of its MIME type and content (files are hashed from disk).
+        '''
+        digest = hashlib.sha256((mimetypes.guess_type(filename)[0] or '').encode() + b'\0')
+        return update_digest(digest, file).hexdigest()
+
+    def get(self, key):
+        '''
+        Returns the cached URL for a key, or None if it is missing or expired.
+        '''
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None:
+                return None
+
+            if entry[1] <= time.time():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, url):
+        '''
+        Stores the URL of an uploaded attachment.
+        '''
+        self.put_many([(key, url)])
+
+    def put_many(self, items):
+        '''
+        Stores the URLs of several uploaded attachments, given as (key, url) pairs, with a single save.
+        '''
+        expires = time.time() + self.ttl
+
+        with self.lock:
+            for key, url in items:
+                self.entries[key] = [url, expires]
+                self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+            if not self.path:
+                return
+
+            self.dirty = True
+
+            if self.save_delay and self.timer is None:
+                self.timer = threading.Timer(self.save_delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+        if not self.save_delay:
+            self.flush()
+
+    def close(self):
+        '''
+        Writes pending changes and stops the exit hook, so a discarded cache can be garbage collected.
+        '''
+        if self.path:
+            atexit.unregister(self.flush)
+
+        self.flush()
+
+    def flush(self):
+        '''
+        Writes pending changes to the on-disk store now.
+        '''
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+            dirty, self.dirty = self.dirty, False
+
+        if dirty:
+            self.save()
+
+    def load(self):
+        '''
+        Loads the unexpired entries of the on-disk store.
+        '''
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        now = time.time()
+        with self.lock:
+            for key, (url, expires) in entries:
+                if expires > now:
+                    self.entries[key] = [url, expires]
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def save(self):
+        '''
+        Writes the cache to the on-disk store, replacing it atomically.
+        '''
+        with self.save_lock:
+            # The snapshot is taken under the lock, but lookups and puts do not wait for the write
+            with self.lock:
+                entries = list(self.entries.items())
+
+            directory, name = os.path.split(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'{name}.', suffix='.tmp')
+
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(entries, f)
+
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
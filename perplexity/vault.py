@@ -0,0 +1,130 @@
+# Importing necessary modules
+# json: Serialization of account cookies
+# time: Creation and last-use timestamps
+# sqlite3: On-disk account store
+# threading: Lock shared by concurrent queries
+import json
+import time
+import sqlite3
+import threading
+
+# Importing the Client class and the modes that consume pro queries
+from .client import Client
+from .scheduler import PRO_MODES
+
+
+class AccountVault:
+    '''
+    Persistent store of accounts and their remaining quota, so created accounts survive restarts.
+
+    Accounts are kept in a SQLite database with their cookies, creation time, remaining pro queries
+    and file uploads, and last-use time. Quota is stored as REAL so unlimited (own) accounts keep inf.
+
+    Parameters:
+    - path: Path of the SQLite database (':memory:' keeps it in memory).
+    '''
+
+    def __init__(self, path='perplexity_accounts.db'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+
+        with self.lock, self.db:
+            self.db.execute('''
+                CREATE TABLE IF NOT EXISTS accounts (
+                    id INTEGER PRIMARY KEY,
+                    cookies TEXT NOT NULL UNIQUE,
+                    own INTEGER NOT NULL,
+                    copilot REAL NOT NULL,
+                    file_upload REAL NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            # Best-account lookups read the accounts with the most pro queries left, least recently used first
+            self.db.execute('CREATE INDEX IF NOT EXISTS accounts_quota ON accounts (copilot DESC, file_upload DESC, last_used)')
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM accounts').fetchone()[0]
+
+    def add(self, client):
+        '''
+        Stores the account of a client (or updates it if its cookies are already stored) and returns its id.
+        '''
+        cookies = json.dumps(client.session.cookies.get_dict(), sort_keys=True)
+        now = time.time()
+
+        with self.lock, self.db:
+            self.db.execute('''
+                INSERT INTO accounts (cookies, own, copilot, file_upload, created, last_used) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (cookies) DO UPDATE SET copilot = excluded.copilot, file_upload = excluded.file_upload
+            ''', (cookies, client.own, client.copilot, client.file_upload, now, now))
+            client.vault_id = self.db.execute('SELECT id FROM accounts WHERE cookies = ?', (cookies,)).fetchone()[0]
+
+        return client.vault_id
+
+    def update(self, client):
+        '''
+        Saves the remaining quota of a stored client and marks it as just used.
+        '''
+        with self.lock, self.db:
+            self.db.execute(
+                'UPDATE accounts SET copilot = ?, file_upload = ?, last_used = ? WHERE id = ?',
+                (client.copilot, client.file_upload, time.time(), client.vault_id)
+            )
+
+    def remove(self, account_id):
+        '''
+        Deletes a stored account.
+        '''
+        with self.lock, self.db:
+            self.db.execute('DELETE FROM accounts WHERE id = ?', (account_id,))
+
+    def accounts(self, mode=None, files=0, limit=-1):
+        '''
+        Returns the stored accounts as dictionaries, best first.
+
+        Parameters:
+        - mode: Only accounts with quota left for this search mode (None returns all accounts).
+        - files: Only accounts with at least this many file uploads left.
+        - limit: Maximum number of accounts returned (-1 returns all of them).
+        '''
+        query = 'SELECT * FROM accounts WHERE file_upload >= ?'
+
+        if mode in PRO_MODES:
+            query += ' AND copilot > 0'
+
+        with self.lock:
+            rows = self.db.execute(query + ' ORDER BY copilot DESC, file_upload DESC, last_used LIMIT ?', (files, limit)).fetchall()
+
+        return [{**row, 'cookies': json.loads(row['cookies'])} for row in rows]
+
+    def best(self, mode='auto', files=0):
+        '''
+        Returns the stored account best suited for a query, or None if no account has the quota it needs.
+        '''
+        accounts = self.accounts(mode, files, limit=1)
+        return accounts[0] if accounts else None
+
+    @staticmethod
+    def restore(client, account):
+        '''
+        Applies the stored quota of an account to a client built from its cookies.
+        '''
+        client.own = bool(account['own'])
+        # Counters are stored as REAL for inf; limited accounts get their integer counts back
+        client.copilot, client.file_upload = (x if x == float('inf') else int(x) for x in (account['copilot'], account['file_upload']))
+        client.vault_id = account['id']
+        return client
+
+    def clients(self, mode=None, files=0, **client_kwargs):
+        '''
+        Rebuilds lazily bootstrapped clients from the stored accounts, best first (see accounts() for the filters).
+        '''
+        return [self.restore(Client(account['cookies'], lazy=True, **client_kwargs), account) for account in self.accounts(mode, files)]
+
+    def close(self):
+        with self.lock:
+            self.db.close()
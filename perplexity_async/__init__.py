@@ -1,5 +1,11 @@
 from .client import Client
-from .emailnator import Emailnator
+from .emailnator import Emailnator, EmailnatorPool, InboxPoller
 from .labs import LabsClient
+from .pool import ClientPool
+from .scheduler import AccountScheduler
+from .provisioner import AccountProvisioner
+from .vault import AccountVault
+from .thread import ThreadStore, Conversation
+from perplexity.upload_cache import UploadCache
 
-__all__ = ['Client', 'Emailnator', 'LabsClient']
\ No newline at end of file
+__all__ = ['Client', 'Emailnator', 'LabsClient', 'UploadCache', 'ClientPool', 'AccountScheduler', 'AccountProvisioner', 'InboxPoller', 'EmailnatorPool', 'AccountVault', 'ThreadStore', 'Conversation']
\ No newline at end of file
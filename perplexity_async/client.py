@@ -1,12 +1,18 @@
 import re
-import sys
-import json
+import time
+import asyncio
 import random
 import mimetypes
 from uuid import uuid4
+from collections import deque
 from curl_cffi import requests, CurlMime
 
 from .emailnator import Emailnator
+from .thread import ThreadStore, Conversation
+from perplexity.delta import aiter_deltas
+from perplexity.decoder import Decoder
+from perplexity.sse import SSEParser
+from perplexity.attachments import attachment_size, add_file_part
 
 
 class AsyncMixin:
@@ -32,7 +38,7 @@ class Client(AsyncMixin):
     '''
     A client for interacting with the Perplexity AI API.
     '''
-    async def __ainit__(self, cookies={}):
+    async def __ainit__(self, cookies={}, decoder=None, upload_cache=None, lazy=False, threads=None, max_concurrency=4):
         self.session = requests.AsyncSession(headers={
             'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
             'accept-language': 'en-US,en;q=0.9',
@@ -58,17 +64,46 @@ class Client(AsyncMixin):
         self.own = bool(cookies)
         self.copilot = 0 if not cookies else float('inf')
         self.file_upload = 0 if not cookies else float('inf')
+        self.decoder = decoder or Decoder()
+        self.upload_cache = upload_cache
+        self.threads = threads
+        # Limits the searches all search_many() batches of this client run at once
+        self.search_slots = asyncio.Semaphore(max_concurrency)
         self.signin_regex = re.compile(r'"(https://www\.perplexity\.ai/api/auth/callback/email\?callbackUrl=.*?)"')
         self.timestamp = format(random.getrandbits(32), '08x')
+        self.bootstrapped_at = None
+        
+        if not lazy:
+            await self.bootstrap()
+    
+    async def bootstrap(self):
+        '''
+        Function to initialize the session (deferred to the first use when the client is created with lazy=True)
+        '''
         await self.session.get('https://www.perplexity.ai/api/auth/session')
+        self.bootstrapped_at = time.time()
     
-    async def create_account(self, cookies):
+    async def ensure_session(self, max_age=None):
+        '''
+        Function to bootstrap the session if it was never initialized or is older than max_age seconds
+        '''
+        if self.bootstrapped_at is None or (max_age is not None and time.time() - self.bootstrapped_at > max_age):
+            await self.bootstrap()
+    
+    async def create_account(self, cookies, poller=None, emailnator_pool=None, attempts=10):
         '''
         Function to create a new account
+
+        poller: optional InboxPoller shared by parallel account creations to wait for the sign-in email.
+        emailnator_pool: optional EmailnatorPool handing out pre-generated addresses on a shared session.
+        attempts: number of sign-in attempts before giving up with an exception.
         '''
-        while True:
+        await self.ensure_session()
+        error = None
+        
+        for _ in range(attempts):
             try:
-                emailnator_cli = await Emailnator(cookies)
+                emailnator_cli = await emailnator_pool.get() if emailnator_pool else await Emailnator(cookies)
                 
                 resp = await self.session.post('https://www.perplexity.ai/api/auth/signin/email', data={
                     'email': emailnator_cli.email,
@@ -78,15 +113,20 @@ class Client(AsyncMixin):
                 })
                 
                 if resp.ok:
-                    new_msgs = await emailnator_cli.reload(wait_for=lambda x: x['subject'] == 'Sign in to Perplexity', timeout=20)
+                    if poller:
+                        new_msgs = await poller.wait(emailnator_cli, wait_for=lambda x: x['subject'] == 'Sign in to Perplexity', timeout=20)
+                    else:
+                        new_msgs = await emailnator_cli.reload(wait_for=lambda x: x['subject'] == 'Sign in to Perplexity', timeout=20)
                     
                     if new_msgs:
                         break
                 else:
                     print('Perplexity account creating error:', resp)
             
-            except Exception:
-                pass
+            except Exception as e:
+                error = e
+        else:
+            raise Exception(f'Perplexity account creating failed after {attempts} attempts', error)
         
         msg = emailnator_cli.get(func=lambda x: x['subject'] == 'Sign in to Perplexity')
         new_account_link = self.signin_regex.search(await emailnator_cli.open(msg['messageID'])).group(1)
@@ -98,9 +138,53 @@ class Client(AsyncMixin):
         
         return True
     
-    async def search(self, query, mode='auto', model=None, sources=['web'], files={}, stream=False, language='en-US', follow_up=None, incognito=False):
+    async def _upload_file(self, filename, file):
+        '''
+        Uploads a single attachment and returns its URL
+        '''
+        file_type = mimetypes.guess_type(filename)[0]
+        file_upload_info = (await self.session.post(
+            'https://www.perplexity.ai/rest/uploads/create_upload_url?version=2.18&source=default',
+            json={
+                'content_type': file_type,
+                'file_size': attachment_size(file),
+                'filename': filename,
+                'force_image': False,
+                'source': 'default',
+            }
+        )).json()
+        
+        mp = CurlMime()
+        for key, value in file_upload_info['fields'].items():
+            mp.addpart(name=key, data=value)
+        add_file_part(mp, filename, file_type, file)
+        
+        upload_resp = await self.session.post(file_upload_info['s3_bucket_url'], multipart=mp)
+        
+        if not upload_resp.ok:
+            raise Exception('File upload error', upload_resp)
+        
+        if 'image/upload' in file_upload_info['s3_object_url']:
+            return re.sub(
+                r'/private/s--.*?--/v\d+/user_uploads/',
+                '/private/user_uploads/',
+                upload_resp.json()['secure_url']
+            )
+        
+        return file_upload_info['s3_object_url']
+    
+    async def search(self, query, mode='auto', model=None, sources=['web'], files={}, stream=False, language='en-US', follow_up=None, incognito=False, history=1, upload_concurrency=4, on_charge=None):
         '''
         Query function
+
+        stream: True yields every cumulative chunk, 'delta' yields only the changes between chunks.
+        history: number of most recent response chunks to keep (1 keeps only the latest, None keeps all).
+        With a value other than 1 the non-streaming call returns the list of kept chunks.
+        upload_concurrency: maximum number of files uploaded at the same time.
+        files: dict mapping file names to contents, paths, file objects or mmaps; files on disk are streamed.
+        Only pathlib.Path (os.PathLike) values are read from disk; a str is always uploaded as text content.
+        Files found in the client's upload_cache reuse their URL and are neither uploaded nor charged.
+        on_charge: optional callable run right after the pro query and file upload counters are charged.
         '''
         assert mode in ['auto', 'pro', 'reasoning', 'deep research'], 'Search modes -> ["auto", "pro", "reasoning", "deep research"]'
         assert model in {
@@ -115,47 +199,42 @@ class Client(AsyncMixin):
     'deep research': [None]
 }'''
         assert all([source in ('web', 'scholar', 'social') for source in sources]), 'Sources -> ["web", "scholar", "social"]'
+        assert history is None or history > 0, 'History must be a positive number or None.'
+        assert upload_concurrency > 0, 'Upload concurrency must be a positive number.'
+        
+        # Hashing reads whole files, so it runs off the event loop and only once the parameters are valid
+        cache_keys = await asyncio.to_thread(
+            lambda: {filename: self.upload_cache.key(filename, file) for filename, file in files.items()}
+        ) if self.upload_cache and files else {}
+        uploaded_urls = {filename: url for filename, key in cache_keys.items() if (url := self.upload_cache.get(key))}
+        new_files = {filename: file for filename, file in files.items() if filename not in uploaded_urls}
+        
+        # Bootstrapped before charging, so a failed bootstrap does not use up quota
+        await self.ensure_session()
+        
+        # Checked and charged with no await in between, so concurrent searches can never overdraw the quota
         assert self.copilot > 0 if mode in ['pro', 'reasoning', 'deep research'] else True, 'You have used all of your enhanced (pro) queries'
-        assert self.file_upload - len(files) >= 0 if files else True, f'You have tried to upload {len(files)} files but you have {self.file_upload} file upload(s) remaining.'
+        assert self.file_upload - len(new_files) >= 0 if new_files else True, f'You have tried to upload {len(new_files)} files but you have {self.file_upload} file upload(s) remaining.'
         
         self.copilot = self.copilot - 1 if mode in ['pro', 'reasoning', 'deep research'] else self.copilot
-        self.file_upload = self.file_upload - len(files) if files else self.file_upload
-        
-        uploaded_files = []
-        
-        for filename, file in files.items():
-            file_type = mimetypes.guess_type(filename)[0]
-            file_upload_info = (await self.session.post(
-                'https://www.perplexity.ai/rest/uploads/create_upload_url?version=2.18&source=default',
-                json={
-                    'content_type': file_type,
-                    'file_size': sys.getsizeof(file),
-                    'filename': filename,
-                    'force_image': False,
-                    'source': 'default',
-                }
-            )).json()
-
-            mp = CurlMime()
-            for key, value in file_upload_info['fields'].items():
-                mp.addpart(name=key, data=value)
-            mp.addpart(name='file', content_type=file_type, filename=filename, data=file)
-
-            upload_resp = await self.session.post(file_upload_info['s3_bucket_url'], multipart=mp)
-            
-            if not upload_resp.ok:
-                raise Exception('File upload error', upload_resp)
-
-            if 'image/upload' in file_upload_info['s3_object_url']:
-                uploaded_url = re.sub(
-                    r'/private/s--.*?--/v\d+/user_uploads/',
-                    '/private/user_uploads/',
-                    upload_resp.json()['secure_url']
-                )
-            else:
-                uploaded_url = file_upload_info['s3_object_url']
-
-            uploaded_files.append(uploaded_url)
+        self.file_upload = self.file_upload - len(new_files) if new_files else self.file_upload
+        
+        if on_charge is not None:
+            on_charge()
+        
+        semaphore = asyncio.Semaphore(upload_concurrency)
+        
+        async def upload(filename, file):
+            async with semaphore:
+                return await self._upload_file(filename, file)
+        
+        # Every upload runs its create_upload_url and S3 requests independently; the query waits for the last URL
+        uploaded_urls.update(zip(new_files, await asyncio.gather(*[upload(filename, file) for filename, file in new_files.items()])))
+        
+        if self.upload_cache and new_files:
+            self.upload_cache.put_many((cache_keys[filename], uploaded_urls[filename]) for filename in new_files)
+        
+        uploaded_files = [uploaded_urls[filename] for filename in files]
         
         json_data = {
             'query_str': query,
@@ -198,33 +277,113 @@ class Client(AsyncMixin):
             }
         
         resp = await self.session.post('https://www.perplexity.ai/rest/sse/perplexity_ask', json=json_data, stream=True)
-        chunks = []
+        chunks = deque(maxlen=history)
         
         async def stream_response(resp):
-            async for chunk in resp.aiter_lines(delimiter=b'\r\n\r\n'):
-                content = chunk.decode('utf-8')
-                
-                if content.startswith('event: message\r\n'):
-                    content_json = json.loads(content[len('event: message\r\ndata: '):])
-                    content_json['text'] = json.loads(content_json['text'])
-                    
-                    chunks.append(content_json)
+            async for event, data in SSEParser().aiter_events(resp.aiter_content()):
+                if event == b'message':
+                    chunks.append(self.decoder.message(data))
                     yield chunks[-1]
                 
-                elif content.startswith('event: end_of_stream\r\n'):
+                elif event == b'end_of_stream':
                     return
         
+        if stream == 'delta':
+            return aiter_deltas(stream_response(resp))
+        
         if stream:
             return stream_response(resp)
         
-        async for chunk in resp.aiter_lines(delimiter=b'\r\n\r\n'):
-            content = chunk.decode('utf-8')
+        async for event, data in SSEParser().aiter_events(resp.aiter_content()):
+            if event == b'message':
+                chunks.append(self.decoder.message(data))
             
-            if content.startswith('event: message\r\n'):
-                content_json = json.loads(content[len('event: message\r\ndata: '):])
-                content_json['text'] = json.loads(content_json['text'])
-                
-                chunks.append(content_json)
+            elif event == b'end_of_stream':
+                return chunks[-1] if history == 1 else list(chunks)
+    
+    def thread(self, thread_id=None, store=None):
+        '''
+        Function to get a conversation whose queries are sent as follow-ups of each other
+
+        store: ThreadStore keeping the follow-up state, by default the one of the client (created on first use).
+        '''
+        if store is None:
+            if self.threads is None:
+                self.threads = ThreadStore()
             
-            elif content.startswith('event: end_of_stream\r\n'):
-                return chunks[-1]
+            store = self.threads
+        
+        return Conversation(self, store, thread_id)
+    
+    async def search_many(self, queries, concurrency=4, ordered=False, **kwargs):
+        '''
+        Batch query function
+
+        queries: iterable of query strings, or of dicts with search() arguments (merged over kwargs).
+        concurrency: number of searches the batch keeps in flight; all batches of the client together are
+        also limited by its max_concurrency (search_slots).
+        ordered: yield results in input order instead of as they complete; at most 2 * concurrency results
+        are buffered behind a slow query (workers wait instead of starting further queries).
+        Yields (index, result) tuples; when a query fails, result is the exception search() raised.
+        An error raised by the queries iterator itself stops the batch and is re-raised from the generator.
+        Quota is checked and charged by search() with no await in between, so concurrent items can never overdraw it.
+        '''
+        assert concurrency > 0, 'Concurrency must be a positive number.'
+        assert not kwargs.get('stream'), 'Streaming is not supported in batch queries.'
+        
+        items = enumerate(queries)
+        done = asyncio.Queue(maxsize=concurrency)
+        window = asyncio.Condition()
+        failures = []
+        next_index = 0
+        
+        async def worker():
+            try:
+                # Workers pull from the shared iterator, so queries are only materialized when a slot frees up
+                for index, query in items:
+                    if ordered:
+                        async with window:
+                            await window.wait_for(lambda: index < next_index + 2 * concurrency)
+                    
+                    params = dict(kwargs, **query) if isinstance(query, dict) else dict(kwargs, query=query)
+                    
+                    try:
+                        async with self.search_slots:
+                            result = await self.search(**params)
+                    except Exception as e:
+                        result = e
+                    
+                    await done.put((index, result))
+            except Exception as e:
+                failures.append(e)
+            
+            # Not reached when cancelled: the consumer is gone then and nobody waits for the sentinel
+            await done.put(None)
+        
+        workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+        running = len(workers)
+        pending = {}
+        
+        try:
+            while running:
+                item = await done.get()
+                
+                if item is None:
+                    running -= 1
+                    
+                    if failures:
+                        raise failures[0]
+                elif not ordered:
+                    yield item
+                else:
+                    pending[item[0]] = item[1]
+                    
+                    while next_index in pending:
+                        yield next_index, pending.pop(next_index)
+                        next_index += 1
+                    
+                    async with window:
+                        window.notify_all()
+        finally:
+            for task in workers:
+                task.cancel()
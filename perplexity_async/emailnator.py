@@ -24,86 +24,126 @@ class AsyncMixin:
     def __await__(self):
         return self.__initobj().__await__()
 
+
+def default_headers(cookies):
+    '''
+    Headers of the Emailnator API, carrying the XSRF token from the cookies
+    '''
+    return {
+        'accept': 'application/json, text/plain, */*',
+        'accept-language': 'en-US,en;q=0.9',
+        'content-type': 'application/json',
+        'dnt': '1',
+        'origin': 'https://www.emailnator.com',
+        'priority': 'u=1, i',
+        'referer': 'https://www.emailnator.com/',
+        'sec-ch-ua': '"Not;A=Brand";v="24", "Chromium";v="128"',
+        'sec-ch-ua-arch': '"x86"',
+        'sec-ch-ua-bitness': '"64"',
+        'sec-ch-ua-full-version': '"128.0.6613.120"',
+        'sec-ch-ua-full-version-list': '"Not;A=Brand";v="24.0.0.0", "Chromium";v="128.0.6613.120"',
+        'sec-ch-ua-mobile': '?0',
+        'sec-ch-ua-model': '""',
+        'sec-ch-ua-platform': '"Windows"',
+        'sec-ch-ua-platform-version': '"19.0.0"',
+        'sec-fetch-dest': 'empty',
+        'sec-fetch-mode': 'cors',
+        'sec-fetch-site': 'same-origin',
+        'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36',
+        'x-requested-with': 'XMLHttpRequest',
+        'x-xsrf-token': unquote(cookies['XSRF-TOKEN']),
+    }
+
+
+def email_types(domain=False, plus=False, dot=False, google_mail=True):
+    data = {'email': []}
+    
+    if domain:
+        data['email'].append('domain')
+    if plus:
+        data['email'].append('plusGmail')
+    if dot:
+        data['email'].append('dotGmail')
+    if google_mail:
+        data['email'].append('googleMail')
+    
+    return data
+
+
+async def generate_email(session, data, retries=10, retry_delay=0.5):
+    '''
+    Function to generate an address and record the IDs of the ads already in its inbox
+    
+    generate-email is retried up to retries times with exponential backoff starting at retry_delay seconds.
+    '''
+    for attempt in range(retries):
+        resp = (await session.post('https://www.emailnator.com/generate-email', json=data)).json()
+        
+        if 'email' in resp:
+            break
+        
+        await asyncio.sleep(retry_delay * 2 ** attempt)
+    else:
+        raise Exception('Email generation error', resp)
+    
+    email = resp['email'][0]
+    inbox_ads = [ads['messageID'] for ads in (await session.post('https://www.emailnator.com/message-list', json={'email': email})).json()['messageData']]
+    
+    return email, inbox_ads
+
+
 class Emailnator(AsyncMixin):
-    async def __ainit__(self, cookies, headers={}, domain=False, plus=False, dot=False, google_mail=True):
+    '''
+    session: optional AsyncSession shared with other instances (see EmailnatorPool).
+    email, inbox_ads: optional pre-generated address and its ad message IDs, skipping both generation requests.
+    '''
+    async def __ainit__(self, cookies, headers={}, domain=False, plus=False, dot=False, google_mail=True, session=None, email=None, inbox_ads=None, retries=10, retry_delay=0.5):
         self.inbox = []
-        self.inbox_ads = []
-        
-        if not headers:
-            headers = {
-                'accept': 'application/json, text/plain, */*',
-                'accept-language': 'en-US,en;q=0.9',
-                'content-type': 'application/json',
-                'dnt': '1',
-                'origin': 'https://www.emailnator.com',
-                'priority': 'u=1, i',
-                'referer': 'https://www.emailnator.com/',
-                'sec-ch-ua': '"Not;A=Brand";v="24", "Chromium";v="128"',
-                'sec-ch-ua-arch': '"x86"',
-                'sec-ch-ua-bitness': '"64"',
-                'sec-ch-ua-full-version': '"128.0.6613.120"',
-                'sec-ch-ua-full-version-list': '"Not;A=Brand";v="24.0.0.0", "Chromium";v="128.0.6613.120"',
-                'sec-ch-ua-mobile': '?0',
-                'sec-ch-ua-model': '""',
-                'sec-ch-ua-platform': '"Windows"',
-                'sec-ch-ua-platform-version': '"19.0.0"',
-                'sec-fetch-dest': 'empty',
-                'sec-fetch-mode': 'cors',
-                'sec-fetch-site': 'same-origin',
-                'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36',
-                'x-requested-with': 'XMLHttpRequest',
-                'x-xsrf-token': unquote(cookies['XSRF-TOKEN']),
-            }
-        
-        self.s = requests.AsyncSession(headers=headers, cookies=cookies, impersonate='chrome')
-        
-        data = {'email': []}
-        
-        if domain:
-            data['email'].append('domain')
-        if plus:
-            data['email'].append('plusGmail')
-        if dot:
-            data['email'].append('dotGmail')
-        if google_mail:
-            data['email'].append('googleMail')
+        self.s = session or requests.AsyncSession(headers=headers or default_headers(cookies), cookies=cookies, impersonate='chrome')
         
-        while True:
-            resp = (await self.s.post('https://www.emailnator.com/generate-email', json=data)).json()
-            
-            if 'email' in resp:
-                break
-        
-        self.email = resp['email'][0]
+        if email:
+            self.email, self.inbox_ads = email, list(inbox_ads or [])
+        else:
+            self.email, self.inbox_ads = await generate_email(self.s, email_types(domain, plus, dot, google_mail), retries, retry_delay)
         
-        for ads in (await self.s.post('https://www.emailnator.com/message-list', json={'email': self.email})).json()['messageData']:
-            self.inbox_ads.append(ads['messageID'])
+        self.seen_ids = set(self.inbox_ads)
     
-    async def reload(self, wait=False, retry=5, timeout=30, wait_for=None):
+    async def reload(self, wait=False, retry=5, timeout=30, wait_for=None, min_retry=0.25, backoff=2):
+        '''
+        Function to fetch new messages
+
+        Polling starts every min_retry seconds and backs off by the backoff factor up to retry seconds, until timeout.
+        '''
         self.new_msgs = []
-        start = time.time()
+        new_ids = set()
+        deadline = time.time() + timeout
+        interval = min(min_retry, retry)
         wait_for_found = False
         
-        while True:
-            for msg in (await self.s.post('https://www.emailnator.com/message-list', json={'email': self.email})).json()['messageData']:
-                if msg['messageID'] not in self.inbox_ads and msg not in self.inbox:
-                    self.new_msgs.append(msg)
-
-                    if wait_for and wait_for(msg):
-                        wait_for_found = True
+        while True:
+            for msg in (await self.s.post('https://www.emailnator.com/message-list', json={'email': self.email})).json()['messageData']:
+                if msg['messageID'] not in self.seen_ids and msg['messageID'] not in new_ids:
+                    new_ids.add(msg['messageID'])
+                    self.new_msgs.append(msg)
+
+                    if wait_for and wait_for(msg):
+                        wait_for_found = True
             
             if (wait and not self.new_msgs) or wait_for:
                 if wait_for_found:
                     break
                 
-                if time.time() - start > timeout:
+                remaining = deadline - time.time()
+                if remaining <= 0:
                     return
                 
-                await asyncio.sleep(retry)
+                await asyncio.sleep(min(interval, remaining))
+                interval = min(interval * backoff, retry)
             else:
                 break
         
         self.inbox += self.new_msgs
+        self.seen_ids |= new_ids
         return self.new_msgs
     
     async def open(self, msg_id):
@@ -112,4 +152,165 @@ class Emailnator(AsyncMixin):
     def get(self, func, msgs=[]):
         for msg in (msgs if msgs else self.inbox):
             if func(msg):
-                return msg
\ No newline at end of file
+                return msg
+
+
+class InboxPoller:
+    '''
+    Watches the inboxes of many Emailnator addresses from a single polling loop.
+
+    Every address is polled on its own adaptive schedule (min_retry seconds at first, growing by backoff
+    up to retry seconds) and at most concurrency message-list requests are in flight at once.
+    '''
+    def __init__(self, concurrency=8, min_retry=0.25, retry=5, backoff=2):
+        self.min_retry = min_retry
+        self.retry = retry
+        self.backoff = backoff
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.watches = []
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.polls = set()
+    
+    async def wait(self, emailnator, wait_for, timeout=30):
+        '''
+        Function to wait until a message matching wait_for arrives in the inbox of emailnator
+        
+        Returns the new messages (also added to emailnator.inbox), or None on timeout, like Emailnator.reload.
+        '''
+        loop = asyncio.get_running_loop()
+        watch = {
+            'emailnator': emailnator,
+            'wait_for': wait_for,
+            'future': loop.create_future(),
+            'msgs': [],
+            'interval': self.min_retry,
+            'next_poll': loop.time(),
+            'deadline': loop.time() + timeout,
+        }
+        self.watches.append(watch)
+        self.wakeup.set()
+        
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._run())
+        
+        try:
+            return await watch['future']
+        finally:
+            if watch in self.watches:
+                self.watches.remove(watch)
+    
+    async def _poll(self, watch):
+        loop = asyncio.get_running_loop()
+        
+        try:
+            async with self.semaphore:
+                new_msgs = await watch['emailnator'].reload()
+        except Exception:
+            new_msgs = []
+        
+        watch['msgs'] += new_msgs or []
+        
+        if watch['future'].done():
+            return
+        
+        if any(watch['wait_for'](msg) for msg in new_msgs or []):
+            watch['future'].set_result(watch['msgs'])
+        elif loop.time() >= watch['deadline']:
+            watch['future'].set_result(None)
+        else:
+            watch['next_poll'] = min(loop.time() + watch['interval'], watch['deadline'])
+            watch['interval'] = min(watch['interval'] * self.backoff, self.retry)
+            self.wakeup.set()
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        
+        while self.watches:
+            now = loop.time()
+            due = [watch for watch in self.watches if watch['next_poll'] <= now and not watch['future'].done()]
+            
+            for watch in due:
+                # Not polled again until this poll has finished
+                watch['next_poll'] = float('inf')
+                poll = asyncio.ensure_future(self._poll(watch))
+                # Kept until done, so close() can cancel it and it is not garbage collected mid-poll
+                self.polls.add(poll)
+                poll.add_done_callback(self.polls.discard)
+            
+            self.wakeup.clear()
+            next_poll = min((watch['next_poll'] for watch in self.watches), default=now)
+            
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), min(max(next_poll - loop.time(), 0), self.retry))
+            except asyncio.TimeoutError:
+                pass
+    
+    async def close(self):
+        '''
+        Function to stop polling; pending wait() calls return None, as on timeout
+        '''
+        tasks = [task for task in [self.task, *self.polls] if task is not None]
+        
+        for task in tasks:
+            task.cancel()
+        
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.task = None
+        
+        for watch in self.watches:
+            if not watch['future'].done():
+                watch['future'].set_result(None)
+
+
+class EmailnatorPool(AsyncMixin):
+    '''
+    Emailnator service sharing one keep-alive session and keeping pre-generated addresses ready.
+    
+    size: number of addresses kept ready (including the ones being generated).
+    concurrency: maximum number of addresses generated at the same time.
+    '''
+    async def __ainit__(self, cookies, size=5, concurrency=2, headers={}, domain=False, plus=False, dot=False, google_mail=True, retries=10, retry_delay=0.5):
+        self.cookies = cookies
+        self.data = email_types(domain, plus, dot, google_mail)
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.session = requests.AsyncSession(headers=headers or default_headers(cookies), cookies=cookies, impersonate='chrome')
+        self.ready = asyncio.Queue()
+        self.slots = asyncio.Semaphore(size)
+        self.workers = [asyncio.ensure_future(self._worker()) for _ in range(concurrency)]
+    
+    async def _worker(self):
+        while True:
+            await self.slots.acquire()
+            
+            try:
+                address = await generate_email(self.session, self.data, self.retries, self.retry_delay)
+            except asyncio.CancelledError:
+                self.slots.release()
+                raise
+            except Exception:
+                self.slots.release()
+                await asyncio.sleep(self.retry_delay)
+                continue
+            
+            self.ready.put_nowait(address)
+    
+    async def get(self, timeout=None):
+        '''
+        Function to get an Emailnator client on a pre-generated address, using the shared session
+        '''
+        email, inbox_ads = await asyncio.wait_for(self.ready.get(), timeout)
+        self.slots.release()
+        
+        return await Emailnator(self.cookies, session=self.session, email=email, inbox_ads=inbox_ads)
+    
+    async def close(self):
+        '''
+        Function to stop generating addresses and close the shared session
+        '''
+        for task in self.workers:
+            task.cancel()
+        
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        await self.session.close()
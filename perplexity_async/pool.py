@@ -0,0 +1,73 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from .client import AsyncMixin, Client
+
+
+class ClientPool(AsyncMixin):
+    '''
+    A pool of clients created and warmed in the background, handed out with acquire/release.
+
+    size: number of clients in the pool.
+    cookies: cookies used by every client, or a list with one cookie dictionary per client (size is then ignored).
+    max_age: seconds after which a client's session is bootstrapped again when it is next acquired (None disables it).
+    client_kwargs: extra arguments passed to every Client.
+    '''
+    async def __ainit__(self, size=4, cookies={}, max_age=3600, **client_kwargs):
+        self.cookies = cookies if isinstance(cookies, list) else [cookies] * size
+        assert self.cookies, 'The pool needs at least one client.'
+        
+        self.max_age = max_age
+        self.client_kwargs = client_kwargs
+        self.idle = asyncio.Queue()
+        self.clients = []
+        
+        # Warming runs in the background, awaiting the pool does not wait for it
+        self.warmers = [asyncio.ensure_future(self._warm(cookies)) for cookies in self.cookies]
+    
+    async def _warm(self, cookies):
+        client = await Client(cookies, lazy=True, **self.client_kwargs)
+        
+        try:
+            await client.bootstrap()
+        except Exception:
+            # The session is bootstrapped again when the client is acquired
+            pass
+        
+        self.clients.append(client)
+        self.idle.put_nowait(client)
+    
+    async def wait_ready(self):
+        '''
+        Function to wait until every client has been warmed
+        '''
+        await asyncio.gather(*self.warmers, return_exceptions=True)
+    
+    async def acquire(self, timeout=None):
+        '''
+        Function to take an idle client out of the pool, waiting for one if needed
+        '''
+        client = await asyncio.wait_for(self.idle.get(), timeout)
+        
+        try:
+            await client.ensure_session(self.max_age)
+        except BaseException:
+            self.idle.put_nowait(client)
+            raise
+        
+        return client
+    
+    def release(self, client):
+        self.idle.put_nowait(client)
+    
+    @asynccontextmanager
+    async def client(self, timeout=None):
+        '''
+        Function to borrow a client for the duration of an async with block
+        '''
+        client = await self.acquire(timeout)
+        
+        try:
+            yield client
+        finally:
+            self.release(client)
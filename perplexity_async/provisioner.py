@@ -0,0 +1,99 @@
+import asyncio
+
+from .client import AsyncMixin, Client
+from .emailnator import InboxPoller, EmailnatorPool
+
+
+class AccountProvisioner(AsyncMixin):
+    '''
+    Keeps a queue of freshly created accounts warm, so callers do not wait for account creation.
+
+    emailnator_cookies: cookies passed to Client.create_account.
+    size: number of accounts kept ready (including the ones being created).
+    concurrency: maximum number of accounts created at the same time.
+    retry_delay: seconds a worker waits after a failed creation.
+    vault: optional AccountVault every created account is stored in; accounts it already holds with pro queries left are served first.
+    client_kwargs: extra arguments passed to every Client.
+    '''
+    async def __ainit__(self, emailnator_cookies, size=5, concurrency=2, retry_delay=5, vault=None, **client_kwargs):
+        assert size > 0 and concurrency > 0, 'size and concurrency must be positive numbers.'
+        
+        self.emailnator_cookies = emailnator_cookies
+        self.client_kwargs = client_kwargs
+        self.retry_delay = retry_delay
+        self.vault = vault
+        self.ready = asyncio.Queue()
+        self.created = 0
+        self.failed = 0
+        
+        # One poller watches the inboxes of all accounts being created, and addresses are generated ahead on one session
+        self.poller = InboxPoller()
+        self.emailnator_pool = await EmailnatorPool(emailnator_cookies, size=size, concurrency=concurrency)
+        
+        # A slot is taken for every account being created or waiting in the queue, and freed when one is consumed
+        self.slots = asyncio.Semaphore(size)
+        
+        # Accounts stored by an earlier run are queued before any new one is created, and take slots like them
+        if vault is not None:
+            for client in (await vault.clients('pro', **client_kwargs))[:size]:
+                await self.slots.acquire()
+                self.ready.put_nowait(client)
+        
+        self.workers = [asyncio.ensure_future(self._worker()) for _ in range(concurrency)]
+    
+    async def _worker(self):
+        while True:
+            await self.slots.acquire()
+            
+            try:
+                client = await Client(lazy=True, **self.client_kwargs)
+                await client.create_account(self.emailnator_cookies, poller=self.poller, emailnator_pool=self.emailnator_pool)
+            except asyncio.CancelledError:
+                self.slots.release()
+                raise
+            except Exception:
+                self.failed += 1
+                self.slots.release()
+                await asyncio.sleep(self.retry_delay)
+                continue
+            
+            self.created += 1
+            
+            # A vault failure must not lose the account: it is still handed out, just not stored
+            if self.vault is not None:
+                try:
+                    await self.vault.add(client)
+                except asyncio.CancelledError:
+                    self.ready.put_nowait(client)
+                    raise
+                except Exception as e:
+                    print('Perplexity account vault error:', e)
+            
+            self.ready.put_nowait(client)
+    
+    async def get(self, timeout=None):
+        '''
+        Function to take a ready account, waiting for one to be created if the queue is empty
+        '''
+        client = await asyncio.wait_for(self.ready.get(), timeout)
+        self.slots.release()
+        return client
+    
+    def get_nowait(self):
+        '''
+        Function to take a ready account, raising asyncio.QueueEmpty if none is ready
+        '''
+        client = self.ready.get_nowait()
+        self.slots.release()
+        return client
+    
+    async def close(self):
+        '''
+        Function to stop creating accounts
+        '''
+        for task in self.workers:
+            task.cancel()
+        
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        await self.poller.close()
+        await self.emailnator_pool.close()
@@ -0,0 +1,39 @@
+from .client import AsyncMixin, Client
+from perplexity.scheduler import AccountScheduler as BaseScheduler
+
+
+class AccountScheduler(AsyncMixin, BaseScheduler):
+    '''
+    Sends every query to an account that still has the quota its mode needs (see perplexity.scheduler.AccountScheduler).
+
+    accounts: list of Client instances or cookie dictionaries (clients are then created lazily).
+    vault: optional AccountVault the clients are stored in and their remaining quota saved to after every query; the accounts it already holds are scheduled too.
+    '''
+    async def __ainit__(self, accounts=(), vault=None, **client_kwargs):
+        self._setup([], vault, await vault.clients(**client_kwargs) if vault is not None else ())
+        
+        for account in accounts:
+            await self.add(account if isinstance(account, Client) else await Client(account, lazy=True, **client_kwargs))
+    
+    async def add(self, client):
+        '''
+        Function to add a client to the scheduler (and to the vault, if it is not stored yet)
+        '''
+        if self.vault is not None and getattr(client, 'vault_id', None) is None:
+            await self.vault.add(client)
+        
+        self._track(client)
+    
+    async def search(self, query, mode='auto', files={}, **kwargs):
+        '''
+        Query function routed to the best account for the mode
+        '''
+        reservation = self._reserve(mode, len(files))
+        
+        try:
+            return await reservation.account.client.search(query, mode=mode, files=files, on_charge=lambda: self._charged(reservation), **kwargs)
+        finally:
+            self._release(reservation)
+            
+            if self.vault is not None:
+                await self.vault.update(reservation.account.client)
@@ -0,0 +1,44 @@
+import asyncio
+
+from perplexity.thread import ThreadStore as BaseThreadStore, Conversation as BaseConversation
+
+
+class ThreadStore(BaseThreadStore):
+    '''
+    Stores the follow-up state of many conversations, with LRU eviction (see perplexity.thread.ThreadStore).
+    
+    The on-disk write runs in a worker thread (asyncio.to_thread), so a slow disk never blocks the event loop.
+    '''
+    async def save(self):
+        '''
+        Function to write the store to disk, replacing it atomically (does nothing without a path)
+        '''
+        await asyncio.to_thread(super().save)
+
+
+class Conversation(BaseConversation):
+    '''
+    A conversation whose queries are sent as follow-ups of each other (see perplexity.thread.Conversation).
+    '''
+    async def search(self, query, stream=False, **kwargs):
+        '''
+        Query function sending the query as a follow-up of the previous one
+        '''
+        resp = await self.client.search(query, stream=stream, follow_up=self.store.get(self.thread_id), **kwargs)
+        
+        if stream:
+            return self._track(resp, stream == 'delta')
+        
+        self.store.update(self.thread_id, resp[-1] if isinstance(resp, list) else resp)
+        return resp
+    
+    async def _track(self, chunks, delta):
+        fields = {}
+        
+        try:
+            async for chunk in chunks:
+                fields.update(chunk['meta'] if delta else chunk)
+                yield chunk
+        finally:
+            if fields:
+                self.store.update(self.thread_id, fields)
@@ -0,0 +1,54 @@
+import asyncio
+
+from .client import Client
+from perplexity.vault import AccountVault as BaseVault
+
+
+class AccountVault(BaseVault):
+    '''
+    Persistent store of accounts and their remaining quota (see perplexity.vault.AccountVault).
+    
+    The SQLite calls run in a worker thread (asyncio.to_thread), so a slow disk never blocks the event loop.
+    '''
+    async def add(self, client):
+        '''
+        Function to store the account of a client (or update it if its cookies are already stored) and return its id
+        '''
+        return await asyncio.to_thread(super().add, client)
+    
+    async def update(self, client):
+        '''
+        Function to save the remaining quota of a stored client and mark it as just used
+        '''
+        await asyncio.to_thread(super().update, client)
+    
+    async def remove(self, account_id):
+        '''
+        Function to delete a stored account
+        '''
+        await asyncio.to_thread(super().remove, account_id)
+    
+    async def accounts(self, mode=None, files=0, limit=-1):
+        '''
+        Function to return the stored accounts as dictionaries, best first
+        '''
+        return await asyncio.to_thread(super().accounts, mode, files, limit)
+    
+    async def best(self, mode='auto', files=0):
+        '''
+        Function to return the stored account best suited for a query, or None if no account has the quota it needs
+        '''
+        accounts = await self.accounts(mode, files, limit=1)
+        return accounts[0] if accounts else None
+    
+    async def clients(self, mode=None, files=0, **client_kwargs):
+        '''
+        Function to rebuild lazily bootstrapped clients from the stored accounts, best first
+        '''
+        return [self.restore(await Client(account['cookies'], lazy=True, **client_kwargs), account) for account in await self.accounts(mode, files)]
+    
+    async def close(self):
+        '''
+        Function to close the database
+        '''
+        await asyncio.to_thread(super().close)
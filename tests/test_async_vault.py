@@ -0,0 +1,35 @@
+import asyncio
+import os
+import sys
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import perplexity_async
+
+
+def test_vault_round_trip_through_the_scheduler():
+    async def main():
+        vault = perplexity_async.AccountVault(':memory:')
+        client = await perplexity_async.Client({'session': 'a'}, lazy=True)
+        client.copilot, client.file_upload = 3, 2
+
+        scheduler = await perplexity_async.AccountScheduler([client], vault=vault)
+        client.copilot = 1
+        await vault.update(client)
+
+        best = await vault.best('pro')
+        restored = await vault.clients()
+        await vault.remove(client.vault_id)
+        remaining = len(vault)
+        await vault.close()
+        return scheduler, client, best, restored, remaining
+
+    scheduler, client, best, restored, remaining = asyncio.run(main())
+
+    assert client.vault_id == best['id'] and best['copilot'] == 1
+    assert restored[0].copilot == 1 and restored[0].file_upload == 2
+    assert scheduler.remaining() == {'copilot': 1, 'file_upload': 2}
+    assert remaining == 0
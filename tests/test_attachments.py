@@ -0,0 +1,92 @@
+import hashlib
+import io
+import mmap
+import os
+import pathlib
+import sys
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from perplexity import attachments
+from perplexity.attachments import add_file_part, attachment_size, update_digest
+
+
+class FakeMime:
+    '''
+    Records the parts added to a CurlMime form.
+    '''
+    def __init__(self):
+        self.parts = []
+
+    def addpart(self, **kwargs):
+        self.parts.append(kwargs)
+
+
+def part(file):
+    mp = FakeMime()
+    add_file_part(mp, 'a.txt', 'text/plain', file)
+    assert len(mp.parts) == 1
+    return mp.parts[0]
+
+
+def sha256(file):
+    return update_digest(hashlib.sha256(), file).hexdigest()
+
+
+def test_paths_are_streamed_from_disk(tmp_path):
+    path = tmp_path / 'a.txt'
+    path.write_bytes(b'content')
+
+    for file in (path, pathlib.PurePath(path)):
+        assert part(file) == {'name': 'file', 'content_type': 'text/plain', 'filename': 'a.txt', 'local_path': str(path)}
+
+    with open(path, 'rb') as f:
+        f.read(3)
+        # A file object on a regular file is streamed whole, whatever its position
+        assert part(f)['local_path'] == str(path)
+
+
+def test_buffers_are_sent_as_bytes():
+    for file in (b'content', bytearray(b'content'), memoryview(b'xcontentx')[1:-1], io.BytesIO(b'content')):
+        data = part(file)['data']
+        assert type(data) is bytes and data == b'content'
+
+
+def test_sizes_and_digests_match_the_content(tmp_path):
+    content = os.urandom(3 * attachments.BLOCK_SIZE // 2)
+    path = tmp_path / 'a.bin'
+    path.write_bytes(content)
+    expected = hashlib.sha256(content).hexdigest()
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        files = [content, bytearray(content), memoryview(content), mm, path, f]
+
+        for file in files:
+            assert attachment_size(file) == len(content)
+            assert sha256(file) == expected
+
+    assert attachment_size(memoryview(content).cast('I')) == len(content)
+    assert attachment_size('zażółć') == len('zażółć'.encode()) == 10
+
+
+def test_other_file_objects_keep_their_position():
+    f = io.BytesIO(b'headercontent')
+    f.seek(6)
+
+    assert attachment_size(f) == 7
+    assert sha256(f) == hashlib.sha256(b'content').hexdigest()
+    assert f.tell() == 6
+
+
+def test_strings_are_content_not_paths(tmp_path):
+    path = tmp_path / 'secret.txt'
+    path.write_bytes(b'secret')
+
+    assert not attachments.is_path(str(path))
+    assert attachments.disk_path(str(path)) is None
+    assert part(str(path)) == {'name': 'file', 'content_type': 'text/plain', 'filename': 'a.txt', 'data': str(path).encode()}
+    assert attachment_size(str(path)) == len(str(path).encode())
+    assert sha256(str(path)) == hashlib.sha256(str(path).encode()).hexdigest()
@@ -0,0 +1,78 @@
+import os
+import sys
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from packages.cache.src.keys import KluczCache, normalizuj_prompt, zbuduj_klucz
+from packages.cache.src.memory_cache import PamięćKlasowa
+
+
+def test_prompt_normalization():
+    # NFKC folds compatibility characters (full-width letters, ligatures)
+    assert normalizuj_prompt('Ｐｙｔｈｏｎ ﬁles') == 'python files'
+    # casefold goes further than lower()
+    assert normalizuj_prompt('STRASSE') == normalizuj_prompt('straße')
+    assert normalizuj_prompt('  what\tis\n\n  python?  ') == 'what is python?'
+
+
+def test_equivalent_prompts_share_a_key():
+    assert zbuduj_klucz('What is  Python?') == zbuduj_klucz(' what is python? ')
+    assert zbuduj_klucz('q', źródła=['web', 'scholar']) == zbuduj_klucz('q', źródła=('scholar', 'web', 'web'))
+    assert zbuduj_klucz('q', model='GPT-4o', język='EN-us') == zbuduj_klucz('q', model='gpt-4o', język='en-US')
+
+
+def test_key_depends_on_every_parameter():
+    base = zbuduj_klucz('q')
+    variants = [
+        zbuduj_klucz('q', tryb='pro'),
+        zbuduj_klucz('q', model='gpt-4o'),
+        zbuduj_klucz('q', źródła=['scholar']),
+        zbuduj_klucz('q', język='pl-PL'),
+        zbuduj_klucz('other'),
+    ]
+
+    assert len({base, *variants}) == len(variants) + 1
+    assert zbuduj_klucz('q', tryb='Deep Research').klasa == 'deep_research'
+    assert KluczCache.z_tekstu(str(base)) == base
+
+
+def test_classes_have_their_own_ttl_and_size():
+    cache = PamięćKlasowa({'pro': {'ttl': 60, 'max_entries': 2}}, max_entries=10, ttl=3600)
+
+    assert cache.ttl_klasy('pro') == 60
+    assert cache.ttl_klasy('auto') == 3600
+
+    keys = {tryb: [zbuduj_klucz(f'q{i}', tryb=tryb) for i in range(3)] for tryb in ('pro', 'auto')}
+    for tryb, klucze in keys.items():
+        for k in klucze:
+            cache.set(k, tryb)
+
+    # The pro class holds two entries, auto keeps all of its own
+    assert [cache.get(k) for k in keys['pro']] == [None, 'pro', 'pro']
+    assert [cache.get(k) for k in keys['auto']] == ['auto'] * 3
+    assert cache.stat()['len'] == 5
+
+
+def test_class_policies_override_the_defaults():
+    cache = PamięćKlasowa({'pro': {'grace': 30, 'max_bytes': 5000, 'compress_threshold': 100, 'policy': 'tinylfu'}},
+                          okres_łaski=5)
+    pro, auto = cache._pamięć('pro'), cache._pamięć('auto')
+
+    assert (pro.okres_łaski, pro.max_bajtów, pro.próg_kompresji, pro.polityka) == (30, 5000, 100, 'tinylfu')
+    assert (auto.okres_łaski, auto.max_bajtów, auto.próg_kompresji, auto.polityka) == (5, 0, 0, 'lru')
+    # Background refreshes are limited across classes
+    assert pro._zadania is auto._zadania
+
+
+def test_entry_ttl_is_capped_by_the_class_ttl():
+    cache = PamięćKlasowa({'pro': {'ttl': 60}})
+    short, long = zbuduj_klucz('a', tryb='pro'), zbuduj_klucz('b', tryb='pro')
+    cache.set(short, 1, ttl=5)
+    cache.set(long, 1, ttl=600)
+    pamięć = cache._pamięć('pro')
+
+    assert pamięć.cache[short.skrót][1] - pamięć.cache.timer() <= 5
+    assert 5 < pamięć.cache[long.skrót][1] - pamięć.cache.timer() <= 60
@@ -0,0 +1,28 @@
+import json
+import os
+import sys
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from perplexity.decoder import Decoder, LazyMessage, available_backends
+
+DATA = json.dumps({'status': 'PENDING', 'text': json.dumps([{'step_type': 'INITIAL_QUERY'}])}).encode()
+
+
+def test_backends_decode_identically():
+    expected = {'status': 'PENDING', 'text': [{'step_type': 'INITIAL_QUERY'}]}
+
+    for backend in available_backends():
+        assert Decoder(backend).message(DATA) == expected
+
+
+def test_lazy_text_is_decoded_on_access():
+    message = Decoder('json', lazy_text=True).message(DATA)
+
+    assert isinstance(message, LazyMessage)
+    assert isinstance(dict.__getitem__(message, 'text'), str)
+    assert message['text'] == [{'step_type': 'INITIAL_QUERY'}]
+    assert dict(message.items())['text'] == [{'step_type': 'INITIAL_QUERY'}]
@@ -0,0 +1,50 @@
+import json
+import os
+import sys
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from perplexity.delta import DeltaTracker, iter_deltas, rebuild
+
+
+def make_chunk(answer, web_results=(), steps=(), status='PENDING'):
+    final = {'step_type': 'FINAL', 'content': {'answer': json.dumps({'answer': answer, 'web_results': list(web_results)})}}
+    return {'status': status, 'backend_uuid': 'abc', 'text': list(steps) + [final]}
+
+
+def test_delta_reports_only_appended_text():
+    tracker = DeltaTracker()
+    tracker.update(make_chunk('Hello'))
+    delta = tracker.update(make_chunk('Hello world'))
+
+    assert delta['answer'] == ' world'
+    assert not delta['replace']
+    assert delta['meta'] == {}
+
+
+def test_delta_skips_unchanged_chunks():
+    tracker = DeltaTracker()
+    tracker.update(make_chunk('Hello'))
+
+    assert tracker.update(make_chunk('Hello')) is None
+
+
+def test_rebuild_matches_last_chunk():
+    search_step = {'step_type': 'SEARCH_WEB', 'content': {'queries': ['q']}}
+    source = {'url': 'https://example.com', 'name': 'Example'}
+    chunks = [
+        make_chunk(''),
+        make_chunk('Hel', steps=[search_step]),
+        make_chunk('Hello', [source], steps=[search_step]),
+        make_chunk('Hallo!', [source], steps=[search_step], status='COMPLETED'),
+    ]
+
+    state = rebuild(iter_deltas(chunks))
+
+    assert state['answer'] == 'Hallo!'
+    assert state['sources'] == [source]
+    assert state['steps'] == [search_step]
+    assert state['meta'] == {'status': 'COMPLETED', 'backend_uuid': 'abc'}
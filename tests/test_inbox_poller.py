@@ -0,0 +1,34 @@
+import asyncio
+import os
+import sys
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from perplexity_async.emailnator import InboxPoller
+
+
+class SlowInbox:
+    async def reload(self):
+        await asyncio.sleep(10)
+        return []
+
+
+def test_close_cancels_polls_and_releases_waiters():
+    async def main():
+        poller = InboxPoller()
+        waiter = asyncio.ensure_future(poller.wait(SlowInbox(), lambda msg: True, timeout=30))
+        await asyncio.sleep(0.05)
+        polls = set(poller.polls)
+
+        await poller.close()
+
+        return polls, await waiter, poller
+
+    polls, result, poller = asyncio.run(main())
+
+    assert len(polls) == 1 and all(poll.cancelled() for poll in polls)
+    assert result is None
+    assert not poller.polls and poller.task is None
@@ -0,0 +1,230 @@
+import asyncio
+import os
+import sys
+import zlib
+
+from cachetools import TTLCache
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from packages.cache.src.memory_cache import PamięćLRU, _Skompresowane
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def with_clock(cache, clock):
+    cache.cache = TTLCache(maxsize=100, ttl=cache.ttl + cache.okres_łaski, timer=clock)
+    return cache
+
+
+def loader(calls, value, delay=0.01, error=None):
+    async def load():
+        calls.append(value)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return value
+
+    return load
+
+
+def test_grace_window_serves_stale_and_refreshes_once_in_the_background():
+    async def main():
+        clock, calls = Clock(), []
+        cache = with_clock(PamięćLRU(ttl=10, okres_łaski=5), clock)
+        cache.set('k', 'old')
+        clock.now = 12
+
+        stale = await cache.pobierz_lub_odswiez('k', loader(calls, 'new'))
+        await asyncio.sleep(0.05)
+        fresh = await cache.pobierz_lub_odswiez('k', loader(calls, 'newer'))
+        return cache, calls, stale, fresh
+
+    cache, calls, stale, fresh = asyncio.run(main())
+
+    assert (stale, fresh) == ('old', 'new')
+    assert calls == ['new']
+    assert cache.stat()['stale_hits'] == 1 and cache.stat()['refreshes'] == 1
+
+
+def test_entry_past_the_grace_window_is_loaded_again():
+    async def main():
+        clock, calls = Clock(), []
+        cache = with_clock(PamięćLRU(ttl=10, okres_łaski=5), clock)
+        cache.set('k', 'old')
+        clock.now = 15
+        return await cache.pobierz_lub_odswiez('k', loader(calls, 'new')), calls
+
+    assert asyncio.run(main()) == ('new', ['new'])
+
+
+def test_popular_entry_is_refreshed_ahead_of_expiry():
+    async def main():
+        clock, calls = Clock(), []
+        cache = with_clock(PamięćLRU(ttl=10, odświeżanie_z_wyprzedzeniem=0.2, min_trafień=2), clock)
+        cache.set('k', 'old')
+
+        # Not popular enough yet, then too early, then close to expiry
+        await cache.pobierz_lub_odswiez('k', loader(calls, 'early'))
+        clock.now = 5
+        await cache.pobierz_lub_odswiez('k', loader(calls, 'early'))
+        clock.now = 9
+        value = await cache.pobierz_lub_odswiez('k', loader(calls, 'new'))
+        await asyncio.sleep(0.05)
+        return cache, calls, value
+
+    cache, calls, value = asyncio.run(main())
+
+    assert value == 'old' and calls == ['new']
+    assert cache.get('k') == 'new'
+    # The refreshed entry got a full TTL from the time of the refresh
+    assert cache.cache['k'][1] == 19
+
+
+def test_failed_refresh_keeps_the_old_value():
+    async def main():
+        clock, calls = Clock(), []
+        cache = with_clock(PamięćLRU(ttl=10, okres_łaski=5), clock)
+        cache.set('k', 'old')
+        clock.now = 12
+
+        await cache.pobierz_lub_odswiez('k', loader(calls, 'new', error=ConnectionError('upstream')))
+        await asyncio.sleep(0.05)
+        kept = cache._wpis('k')[0], dict(cache._odświeżane)
+
+        # The stale entry is still served, and the next read retries the refresh
+        value = await cache.pobierz_lub_odswiez('k', loader(calls, 'new', delay=0))
+        await asyncio.sleep(0.05)
+        return cache, calls, kept, value
+
+    cache, calls, kept, value = asyncio.run(main())
+
+    assert kept == ('old', {})
+    assert value == 'old' and len(calls) == 2
+    assert cache.get('k') == 'new'
+
+
+def test_concurrent_stale_reads_start_one_refresh():
+    async def main():
+        clock, calls = Clock(), []
+        cache = with_clock(PamięćLRU(ttl=10, okres_łaski=5), clock)
+        cache.set('k', 'old')
+        clock.now = 12
+
+        values = await asyncio.gather(*(cache.pobierz_lub_odswiez('k', loader(calls, 'new', delay=0.05)) for _ in range(10)))
+        await asyncio.sleep(0.1)
+        return cache, calls, values
+
+    cache, calls, values = asyncio.run(main())
+
+    assert values == ['old'] * 10
+    assert calls == ['new']
+    assert cache.stat()['stale_hits'] == 10 and cache.stat()['refreshes'] == 1
+
+
+def test_background_refreshes_are_bounded():
+    async def main():
+        clock, calls = Clock(), []
+        shared = set()
+        a = with_clock(PamięćLRU(ttl=10, okres_łaski=5, max_odświeżań=2, zadania_odświeżania=shared), clock)
+        b = with_clock(PamięćLRU(ttl=10, okres_łaski=5, max_odświeżań=2, zadania_odświeżania=shared), clock)
+
+        for cache in (a, b):
+            for k in 'xyz':
+                cache.set(k, 'old')
+        clock.now = 12
+
+        for cache in (a, b):
+            for k in 'xyz':
+                await cache.pobierz_lub_odswiez(k, loader(calls, k, delay=0.05))
+
+        running = len(shared)
+        await asyncio.sleep(0.1)
+        return a, b, calls, running, len(shared)
+
+    a, b, calls, running, done = asyncio.run(main())
+
+    # The limit of 2 is shared by both caches
+    assert running == 2 and done == 0
+    assert len(calls) == 2
+    assert a.stat()['refreshes'] == 2 and a.stat()['refreshes_skipped'] == 1
+    assert b.stat()['refreshes'] == 0 and b.stat()['refreshes_skipped'] == 3
+
+
+def test_byte_budget_evicts_least_recently_used_entries():
+    value = os.urandom(1000)
+    size = sys.getsizeof(value)
+    cache = PamięćLRU(max_entries=1, max_bajtów=3 * size)
+
+    for k in 'abc':
+        cache.set(k, value)
+    cache.get('a')
+    cache.set('d', value)
+
+    # The entry limit is replaced by the budget, which holds three values
+    assert [k for k in 'abcd' if cache.get(k) is not None] == ['a', 'c', 'd']
+    assert cache.stat()['bytes'] == cache.cache.currsize == 3 * size
+
+    cache.set('e', os.urandom(2000))
+    assert cache.stat()['bytes'] <= 3 * size
+
+
+def test_values_above_the_threshold_are_compressed():
+    text, data = 'answer ' * 1000, b'\x00' * 5000
+    cache = PamięćLRU(próg_kompresji=100)
+    cache.set('text', text)
+    cache.set('data', data)
+
+    assert isinstance(cache.cache['text'][0], _Skompresowane)
+    assert isinstance(cache.cache['data'][0], _Skompresowane)
+    assert cache.get('text') == text and cache.get('data') == data
+    assert cache.stat()['bytes'] < cache.stat()['raw_bytes']
+
+
+def test_small_and_incompressible_values_stay_uncompressed():
+    noise = os.urandom(5000)
+    cache = PamięćLRU(próg_kompresji=100)
+    cache.set('short', 'answer')
+    cache.set('noise', noise)
+    cache.set('list', ['answer'] * 1000)
+
+    assert cache.cache['short'][0] == 'answer'
+    assert cache.cache['noise'][0] is noise
+    assert cache.get('list') == ['answer'] * 1000
+    assert cache.stat()['compression_ratio'] == 1.0
+
+
+def test_stats_follow_overwrites_and_evictions():
+    long, short = 'answer ' * 1000, 'answer'
+    compressed = sys.getsizeof(zlib.compress(long.encode('utf-8'), 6))
+    cache = PamięćLRU(max_bajtów=2 * compressed + sys.getsizeof(short), próg_kompresji=100)
+
+    cache.set('a', long)
+    cache.set('b', long)
+    assert cache.stat()['bytes'] == 2 * compressed
+    assert cache.stat()['raw_bytes'] == 2 * sys.getsizeof(long)
+
+    cache.set('a', short)
+    assert cache.stat()['bytes'] == compressed + sys.getsizeof(short)
+    assert cache.stat()['raw_bytes'] == sys.getsizeof(long) + sys.getsizeof(short)
+
+    # The overwrite made 'a' the most recently used entry, so 'b' is evicted first
+    cache.set('c', long)
+    cache.set('d', long)
+    assert [k for k in 'abcd' if k in cache.cache] == ['a', 'c', 'd']
+    assert cache.stat()['bytes'] == cache.cache.currsize == 2 * compressed + sys.getsizeof(short)
+
+    cache.set('e', long)
+    stat = cache.stat()
+    assert (stat['len'], stat['bytes'], stat['raw_bytes']) == (2, 2 * compressed, 2 * sys.getsizeof(long))
+    assert stat['bytes'] == cache.cache.currsize
+    assert stat['compression_ratio'] == sys.getsizeof(long) / compressed
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pytest
+from cachetools import TTLCache
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from packages.cache.src.negative_cache import PamięćNegatywna
+
+
+class StatusError(RuntimeError):
+    def __init__(self, message, status):
+        super().__init__(message)
+        self.status = status
+
+
+def raised(error):
+    try:
+        raise error
+    except Exception as e:
+        return e
+
+
+def test_stores_message_and_status_only():
+    cache = PamięćNegatywna(ttl=60)
+    error = raised(StatusError('Błąd API: Status 400', 400))
+    cache.set('k', error)
+
+    assert cache.get('k') == ('Błąd API: Status 400', 400)
+    assert cache.get('other') is None
+    # The caller's exception is left as it was
+    assert error.__traceback__ is not None
+    assert cache.stat()['hits'] == 1 and cache.stat()['stored'] == 1
+
+
+def test_errors_without_status():
+    cache = PamięćNegatywna()
+    cache.set('k', ValueError('bad'))
+
+    assert cache.get('k') == ('bad', None)
+
+
+def test_entries_expire_and_can_be_removed():
+    cache = PamięćNegatywna(ttl=60)
+    now = [0.0]
+    cache.cache = TTLCache(maxsize=10, ttl=60, timer=lambda: now[0])
+    cache.set('a', ValueError('a'))
+    cache.set('b', ValueError('b'))
+    cache.usuń('b')
+
+    assert cache.get('b') is None
+    now[0] = 61
+    assert cache.get('a') is None
+
+
+def test_rejects_invalid_limits():
+    with pytest.raises(ValueError):
+        PamięćNegatywna(ttl=0)
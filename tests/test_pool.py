@@ -0,0 +1,124 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import perplexity
+import perplexity_async
+
+
+@pytest.fixture
+def bootstraps(monkeypatch):
+    '''
+    Replaces the session request of both clients with a local one and returns the bootstrapped clients.
+    '''
+    calls = []
+
+    def bootstrap(self):
+        calls.append(self)
+        self.bootstrapped_at = time.time()
+
+    async def async_bootstrap(self):
+        bootstrap(self)
+
+    monkeypatch.setattr(perplexity.Client, 'bootstrap', bootstrap)
+    monkeypatch.setattr(perplexity_async.Client, 'bootstrap', async_bootstrap)
+    return calls
+
+
+def test_pool_warms_every_client(bootstraps):
+    pool = perplexity.ClientPool(size=3, cookies={'session': 'a'})
+    pool.wait_ready(timeout=5)
+
+    assert len(pool.clients) == pool.idle.qsize() == 3
+    assert sorted(map(id, bootstraps)) == sorted(map(id, pool.clients))
+    assert all(client.own for client in pool.clients)
+
+
+def test_acquire_and_release(bootstraps):
+    pool = perplexity.ClientPool(cookies=[{'session': 'a'}, {'session': 'b'}])
+    pool.wait_ready(timeout=5)
+
+    a, b = pool.acquire(), pool.acquire()
+    assert a is not b
+
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.01)
+
+    pool.release(a)
+    assert pool.acquire(timeout=1) is a
+    # Warm sessions are not bootstrapped again
+    assert len(bootstraps) == 2
+
+
+def test_expired_session_is_bootstrapped_on_acquire(bootstraps):
+    pool = perplexity.ClientPool(size=1, max_age=60)
+    pool.wait_ready(timeout=5)
+    pool.clients[0].bootstrapped_at -= 120
+
+    with pool.client() as client:
+        assert len(bootstraps) == 2 and time.time() - client.bootstrapped_at < 60
+
+
+def test_context_manager_releases_on_exception(bootstraps):
+    pool = perplexity.ClientPool(size=1)
+    pool.wait_ready(timeout=5)
+
+    with pytest.raises(ValueError):
+        with pool.client(timeout=1) as client:
+            raise ValueError('search failed')
+
+    assert pool.idle.qsize() == 1
+    assert pool.acquire(timeout=1) is client
+
+
+def test_failed_bootstrap_keeps_the_client(monkeypatch, bootstraps):
+    def broken(self):
+        raise ConnectionError('offline')
+
+    monkeypatch.setattr(perplexity.Client, 'bootstrap', broken)
+    pool = perplexity.ClientPool(size=1)
+    pool.wait_ready(timeout=5)
+
+    with pytest.raises(ConnectionError):
+        pool.acquire(timeout=1)
+
+    # The client is back in the pool and bootstrapped when the network returns
+    monkeypatch.setattr(perplexity.Client, 'bootstrap', lambda self: setattr(self, 'bootstrapped_at', time.time()))
+    assert pool.acquire(timeout=1).bootstrapped_at is not None
+
+
+def test_async_pool(bootstraps):
+    async def main():
+        pool = await perplexity_async.ClientPool(size=2)
+        await pool.wait_ready()
+        warmed = len(pool.clients), pool.idle.qsize()
+
+        a = await pool.acquire()
+        async with pool.client(timeout=1) as b:
+            borrowed = pool.idle.qsize()
+
+            with pytest.raises(asyncio.TimeoutError):
+                await pool.acquire(timeout=0.01)
+
+        pool.release(a)
+
+        with pytest.raises(ValueError):
+            async with pool.client(timeout=1):
+                raise ValueError('search failed')
+
+        return warmed, borrowed, a is not b, pool.idle.qsize()
+
+    warmed, borrowed, distinct, idle = asyncio.run(main())
+
+    assert warmed == (2, 2)
+    assert borrowed == 0 and distinct
+    assert idle == 2
+    assert len(bootstraps) == 2
@@ -0,0 +1,169 @@
+import asyncio
+import itertools
+import os
+import sys
+
+import pytest
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import perplexity_async
+from perplexity_async import provisioner
+
+
+class FakeEmailnatorPool(perplexity_async.client.AsyncMixin):
+    async def __ainit__(self, cookies, **kwargs):
+        pass
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def accounts(monkeypatch):
+    '''
+    Replaces account creation with a local one and returns the list of created clients.
+    '''
+    created = []
+    ids = itertools.count()
+
+    async def create_account(self, cookies, poller=None, emailnator_pool=None):
+        self.session.cookies.update({'session': f'account-{next(ids)}'})
+        self.copilot, self.file_upload = 5, 10
+        created.append(self)
+        return True
+
+    monkeypatch.setattr(provisioner, 'EmailnatorPool', FakeEmailnatorPool)
+    monkeypatch.setattr(perplexity_async.Client, 'create_account', create_account)
+    return created
+
+
+def test_restart_reuses_the_accounts_in_the_vault(accounts):
+    async def main():
+        vault = perplexity_async.AccountVault(':memory:')
+
+        first = await perplexity_async.AccountProvisioner({}, size=3, vault=vault)
+        await asyncio.sleep(0.05)
+        await first.close()
+        created = len(accounts)
+
+        # A restart fills its slots with the stored accounts instead of creating new ones
+        second = await perplexity_async.AccountProvisioner({}, size=3, vault=vault)
+        await asyncio.sleep(0.05)
+        restored = [second.get_nowait() for _ in range(second.ready.qsize())]
+        await second.close()
+
+        scheduler = await perplexity_async.AccountScheduler(vault=vault)
+        await vault.close()
+        return created, restored, scheduler
+
+    created, restored, scheduler = asyncio.run(main())
+
+    assert created == len(accounts) == 3
+    assert sorted(c.vault_id for c in restored) == sorted(c.vault_id for c in accounts)
+    assert all(c.copilot == 5 and c.file_upload == 10 for c in restored)
+    assert len(scheduler.active) == 3
+    assert scheduler.remaining() == {'copilot': 15, 'file_upload': 30}
+
+
+async def settle(provisioner, ready):
+    for _ in range(100):
+        if provisioner.ready.qsize() == ready:
+            break
+        await asyncio.sleep(0.01)
+
+
+def test_slots_bound_created_accounts(accounts):
+    async def main():
+        provisioner = await perplexity_async.AccountProvisioner({}, size=2)
+        await settle(provisioner, 2)
+        full = len(accounts), provisioner.slots._value
+
+        await provisioner.get(timeout=1)
+        await settle(provisioner, 2)
+        refilled = len(accounts), provisioner.ready.qsize()
+        await provisioner.close()
+        return full, refilled
+
+    full, refilled = asyncio.run(main())
+
+    assert full == (2, 0)
+    assert refilled == (3, 2)
+
+
+def test_failed_creations_release_their_slot(monkeypatch, accounts):
+    fail = iter([True, True])
+    create_account = perplexity_async.Client.create_account
+
+    async def flaky(self, *args, **kwargs):
+        if next(fail, False):
+            raise ValueError('no sign-in email')
+        return await create_account(self, *args, **kwargs)
+
+    monkeypatch.setattr(perplexity_async.Client, 'create_account', flaky)
+
+    async def main():
+        provisioner = await perplexity_async.AccountProvisioner({}, size=2, concurrency=1, retry_delay=0)
+        await settle(provisioner, 2)
+        await provisioner.close()
+        return provisioner
+
+    provisioner = asyncio.run(main())
+
+    assert provisioner.failed == 2 and provisioner.created == 2
+    assert provisioner.ready.qsize() == 2 and provisioner.slots._value == 0
+
+
+def test_cancelled_creations_release_their_slot(monkeypatch, accounts):
+    async def hang(self, *args, **kwargs):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(perplexity_async.Client, 'create_account', hang)
+
+    async def main():
+        provisioner = await perplexity_async.AccountProvisioner({}, size=3, concurrency=2)
+        await asyncio.sleep(0.05)
+        busy = provisioner.slots._value
+        await provisioner.close()
+        return busy, provisioner.slots._value
+
+    assert asyncio.run(main()) == (1, 3)
+
+
+def test_vault_errors_do_not_lose_the_account(accounts):
+    class BrokenVault:
+        async def clients(self, *args, **kwargs):
+            return []
+
+        async def add(self, client):
+            raise OSError('disk full')
+
+    async def main():
+        provisioner = await perplexity_async.AccountProvisioner({}, size=1, vault=BrokenVault())
+        client = await provisioner.get(timeout=1)
+        await provisioner.close()
+        return client
+
+    assert asyncio.run(main()) is accounts[0]
+
+
+def test_create_account_gives_up_after_its_attempts():
+    class BrokenPool:
+        calls = 0
+
+        async def get(self):
+            BrokenPool.calls += 1
+            raise ConnectionError('emailnator is down')
+
+    async def main():
+        client = await perplexity_async.Client(lazy=True)
+        client.bootstrapped_at = 0
+        await client.create_account({}, emailnator_pool=BrokenPool(), attempts=3)
+
+    with pytest.raises(Exception, match='after 3 attempts'):
+        asyncio.run(main())
+
+    assert BrokenPool.calls == 3
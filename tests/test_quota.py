@@ -0,0 +1,46 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import perplexity
+import perplexity_async
+
+
+def test_failed_lazy_bootstrap_does_not_charge_quota():
+    client = perplexity.Client(lazy=True)
+    client.copilot = 1
+
+    def bootstrap():
+        raise ConnectionError('offline')
+
+    client.bootstrap = bootstrap
+
+    with pytest.raises(ConnectionError):
+        client.search('question', mode='pro')
+
+    assert client.copilot == 1
+
+
+def test_failed_lazy_bootstrap_does_not_charge_quota_async():
+    async def main():
+        client = await perplexity_async.Client(lazy=True)
+        client.copilot = 1
+
+        async def bootstrap():
+            raise ConnectionError('offline')
+
+        client.bootstrap = bootstrap
+
+        with pytest.raises(ConnectionError):
+            await client.search('question', mode='pro')
+
+        return client.copilot
+
+    assert asyncio.run(main()) == 1
@@ -0,0 +1,116 @@
+import asyncio
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# Loaded by path: importing packages.utils also loads the logger and the config file
+_spec = importlib.util.spec_from_file_location('async_rate_limiter', os.path.join(ROOT_DIR, 'packages', 'utils', 'src', 'async_rate_limiter.py'))
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+KeyedRateLimiter = _module.KeyedRateLimiter
+
+
+async def acquire_all(limiter, requests):
+    '''
+    Starts one acquire per (name, cost, key) at once and returns the names in grant order.
+    '''
+    order = []
+
+    async def waiter(name, cost, key):
+        await limiter.acquire(cost, key)
+        order.append(name)
+
+    await asyncio.gather(*[waiter(*request) for request in requests])
+    return order
+
+
+def test_waiters_are_served_in_arrival_order():
+    async def main():
+        limiter = KeyedRateLimiter(rate=200, burst=1)
+        return await acquire_all(limiter, [(i, 1, None) for i in range(20)])
+
+    assert asyncio.run(main()) == list(range(20))
+
+
+def test_expensive_request_is_not_overtaken_by_cheaper_ones():
+    async def main():
+        limiter = KeyedRateLimiter(rate=100, burst=3)
+        await limiter.acquire(3)
+        return await acquire_all(limiter, [('big', 3, None), ('small 1', 1, None), ('small 2', 1, None)])
+
+    assert asyncio.run(main()) == ['big', 'small 1', 'small 2']
+
+
+def test_cost_is_taken_from_the_bucket():
+    async def main():
+        limiter = KeyedRateLimiter(rate=0.001, burst=4)
+        await limiter.acquire(3)
+        tokens = limiter._buckets[None].tokens
+
+        with pytest.raises(ValueError):
+            await limiter.acquire(5)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(limiter.acquire(2), timeout=0.05)
+
+        return tokens
+
+    assert asyncio.run(main()) == pytest.approx(1, abs=0.01)
+
+
+def test_keys_have_separate_buckets_and_limits():
+    async def main():
+        limiter = KeyedRateLimiter(rate=0.001, burst=1)
+        limiter.set_limit('proxy', rate=0.001, burst=2)
+        await limiter.acquire(1, 'account')
+        await limiter.acquire(1, 'other')
+        await limiter.acquire(2, 'proxy')
+        return limiter.stat()
+
+    stat = asyncio.run(main())
+
+    assert stat['granted'] == 3 and stat['waited'] == 0 and stat['keys'] == 3
+
+
+def test_cancelled_head_lets_the_next_waiter_in():
+    async def main():
+        limiter = KeyedRateLimiter(rate=10, burst=1)
+        await limiter.acquire()
+        loop = asyncio.get_running_loop()
+        first = asyncio.ensure_future(limiter.acquire())
+        second = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        start = loop.time()
+        first.cancel()
+        await second
+        return loop.time() - start
+
+    # Without the cancelled waiter the second one would wait two refill periods (0.2 s)
+    assert asyncio.run(main()) < 0.15
+
+
+def test_tokens_of_a_cancelled_grant_are_refunded():
+    async def main():
+        limiter = KeyedRateLimiter(rate=0.001, burst=1)
+        await limiter.acquire()
+        first = asyncio.ensure_future(limiter.acquire())
+        second = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+
+        # Grant the token to the first waiter, then cancel it before it resumes
+        bucket = limiter._buckets[None]
+        bucket.tokens = 1.0
+        limiter._serve(bucket, asyncio.get_running_loop().time())
+        first.cancel()
+
+        await asyncio.wait_for(second, timeout=1)
+        return first.cancelled()
+
+    assert asyncio.run(main())
@@ -0,0 +1,60 @@
+import asyncio
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# Loaded by path: importing packages.utils also loads the logger and the config file
+_spec = importlib.util.spec_from_file_location('async_retry', os.path.join(ROOT_DIR, 'packages', 'utils', 'src', 'async_retry.py'))
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+async_retry = _module.async_retry
+
+
+class Deterministic(RuntimeError):
+    pass
+
+
+def failing(error, calls):
+    @async_retry(max_retries=3, base_delay=0.001, give_up=lambda e: isinstance(e, Deterministic))
+    async def call():
+        calls.append(1)
+        raise error
+
+    return call
+
+
+def test_give_up_raises_without_retrying():
+    calls = []
+    with pytest.raises(Deterministic):
+        asyncio.run(failing(Deterministic('bad request'), calls)())
+
+    assert len(calls) == 1
+
+
+def test_other_errors_are_retried():
+    calls = []
+    with pytest.raises(TimeoutError):
+        asyncio.run(failing(TimeoutError('slow'), calls)())
+
+    assert len(calls) == 4
+
+
+def test_success_after_retry():
+    calls = []
+
+    @async_retry(max_retries=2, base_delay=0.001)
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 2:
+            raise ConnectionError()
+        return 'ok'
+
+    assert asyncio.run(flaky()) == 'ok'
+    assert len(calls) == 2
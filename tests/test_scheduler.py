@@ -0,0 +1,151 @@
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import perplexity
+import perplexity_async
+from perplexity.scheduler import AccountScheduler
+
+
+class FakeClient(perplexity.Client):
+    '''
+    Client with a canned search(): charges its quota after a short delay, like a session bootstrap.
+    '''
+    def __init__(self, copilot=5, file_upload=10):
+        self.copilot = copilot
+        self.file_upload = file_upload
+
+    def search(self, query, mode='auto', files={}, on_charge=None, **kwargs):
+        time.sleep(0.02)
+        assert not (mode in ('pro', 'reasoning', 'deep research') and self.copilot <= 0), 'You have used all your enhanced (pro) queries.'
+        self.copilot -= mode in ('pro', 'reasoning', 'deep research')
+        self.file_upload -= len(files)
+
+        if on_charge is not None:
+            on_charge()
+
+        time.sleep(0.1)
+        return {'answer': query}
+
+
+class FakeAsyncClient(perplexity_async.Client):
+    '''
+    Async twin of FakeClient.
+    '''
+    def __init__(self, copilot=5, file_upload=10):
+        self.copilot = copilot
+        self.file_upload = file_upload
+
+    async def search(self, query, mode='auto', files={}, on_charge=None, **kwargs):
+        await asyncio.sleep(0.02)
+        assert not (mode in ('pro', 'reasoning', 'deep research') and self.copilot <= 0), 'You have used all your enhanced (pro) queries.'
+        self.copilot -= mode in ('pro', 'reasoning', 'deep research')
+        self.file_upload -= len(files)
+
+        if on_charge is not None:
+            on_charge()
+
+        await asyncio.sleep(0.1)
+        return {'answer': query}
+
+
+def test_concurrent_pro_queries_use_the_whole_quota():
+    client = FakeClient(copilot=5)
+    scheduler = AccountScheduler([client])
+
+    def query(i):
+        # Later queries are reserved while earlier ones are charged but not finished
+        time.sleep(0.01 * i)
+        return scheduler.search(f'q{i}', mode='pro')
+
+    with ThreadPoolExecutor(5) as executor:
+        results = list(executor.map(query, range(5)))
+
+    assert len(results) == 5
+    assert client.copilot == 0
+    assert scheduler.remaining() == {'copilot': 0, 'file_upload': 10}
+    assert scheduler.active[0].pending_copilot == 0
+
+
+def test_async_concurrent_pro_queries_use_the_whole_quota():
+    async def main():
+        client = FakeAsyncClient(copilot=5)
+        scheduler = await perplexity_async.AccountScheduler([client])
+
+        async def query(i):
+            await asyncio.sleep(0.01 * i)
+            return await scheduler.search(f'q{i}', mode='pro')
+
+        results = await asyncio.gather(*(query(i) for i in range(5)))
+        return client, results
+
+    client, results = asyncio.run(main())
+
+    assert len(results) == 5
+    assert client.copilot == 0
+
+
+def test_reservations_spread_queries_and_are_dropped_on_error():
+    a, b = FakeClient(copilot=1), FakeClient(copilot=1)
+    scheduler = AccountScheduler([a, b])
+
+    with ThreadPoolExecutor(2) as executor:
+        list(executor.map(lambda i: scheduler.search(f'q{i}', mode='pro'), range(2)))
+
+    assert a.copilot == b.copilot == 0
+
+    c = FakeClient(copilot=1)
+    c.search = lambda *args, **kwargs: 1 / 0
+    scheduler.add(c)
+
+    with pytest.raises(ZeroDivisionError):
+        scheduler.search('q', mode='pro')
+
+    # The failed query never charged the client, so its reservation is given back
+    assert scheduler.remaining()['copilot'] == 1
+
+
+def test_exhausted_accounts_are_retired():
+    client = FakeClient(copilot=1, file_upload=0)
+    scheduler = AccountScheduler([client])
+
+    scheduler.search('q', mode='pro')
+
+    assert scheduler.active == []
+    assert [account.client for account in scheduler.retired] == [client]
+    # Retired accounts still serve auto queries without attachments
+    assert scheduler.search('q') == {'answer': 'q'}
+
+
+def test_no_account_with_quota_raises():
+    scheduler = AccountScheduler([FakeClient(copilot=0, file_upload=1)])
+
+    with pytest.raises(AssertionError, match='No account has quota left'):
+        scheduler.search('q', mode='pro')
+
+    with pytest.raises(AssertionError, match='No account has quota left'):
+        scheduler.search('q', files={'a.txt': b'a', 'b.txt': b'b'})
+
+
+def test_restart_schedules_the_accounts_in_the_vault():
+    vault = perplexity.AccountVault(':memory:')
+    a, b = perplexity.Client({'session': 'a'}, lazy=True), perplexity.Client({'session': 'b'}, lazy=True)
+    a.copilot, a.file_upload, b.copilot, b.file_upload = 3, 2, 0, 0
+    AccountScheduler([a, b], vault=vault)
+
+    # The given client replaces its stored copy instead of being scheduled twice
+    scheduler = AccountScheduler([a], vault=vault)
+
+    assert [account.client for account in scheduler.active] == [a]
+    assert [account.client.vault_id for account in scheduler.retired] == [b.vault_id]
+    assert scheduler.remaining() == {'copilot': 3, 'file_upload': 2}
+    vault.close()
@@ -0,0 +1,96 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from perplexity_async.client import Client
+
+
+class FakeClient(Client):
+    '''
+    Client with a canned search(): no session, answers after a per-query delay.
+    '''
+    def __init__(self, max_concurrency=4, delays=None):
+        self.search_slots = asyncio.Semaphore(max_concurrency)
+        self.delays = delays or {}
+        self.running = 0
+        self.peak = 0
+        self.started = []
+
+    async def search(self, query='', **kwargs):
+        self.started.append(query)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+
+        try:
+            await asyncio.sleep(self.delays.get(query, 0.001))
+        finally:
+            self.running -= 1
+
+        if query == 'bad':
+            raise ValueError(query)
+
+        return {'answer': query}
+
+
+async def collect(batch):
+    return [item async for item in batch]
+
+
+def test_ordered_results_keep_input_order_and_errors():
+    async def main():
+        client = FakeClient(delays={'a': 0.03, 'b': 0.01})
+        return await collect(client.search_many(['a', 'b', 'bad', 'c'], concurrency=2, ordered=True))
+
+    results = asyncio.run(main())
+
+    assert [index for index, _ in results] == [0, 1, 2, 3]
+    assert results[0][1] == {'answer': 'a'}
+    assert isinstance(results[2][1], ValueError)
+
+
+def test_iterator_error_is_raised_instead_of_hanging():
+    def queries():
+        yield 'a'
+        raise RuntimeError('broken source')
+
+    async def main():
+        client = FakeClient()
+        await asyncio.wait_for(collect(client.search_many(queries(), concurrency=3)), timeout=1)
+
+    with pytest.raises(RuntimeError, match='broken source'):
+        asyncio.run(main())
+
+
+def test_concurrent_batches_share_the_client_limit():
+    async def main():
+        client = FakeClient(max_concurrency=2)
+        queries = [f'q{i}' for i in range(6)]
+        await asyncio.gather(collect(client.search_many(queries, concurrency=2)),
+                             collect(client.search_many(queries, concurrency=2)))
+        return client.peak
+
+    assert asyncio.run(main()) == 2
+
+
+def test_ordered_mode_does_not_run_far_ahead_of_a_slow_query():
+    async def main():
+        client = FakeClient(max_concurrency=10, delays={'q0': 0.2})
+        batch = client.search_many([f'q{i}' for i in range(50)], concurrency=2, ordered=True)
+        first = await batch.__anext__()
+        started = len(client.started)
+        rest = await collect(batch)
+        return first, started, rest
+
+    first, started, rest = asyncio.run(main())
+
+    assert first[0] == 0
+    # The slow first query holds back the window of 2 * concurrency results
+    assert started <= 2 * 2 + 1
+    assert [index for index, _ in rest] == list(range(1, 50))
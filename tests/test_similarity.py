@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from packages.cache.src.similarity import IndeksPodobieństwa
+
+
+@pytest.mark.parametrize('indexed, query', [
+    ('What is the capital of France?', "what's the capital of france"),
+    ('capital of France, please', 'What is the capital of France?'),
+    ('How do I reverse a list in Python?', 'how do i REVERSE a list in python'),
+])
+def test_rephrased_prompt_matches(indexed, query):
+    index = IndeksPodobieństwa()
+    index.dodaj(indexed, 'k')
+
+    assert index.znajdź(query) == 'k'
+
+
+@pytest.mark.parametrize('indexed, query', [
+    ('is java faster than python', 'is python faster than java'),
+    ('fahrenheit to celsius', 'celsius to fahrenheit'),
+    ('paris to london', 'london to paris'),
+    ('2021 world series', '2020 world series'),
+    ('is coffee bad for you', 'is coffee not bad for you'),
+    ("does python support tail calls", "doesn't python support tail calls"),
+])
+def test_different_question_does_not_match(indexed, query):
+    index = IndeksPodobieństwa()
+    index.dodaj(indexed, 'k')
+
+    assert index.znajdź(query) is None
+
+
+def test_context_must_match():
+    index = IndeksPodobieństwa()
+    index.dodaj('capital of france', 'k', ('auto', 'en-us'))
+
+    assert index.znajdź('capital of france', ('pro', 'en-us')) is None
+    assert index.znajdź('capital of france', ('auto', 'en-us')) == 'k'
+
+
+def test_removed_and_evicted_keys_are_not_returned():
+    index = IndeksPodobieństwa(max_wpisów=1)
+    index.dodaj('capital of france', 'a')
+    index.dodaj('capital of spain', 'b')
+
+    assert 'a' not in index
+    assert index.znajdź('capital of france') is None
+
+    index.usuń('b')
+    assert index.znajdź('capital of spain') is None
+    assert not index._kubełki
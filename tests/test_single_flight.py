@@ -0,0 +1,110 @@
+import asyncio
+import importlib.util
+import os
+import sys
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# Loaded by path: importing packages.utils also loads the logger and the config file
+_spec = importlib.util.spec_from_file_location('single_flight', os.path.join(ROOT_DIR, 'packages', 'utils', 'src', 'single_flight.py'))
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+SingleFlight = _module.SingleFlight
+
+
+def upstream(calls, delay=0.05, error=None):
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return len(calls)
+
+    return call
+
+
+def test_concurrent_callers_share_one_call():
+    async def main():
+        flight, calls = SingleFlight(), []
+        results = await asyncio.gather(*(flight.wykonaj('k', upstream(calls)) for _ in range(10)))
+        return flight, calls, results
+
+    flight, calls, results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert results == [1] * 10
+    assert flight.stat() == {'wywołania': 1, 'połączone': 9, 'w_locie': 0}
+
+
+def test_error_reaches_every_waiter_and_clears_the_key():
+    async def main():
+        flight, calls = SingleFlight(), []
+        results = await asyncio.gather(*(flight.wykonaj('k', upstream(calls, error=ValueError('upstream'))) for _ in range(3)),
+                                       return_exceptions=True)
+        return flight, results
+
+    flight, results = asyncio.run(main())
+
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.stat()['w_locie'] == 0
+
+
+def test_cancelling_one_waiter_keeps_the_call_for_the_others():
+    async def main():
+        flight, calls = SingleFlight(), []
+        first = asyncio.ensure_future(flight.wykonaj('k', upstream(calls)))
+        second = asyncio.ensure_future(flight.wykonaj('k', upstream(calls)))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        result = await second
+        return calls, first, result
+
+    calls, first, result = asyncio.run(main())
+
+    assert first.cancelled()
+    assert result == 1 and len(calls) == 1
+
+
+def test_call_is_cancelled_when_the_last_waiter_leaves():
+    async def main():
+        flight, started, cancelled = SingleFlight(), [], []
+
+        async def call():
+            started.append(1)
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        waiters = [asyncio.ensure_future(flight.wykonaj('k', call)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+
+        for waiter in waiters:
+            waiter.cancel()
+
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+        return flight, started, cancelled
+
+    flight, started, cancelled = asyncio.run(main())
+
+    assert started == cancelled == [1]
+    assert flight.stat()['w_locie'] == 0
+
+
+def test_new_call_after_completion_runs_again():
+    async def main():
+        flight, calls = SingleFlight(), []
+        first = await flight.wykonaj('k', upstream(calls, delay=0))
+        second = await flight.wykonaj('k', upstream(calls, delay=0))
+        return flight, first, second
+
+    flight, first, second = asyncio.run(main())
+
+    assert (first, second) == (1, 2)
+    assert flight.stat() == {'wywołania': 2, 'połączone': 0, 'w_locie': 0}
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import sys
+import time
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from packages.cache.src.keys import zbuduj_klucz
+from packages.cache.src.memory_cache import PamięćKlasowa
+from packages.cache.src.snapshot import zapisz_snapshot, wczytaj_snapshot
+
+
+def cache():
+    return PamięćKlasowa({'pro': {'ttl': 600}}, max_entries=100, ttl=60, próg_kompresji=100)
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / 'snapshot.bin')
+    source, target = cache(), cache()
+    text, data, raw = zbuduj_klucz('text'), zbuduj_klucz('data', 'pro'), zbuduj_klucz('raw')
+    source.set(text, 'x' * 1000)
+    source.set(data, {'answer': [1, 2]})
+    source.set(raw, b'old')
+    target.set(raw, b'new')
+
+    assert asyncio.run(zapisz_snapshot(source, path)) == 3
+    assert asyncio.run(wczytaj_snapshot(target, path)) == 3
+
+    assert target.get(text) == 'x' * 1000
+    assert target.get(data) == {'answer': [1, 2]}
+    # Entries written since startup are newer than the snapshot
+    assert target.get(raw) == b'new'
+    assert [name for name in os.listdir(tmp_path)] == ['snapshot.bin']
+
+
+def test_downtime_counts_against_ttl(tmp_path, monkeypatch):
+    path = str(tmp_path / 'snapshot.bin')
+    source, target = cache(), cache()
+    short, long = zbuduj_klucz('short'), zbuduj_klucz('long', 'pro')
+    source.set(short, 'a')
+    source.set(long, 'b')
+    asyncio.run(zapisz_snapshot(source, path))
+
+    restart = time.time() + 120
+    monkeypatch.setattr(time, 'time', lambda: restart)
+    asyncio.run(wczytaj_snapshot(target, path))
+
+    assert target.get(short) is None
+    assert target.get(long) == 'b'
+    remaining = target.klasy['pro'].eksportuj()[0][2] - restart
+    assert 470 < remaining <= 480
@@ -0,0 +1,37 @@
+import os
+import sys
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from perplexity.decoder import Decoder
+from perplexity.sse import SSEParser
+
+BODY = (
+    b'event: message\r\ndata: {"status": "PENDING", "text": "[1]"}\r\n\r\n'
+    b'event: message\r\ndata: {"status": "COMPLETED", "text": "[1, 2]"}\r\n\r\n'
+    b'event: end_of_stream\r\ndata: {}\r\n\r\n'
+)
+
+
+def parse(chunks):
+    decoder = Decoder('json')
+    return [(event, decoder.message(data)) for event, data in SSEParser().iter_events(chunks)]
+
+
+def test_parser_handles_any_chunk_boundary():
+    expected = parse([BODY])
+
+    assert [event for event, _ in expected] == [b'message', b'message', b'end_of_stream']
+    assert expected[1][1] == {'status': 'COMPLETED', 'text': [1, 2]}
+
+    for size in (1, 2, 3, 7, 64):
+        assert parse(BODY[i:i + size] for i in range(0, len(BODY), size)) == expected
+
+
+def test_parser_joins_multiline_data():
+    events = list(SSEParser().feed(b'event: message\r\ndata: {"a":\r\ndata: 1}\r\n\r\n'))
+
+    assert events == [(b'message', b'{"a":\n1}')]
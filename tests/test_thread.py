@@ -0,0 +1,70 @@
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from perplexity.thread import ThreadStore
+import perplexity_async
+
+
+def test_store_keeps_only_follow_up_fields():
+    store = ThreadStore()
+    store.update('t', {'backend_uuid': 'abc', 'attachments': ['https://a'], 'text': 'long answer'})
+
+    assert store.get('t') == {'backend_uuid': 'abc', 'attachments': ['https://a']}
+    assert store.get('missing') is None
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / 'threads.json')
+    store = ThreadStore(max_threads=2, path=path)
+
+    store.update('a', {'backend_uuid': '1'})
+    store.update('b', {'backend_uuid': '2'})
+    store.get('a')
+    store.update('c', {'backend_uuid': '3'})
+    store.save()
+
+    assert 'b' not in store
+    assert ThreadStore(path=path).get('a') == {'backend_uuid': '1', 'attachments': []}
+
+
+def test_save_without_path_does_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = ThreadStore()
+    store.update('a', {'backend_uuid': '1'})
+    store.save()
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_concurrent_saves_leave_one_complete_file(tmp_path):
+    path = str(tmp_path / 'threads.json')
+    store = ThreadStore(path=path)
+
+    for i in range(100):
+        store.update(f't{i}', {'backend_uuid': str(i)})
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda _: store.save(), range(16)))
+
+    assert os.listdir(tmp_path) == ['threads.json']
+    assert len(ThreadStore(path=path)) == 100
+
+
+def test_async_store_saves_in_a_worker_thread(tmp_path):
+    path = str(tmp_path / 'threads.json')
+
+    async def main():
+        store = perplexity_async.ThreadStore(path=path)
+        store.update('a', {'backend_uuid': '1'})
+        await store.save()
+
+    asyncio.run(main())
+
+    assert ThreadStore(path=path).get('a') == {'backend_uuid': '1', 'attachments': []}
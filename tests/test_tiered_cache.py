@@ -0,0 +1,80 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from packages.cache.src.keys import zbuduj_klucz
+from packages.cache.src.memory_cache import PamięćKlasowa, PamięćLRU, WartośćZTtl
+from packages.cache.src.tiered_cache import PamięćWarstwowa
+
+
+def remaining(l1, k):
+    pamięć = l1._pamięć(k.klasa)
+    return pamięć.cache[k.skrót][1] - pamięć.cache.timer()
+
+
+def test_loader_ttl_shortens_the_entry():
+    async def main():
+        cache = PamięćLRU(ttl=60)
+
+        async def loader():
+            return WartośćZTtl('answer', 5)
+
+        assert await cache.pobierz_lub_odswiez('k', loader) == 'answer'
+        return cache.cache['k'][1] - cache.cache.timer()
+
+    assert 0 < asyncio.run(main()) <= 5
+
+
+def test_l1_fill_keeps_the_l2_expiry():
+    fakeredis = pytest.importorskip('fakeredis')
+
+    async def main():
+        server = fakeredis.FakeServer()
+        writer = PamięćWarstwowa(PamięćKlasowa(ttl=60), fakeredis.aioredis.FakeRedis(server=server))
+        reader = PamięćWarstwowa(PamięćKlasowa(ttl=60), fakeredis.aioredis.FakeRedis(server=server))
+        k = zbuduj_klucz('question')
+
+        await writer.ustaw(k, {'answer': 1})
+        # The entry has been in L2 for most of its TTL
+        await writer.redis.pexpire(writer._klucz_l2(k), 2000)
+
+        async def loader():
+            raise AssertionError('L2 hit expected')
+
+        assert await reader.pobierz_lub_odswiez(k, loader) == {'answer': 1}
+        assert remaining(reader.l1, k) <= 2
+        assert reader.stat()['l2_hits'] == 1
+
+    asyncio.run(main())
+
+
+def test_invalidation_reaches_other_workers():
+    fakeredis = pytest.importorskip('fakeredis')
+
+    async def main():
+        server = fakeredis.FakeServer()
+        a = PamięćWarstwowa(PamięćKlasowa(ttl=60), fakeredis.aioredis.FakeRedis(server=server))
+        b = PamięćWarstwowa(PamięćKlasowa(ttl=60), fakeredis.aioredis.FakeRedis(server=server))
+        k = zbuduj_klucz('question')
+        await b.start()
+        await asyncio.sleep(0.1) # Let the listener subscribe
+
+        await a.ustaw(k, 'old')
+        assert await b.pobierz(k) == 'old'
+
+        await a.unieważnij(k)
+        await asyncio.sleep(0.1)
+
+        assert b.l1.get(k) is None
+        assert await b.pobierz(k) is None
+        await b.stop()
+        await a.stop()
+
+    asyncio.run(main())
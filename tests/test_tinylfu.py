@@ -0,0 +1,85 @@
+import os
+import sys
+
+import pytest
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from packages.cache.src.memory_cache import PamięćLRU
+from packages.cache.src.tinylfu import PamięćTinyLFU
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def lookup(cache, k):
+    # Like the cache front: a miss is counted in the sketch, then the value is stored
+    if cache.get(k) is None:
+        cache[k] = f'value {k}'
+
+
+def test_one_off_burst_does_not_evict_popular_keys():
+    cache = PamięćTinyLFU(maxsize=1000, ttl=3600)
+    popular = range(500)
+    for _ in range(5):
+        for k in popular:
+            lookup(cache, k)
+    for k in range(10_000, 14_000):
+        lookup(cache, k)
+
+    # An LRU of the same size would keep none of them; sketch collisions may cost a few
+    assert sum(k in cache for k in popular) >= 0.95 * len(popular)
+    assert len(cache) <= 1000
+
+
+def test_second_hit_promotes_to_protected_segment():
+    cache = PamięćTinyLFU(maxsize=100, ttl=3600)
+    lookup(cache, 'a')
+    lookup(cache, 'b') # Pushes 'a' out of the one-entry window into probation
+
+    assert 'a' in cache._próbna
+    assert cache.get('a') == 'value a'
+    assert 'a' in cache._chroniona and 'a' not in cache._próbna
+
+
+def test_entries_expire_after_ttl():
+    clock = Clock()
+    cache = PamięćTinyLFU(maxsize=10, ttl=60, timer=clock)
+    cache['a'] = 1
+    clock.now = 59
+    cache['b'] = 2
+
+    assert cache.get('a') == 1
+    clock.now = 61
+    assert cache.get('a') is None
+    assert 'a' not in cache
+    assert cache.items() == [('b', 2)]
+    assert cache.pop('b') == 2
+
+
+def test_byte_budget_is_kept():
+    cache = PamięćTinyLFU(maxsize=1000, ttl=3600, getsizeof=len)
+    for k in range(100):
+        lookup(cache, k)
+        cache[k] = 'x' * (10 + k)
+        assert cache.currsize <= 1000
+
+    with pytest.raises(ValueError):
+        cache['huge'] = 'x' * 1001
+
+
+def test_lru_front_with_tinylfu_and_byte_budget():
+    cache = PamięćLRU(ttl=60, max_bajtów=5000, polityka='tinylfu')
+    for k in range(200):
+        cache.set(k, 'x' * 100)
+
+    assert cache.cache.currsize <= 5000
+    assert cache.get(199) == 'x' * 100
@@ -0,0 +1,74 @@
+import asyncio
+import gc
+import os
+import sys
+import weakref
+
+import pytest
+
+# Ensure the package root is importable when pytest modifies sys.path
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from perplexity.upload_cache import UploadCache
+import perplexity_async
+
+
+def test_puts_are_saved_once_after_the_delay(tmp_path):
+    path = str(tmp_path / 'uploads.json')
+    cache = UploadCache(path=path, save_delay=60)
+    cache.put('a', 'https://a')
+    cache.put_many([('b', 'https://b'), ('c', 'https://c')])
+
+    assert not os.path.exists(path)
+    assert cache.timer is not None
+
+    cache.flush()
+
+    assert cache.timer is None
+    assert UploadCache(path=path).get('b') == 'https://b'
+    assert os.listdir(tmp_path) == ['uploads.json']
+
+
+def test_zero_delay_saves_on_every_put(tmp_path):
+    path = str(tmp_path / 'uploads.json')
+    cache = UploadCache(path=path, save_delay=0)
+    cache.put('a', 'https://a')
+
+    assert UploadCache(path=path).get('a') == 'https://a'
+
+
+def test_flush_without_changes_does_not_write(tmp_path):
+    path = str(tmp_path / 'uploads.json')
+    UploadCache(path=path).flush()
+
+    assert not os.path.exists(path)
+
+
+def test_close_saves_and_releases_the_cache(tmp_path):
+    path = str(tmp_path / 'uploads.json')
+    cache = UploadCache(path=path, save_delay=60)
+    cache.put('a', 'https://a')
+    cache.close()
+
+    assert UploadCache(path=path).get('a') == 'https://a'
+
+    # The exit hook no longer keeps the closed cache alive
+    ref = weakref.ref(cache)
+    del cache
+    gc.collect()
+    assert ref() is None
+
+
+def test_invalid_search_is_rejected_before_hashing():
+    class Cache(UploadCache):
+        def key(self, filename, file):
+            raise AssertionError('attachments hashed')
+
+    async def main():
+        client = await perplexity_async.Client({'session': 'a'}, upload_cache=Cache(), lazy=True)
+        await client.search('q', mode='fast', files={'a.txt': b'a'})
+
+    with pytest.raises(AssertionError, match='Search modes'):
+        asyncio.run(main())